@@ -1,31 +1,157 @@
-from fastapi import APIRouter
+from typing import Any
 
-from app.exceptions import CameraAlreadyRunningException, CameraAlreadyStoppedException
-from app.services.detectors import detector
+from fastapi import APIRouter, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.exceptions import (
+    CameraAlreadyRunningException,
+    CameraAlreadyStoppedException,
+    CameraNotFoundException,
+)
+from app.services.detectors import get_detector_pool
+from app.services.detectors.base import HumanDetector
+from app.services.detectors.preview import BOUNDARY
 
 router = APIRouter(tags=["Управление камерой"])
 
 
+def get_detector(camera_id: int) -> HumanDetector:
+    detector = get_detector_pool().get(camera_id)
+    if detector is None:
+        raise CameraNotFoundException
+    return detector
+
+
+def start_detector(detector: HumanDetector) -> dict[str, str]:
+    if detector.running:
+        raise CameraAlreadyRunningException
+    detector.start()
+    return {"status": "Камера запущена"}
+
+
+def stop_detector(detector: HumanDetector) -> dict[str, str]:
+    if not detector.running:
+        raise CameraAlreadyStoppedException
+    detector.stop()
+    return {"status": "Камера остановлена"}
+
+
+def detector_status(detector: HumanDetector) -> dict[str, Any]:
+    return {
+        "camera_id": detector.camera_id,
+        "running": detector.running,
+        "capture_mode": detector.camera.capture_mode,
+        "ready": detector.ready,
+        "startup": detector.startup,
+        "frames": detector.stats(),
+        "pipeline": detector.pipeline_stats(),
+        "preview_viewers": detector.preview.viewers,
+    }
+
+
 @router.post(
     "/start",
     summary="Запуск камеры",
-    description="Запускает камеру для определения людей в кадре. Если уже запущена возвращается ошибка",
+    description="Запускает камеру по умолчанию для определения людей в кадре. Если уже запущена возвращается ошибка",
 )
 def start_camera() -> dict[str, str] | None:
-    if detector.running:
-        raise CameraAlreadyRunningException
-    detector.start()
-    return {"status": "Камера запущена"}
+    return start_detector(get_detector_pool().default)
 
 
 @router.post(
     "/stop",
     summary="Остановка камеры",
-    description="Останавливает камеру. Если уже остановлена возвращается ошибка",
+    description="Останавливает камеру по умолчанию. Если уже остановлена возвращается ошибка",
     tags=["Управление камерой"],
 )
 def stop_camera() -> dict[str, str] | None:
-    if not detector.running:
-        raise CameraAlreadyStoppedException
-    detector.stop()
-    return {"status": "Камера остановлена"}
+    return stop_detector(get_detector_pool().default)
+
+
+@router.get(
+    "/status",
+    summary="Состояние камеры",
+    description="Возвращает состояние камеры по умолчанию и счётчики снятых, отброшенных и обработанных кадров",
+)
+def camera_status() -> dict[str, Any]:
+    return detector_status(get_detector_pool().default)
+
+
+@router.get(
+    "/cameras",
+    summary="Список камер",
+    description="Возвращает состояние всех камер из настроек",
+)
+def list_cameras() -> list[dict[str, Any]]:
+    return [detector_status(detector) for detector in get_detector_pool()]
+
+
+@router.post(
+    "/cameras/{camera_id}/start",
+    summary="Запуск камеры по идентификатору",
+    description="Запускает указанную камеру. Если уже запущена возвращается ошибка",
+)
+def start_camera_by_id(camera_id: int) -> dict[str, str] | None:
+    return start_detector(get_detector(camera_id))
+
+
+@router.post(
+    "/cameras/{camera_id}/stop",
+    summary="Остановка камеры по идентификатору",
+    description="Останавливает указанную камеру. Если уже остановлена возвращается ошибка",
+)
+def stop_camera_by_id(camera_id: int) -> dict[str, str] | None:
+    return stop_detector(get_detector(camera_id))
+
+
+@router.get(
+    "/cameras/{camera_id}/status",
+    summary="Состояние камеры по идентификатору",
+    description="Возвращает состояние указанной камеры и счётчики кадров",
+)
+def camera_status_by_id(camera_id: int) -> dict[str, Any]:
+    return detector_status(get_detector(camera_id))
+
+
+@router.get(
+    "/cameras/{camera_id}/preview",
+    summary="Живой просмотр камеры",
+    description="MJPEG-поток (multipart/x-mixed-replace) с рамками области и лиц, "
+    "открывается в <img> браузера. Частота и ширина кадров ограничены настройками "
+    "preview_fps и preview_width; кадр сжимается один раз для всех зрителей, а без "
+    "зрителей не готовится вовсе. Пока камера остановлена, новые кадры не приходят",
+    response_class=StreamingResponse,
+)
+async def camera_preview(camera_id: int) -> StreamingResponse:
+    return StreamingResponse(
+        get_detector(camera_id).preview.stream(),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY}",
+        headers={"Cache-Control": "no-cache, no-store"},
+    )
+
+
+@router.get(
+    "/ready",
+    summary="Готовность конвейера",
+    description="200, когда модели всех камер загружены (а при warmup=camera камеры ещё и "
+    "открыты) и первый кадр не будет ждать их загрузки; до этого 503. В startup — время "
+    "загрузки модели, открытия камеры и от запуска до первого обработанного кадра",
+)
+def readiness(response: Response) -> dict[str, Any]:
+    pool = get_detector_pool()
+    ready = pool.ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "ready": ready,
+        "warmup": pool.settings.warmup,
+        "cameras": [
+            {
+                "camera_id": detector.camera_id,
+                "ready": detector.ready,
+                "running": detector.running,
+                "startup": detector.startup,
+            }
+            for detector in pool
+        ],
+    }
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any
+
+from fastapi import APIRouter, Body
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.core.config import (
+    HOT_RELOAD_FIELDS,
+    Settings,
+    get_settings,
+    restart_required,
+    save_config,
+    set_settings,
+)
+from app.exceptions import UnknownSettingsException
+
+router = APIRouter(tags=["Настройки"])
+
+
+@router.get(
+    "/settings",
+    summary="Текущие настройки",
+    description="Возвращает действующие настройки и поля, которые меняются без перезапуска",
+)
+async def read_settings() -> dict[str, Any]:
+    return {
+        "settings": get_settings().model_dump(),
+        "hot_reload_fields": sorted(HOT_RELOAD_FIELDS),
+    }
+
+
+@router.patch(
+    "/settings",
+    summary="Изменить настройки",
+    description="Проверяет изменения моделью Settings, записывает их в settings.json и "
+    "применяет. Область, пороги, трекинг и темп камер меняются между кадрами без "
+    "перезапуска камеры; модель MediaPipe пересоздаётся только при смене "
+    "face_model_selection. Поля из restart_required вступят в силу после перезапуска",
+)
+async def update_settings(
+    changes: dict[str, Any] = Body(  # noqa: B008
+        ..., examples=[{"x": 120, "face_min_detection_confidence": 0.6}]
+    ),
+) -> dict[str, Any]:
+    unknown = set(changes) - set(Settings.model_fields)
+    if unknown:
+        raise UnknownSettingsException
+    current = get_settings()
+    try:
+        new = Settings.model_validate({**current.model_dump(), **changes})
+    except ValidationError as e:
+        raise RequestValidationError(e.errors()) from e
+
+    save_config(new)
+    # Камера берёт свой lock, который прогрев держит секундами, а остановленная
+    # может пересоздать модель; event loop на это время не блокируется.
+    await asyncio.to_thread(set_settings, new)
+    changed = [
+        name
+        for name in Settings.model_fields
+        if getattr(current, name) != getattr(new, name)
+    ]
+    pending = restart_required(current, new)
+    return {
+        "settings": new.model_dump(),
+        "applied": [name for name in changed if name not in pending],
+        "restart_required": pending,
+    }
@@ -1,6 +1,4 @@
-import json
-
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
 from fastapi.responses import StreamingResponse
 
 from app.core.lifespan import app_state
@@ -8,17 +6,24 @@ from app.core.lifespan import app_state
 router = APIRouter(tags=["SSE"])
 
 
-async def event_generator():
-    while True:
-        event_data = await app_state.event_queue.get()
-        yield f"data: {json.dumps(event_data)}\n\n"
+def parse_last_event_id(last_event_id: str | None) -> int | None:
+    if last_event_id is None or not last_event_id.isdigit():
+        return None
+    return int(last_event_id)
 
 
 @router.get(
     "/events",
     summary="Server-Sent Events",
-    description="Позволяет получать события о новых добавленных фотографиях через SSE (Server-Sent Events)",
+    description="Позволяет получать события о новых добавленных фотографиях через SSE (Server-Sent Events). "
+    "При переподключении с заголовком Last-Event-ID присылает пропущенные события",
     response_class=StreamingResponse,
 )
-async def events() -> StreamingResponse:
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+async def events(
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    return StreamingResponse(
+        app_state.broadcaster.subscribe(parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
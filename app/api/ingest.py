@@ -0,0 +1,41 @@
+import os
+
+from fastapi import APIRouter, status
+
+from app.core.lifespan import app_state
+from app.exceptions import IngestJobNotFoundException, IngestPathNotFoundException
+from app.schemas.ingest import IngestJobOut, IngestRequest
+from app.services.ingestion import IngestOptions
+
+router = APIRouter(tags=["Пакетная обработка"])
+
+
+@router.post(
+    "/ingest",
+    response_model=IngestJobOut,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Обработать записанные видео и изображения",
+    description="Ставит в очередь пакетную обработку файлов на сервере. Найденные лица "
+    "сохраняются так же, как с камеры. Повторный запрос продолжает файлы с места остановки",
+)
+async def start_ingest(request: IngestRequest) -> IngestJobOut:
+    if not all(os.path.exists(path) for path in request.paths):
+        raise IngestPathNotFoundException
+
+    options = IngestOptions(**request.model_dump(exclude={"paths"}))
+    job = app_state.ingest_jobs.submit(request.paths, options)
+    return IngestJobOut(**job.as_dict())
+
+
+@router.get(
+    "/ingest/{job_id}",
+    response_model=IngestJobOut,
+    summary="Состояние пакетной обработки",
+    description="Возвращает статус задания и отчёт: обработано кадров, найдено лиц, "
+    "сохранено вырезок и скорость в кадрах в секунду",
+)
+async def get_ingest(job_id: str) -> IngestJobOut:
+    job = app_state.ingest_jobs.get(job_id)
+    if job is None:
+        raise IngestJobNotFoundException
+    return IngestJobOut(**job.as_dict())
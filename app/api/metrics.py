@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+
+router = APIRouter(tags=["Метрики"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get(
+    "/metrics",
+    summary="Метрики в формате Prometheus",
+    description="Время этапов конвейера детекции, счётчики кадров, обнаружений и "
+    "сохранений, глубина очередей и число клиентов SSE в текстовом формате Prometheus",
+    response_class=PlainTextResponse,
+)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
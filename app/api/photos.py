@@ -1,22 +1,88 @@
+import base64
+import binascii
+import hashlib
+from collections.abc import AsyncIterator, Sequence
+from contextlib import aclosing
 from datetime import datetime, timedelta
 
 import pytz
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.exceptions import InvalidDateRangeException
+from app.core.lifespan import app_state
+from app.exceptions import (
+    DetectionNotFoundException,
+    InvalidCursorException,
+    InvalidDateRangeException,
+    PhashMissingException,
+)
+from app.models.detector import Detection
 from app.repositories.detector import DetectionDAO
-from app.schemas.detector import DetectionOut
+from app.repositories.stats import to_local
+from app.schemas.detector import DetectionOut, SimilarDetectionOut
+from app.services.recent_detections import DetectionRow
 
 router = APIRouter(tags=["Фотографии людей"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(detection: Detection | DetectionRow) -> str:
+    raw = f"{detection.timestamp.isoformat()}|{detection.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, detection_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(detection_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorException from e
+
+
+def set_next_cursor(
+    response: Response,
+    detections: Sequence[Detection | DetectionRow],
+    limit: int | None,
+) -> None:
+    if limit is not None and len(detections) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(detections[-1])
+
+
+def rows_response(
+    request: Request, rows: list[DetectionRow], limit: int | None
+) -> Response:
+    """
+    Склеить готовый JSON обнаружений в ответ с ETag.
+
+    ETag — хеш тела ответа: клиент, опрашивающий один и тот же период,
+    получает 304 без тела, пока в нём не появились и не пропали обнаружения.
+    """
+    body = b"[" + b",".join(row.json for row in rows) + b"]"
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        response = Response(status_code=304, headers=headers)
+    else:
+        response = Response(body, media_type="application/json", headers=headers)
+    set_next_cursor(response, rows, limit)
+    return response
+
 
 @router.get(
     "/humans",
     response_model=list[DetectionOut],
     summary="Получить фотографии людей за определённый период",
-    description="Возвращает список фотографий людей, найденных в определённом временном промежутке",
+    description="Возвращает список фотографий людей, найденных в определённом временном "
+    "промежутке. Последние обнаружения отдаются из памяти; с заголовком If-None-Match "
+    "ответ 304, если список не изменился",
 )
 async def get_detections_by_date(
+    request: Request,
     start: datetime = Query(  # noqa: B008
         default_factory=lambda: (
             datetime.now(pytz.timezone("Europe/Samara")) - timedelta(hours=1)
@@ -31,36 +97,124 @@ async def get_detections_by_date(
         description="Конец временного диапазона. По умолчанию: текущее время",
         example="2025-04-09T15:00:00",
     ),
-) -> list[DetectionOut] | None:
+    camera_id: int | None = Query(
+        None, description="Идентификатор камеры. По умолчанию: все камеры"
+    ),
+    limit: int | None = Query(
+        None, ge=1, le=1000, description="Размер страницы. По умолчанию: без ограничения"
+    ),
+    after: str | None = Query(
+        None, description=f"Курсор следующей страницы из заголовка {NEXT_CURSOR_HEADER}"
+    ),
+) -> Response:
+    start, end = to_local(start), to_local(end)
     if start > end:
         raise InvalidDateRangeException
 
-    detections = await DetectionDAO.get_detections_by_date(start, end)
-
-    return [
-        DetectionOut(
-            id=d.id,
-            timestamp=d.timestamp,
-            image_url=f"http://localhost:5000/saved_photos/{d.image_path.split('/')[-1]}", # type: ignore
+    cursor = decode_cursor(after)
+    rows = await app_state.recent_detections.select(start, end, camera_id, limit, cursor)
+    if rows is None:
+        detections = await DetectionDAO.get_detections_by_date(
+            start, end, camera_id, limit, cursor
         )
-        for d in detections
-    ]
+        rows = [DetectionRow.from_detection(d) for d in detections]
+    return rows_response(request, rows, limit)
 
 
 @router.get(
     "/humans/all",
     response_model=list[DetectionOut],
     summary="Получить все фотографии",
-    description="Возвращает список всех фотографий людей",
+    description="Возвращает список всех фотографий людей. С параметром limit — "
+    f"постранично от новых к старым, курсор следующей страницы в заголовке {NEXT_CURSOR_HEADER}",
 )
-async def get_all_detections() -> list[DetectionOut]:
-    detections = await DetectionDAO.find_all()
-
-    return [
-        DetectionOut(
-            id=d.id,
-            timestamp=d.timestamp,
-            image_url=f"http://localhost:5000/saved_photos/{d.image_path.split('/')[-1]}", # type: ignore
-        )
-        for d in detections
-    ]
+async def get_all_detections(
+    response: Response,
+    limit: int | None = Query(
+        None, ge=1, le=1000, description="Размер страницы. По умолчанию: без ограничения"
+    ),
+    after: str | None = Query(
+        None, description=f"Курсор следующей страницы из заголовка {NEXT_CURSOR_HEADER}"
+    ),
+    camera_id: int | None = Query(
+        None, description="Идентификатор камеры. По умолчанию: все камеры"
+    ),
+) -> list[DetectionOut]:
+    if limit is None and after is None and camera_id is None:
+        detections = await DetectionDAO.find_all()
+    else:
+        detections = await DetectionDAO.get_page(limit, decode_cursor(after), camera_id)
+        set_next_cursor(response, detections, limit)
+
+    return [DetectionOut.from_detection(d) for d in detections]
+
+
+@router.get(
+    "/humans/stream",
+    summary="Потоковая выгрузка фотографий",
+    description="Отдаёт фотографии от новых к старым в формате NDJSON, по одной записи на строку, "
+    "не загружая всю таблицу в память",
+    response_class=StreamingResponse,
+)
+async def stream_detections(
+    start: datetime | None = Query(None, description="Начало временного диапазона"),  # noqa: B008
+    end: datetime | None = Query(None, description="Конец временного диапазона"),  # noqa: B008
+    camera_id: int | None = Query(
+        None, description="Идентификатор камеры. По умолчанию: все камеры"
+    ),
+    after: str | None = Query(
+        None, description="Курсор, с которого продолжить выгрузку"
+    ),
+) -> StreamingResponse:
+    start = to_local(start) if start is not None else None
+    end = to_local(end) if end is not None else None
+    if start is not None and end is not None and start > end:
+        raise InvalidDateRangeException
+
+    cursor = decode_cursor(after)
+
+    async def ndjson_lines() -> AsyncIterator[str]:
+        async with aclosing(
+            DetectionDAO.stream(start, end, camera_id, cursor)
+        ) as detections:
+            async for detection in detections:
+                yield DetectionOut.from_detection(detection).model_dump_json() + "\n"
+
+    # При обрыве соединения Starlette отменяет отправку и бросает генератор
+    # на yield; без явного aclose курсор и соединение чтения из пула
+    # освободились бы только при сборке мусора.
+    lines = ndjson_lines()
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+        background=BackgroundTask(lines.aclose),
+    )
+
+
+@router.get(
+    "/humans/{detection_id}/similar",
+    response_model=list[SimilarDetectionOut],
+    summary="Найти похожие фотографии",
+    description="Возвращает прошлые обнаружения, снимки которых похожи на снимок данного "
+    "по перцептивному хешу, от самых похожих. distance — число различающихся бит из 64",
+)
+async def get_similar_detections(
+    detection_id: int,
+    max_distance: int = Query(
+        8, ge=0, le=15, description="Максимальное расстояние Хэмминга между хешами"
+    ),
+    limit: int = Query(50, ge=1, le=1000, description="Сколько фотографий вернуть"),
+    camera_id: int | None = Query(
+        None, description="Идентификатор камеры. По умолчанию: все камеры"
+    ),
+) -> list[SimilarDetectionOut]:
+    detection = await DetectionDAO.find_one_or_none_by_id(detection_id)
+    if detection is None:
+        raise DetectionNotFoundException
+    if detection.phash is None:
+        raise PhashMissingException
+
+    matches = await DetectionDAO.find_similar(
+        detection.phash, max_distance, limit, exclude_id=detection.id, camera_id=camera_id
+    )
+    return [SimilarDetectionOut.from_match(d, distance) for d, distance in matches]
@@ -0,0 +1,36 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.core.config import get_settings
+from app.core.lifespan import app_state
+
+router = APIRouter(tags=["Очистка"])
+
+
+@router.get(
+    "/retention",
+    summary="Состояние очистки",
+    description="Возвращает правила хранения и отчёт последнего запуска очистки",
+)
+async def get_retention() -> dict[str, Any]:
+    report = app_state.retention.last_report
+    settings = get_settings()
+    return {
+        "enabled": app_state.retention.enabled,
+        "retention_days": settings.retention_days,
+        "retention_max_mb": settings.retention_max_mb,
+        "retention_archive": settings.retention_archive,
+        "last_report": report.as_dict() if report else None,
+    }
+
+
+@router.post(
+    "/retention/run",
+    summary="Запустить очистку",
+    description="Сразу удаляет обнаружения и снимки по правилам хранения и возвращает отчёт: "
+    "сколько записей и файлов удалено, сколько места освобождено на диске и в БД",
+)
+async def run_retention() -> dict[str, Any]:
+    report = await app_state.retention.run_once()
+    return report.as_dict()
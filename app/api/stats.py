@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import pytz
+from fastapi import APIRouter, Query
+
+from app.exceptions import InvalidDateRangeException
+from app.repositories.stats import DetectionCountDAO, Granularity, to_local
+from app.schemas.stats import StatsBucket, StatsOut
+
+router = APIRouter(tags=["Статистика"])
+
+
+@router.get(
+    "/stats",
+    response_model=StatsOut,
+    summary="Число обнаружений по интервалам",
+    description="Возвращает, сколько людей обнаружено за каждую минуту, час или сутки "
+    "диапазона. Считается по сводной таблице, а не по всем обнаружениям",
+)
+async def get_stats(
+    granularity: Granularity = Query(  # noqa: B008
+        "hour", description="Длина интервала: minute, hour или day"
+    ),
+    start: datetime = Query(  # noqa: B008
+        default_factory=lambda: (
+            datetime.now(pytz.timezone("Europe/Samara")) - timedelta(hours=24)
+        ).replace(microsecond=0),
+        description="Начало временного диапазона. По умолчанию: 24 часа назад",
+        example="2025-04-09T00:00:00",
+    ),
+    end: datetime = Query(  # noqa: B008
+        default_factory=lambda: datetime.now(pytz.timezone("Europe/Samara")).replace(
+            microsecond=0
+        ),
+        description="Конец временного диапазона. По умолчанию: текущее время",
+        example="2025-04-10T00:00:00",
+    ),
+    camera_id: int | None = Query(
+        None, description="Идентификатор камеры. По умолчанию: все камеры"
+    ),
+) -> StatsOut:
+    start, end = to_local(start), to_local(end)
+    if start > end:
+        raise InvalidDateRangeException
+
+    counts = await DetectionCountDAO.get_counts(granularity, start, end, camera_id)
+    return StatsOut(
+        granularity=granularity,
+        start=start,
+        end=end,
+        camera_id=camera_id,
+        total=sum(count for _, count in counts),
+        buckets=[StatsBucket(bucket=bucket, count=count) for bucket, count in counts],
+    )
@@ -0,0 +1,60 @@
+import asyncio
+import mimetypes
+import os
+
+from fastapi import APIRouter, Request, Response
+
+from app.exceptions import PhotoNotFoundException
+from app.services.detectors import get_detector_pool
+from app.services.detectors.thumbnails import DerivativeCache
+
+router = APIRouter(tags=["Фотографии людей"])
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def read_thumbnail(
+    cache: DerivativeCache, size: str, name: str
+) -> tuple[str, bytes, os.stat_result] | None:
+    """
+    Путь, содержимое и stat копии снимка; None — нет такого размера или снимка.
+
+    Кэш может вытеснить копию между ``get`` и открытием файла, тогда она
+    создаётся заново. Файл читается целиком через уже открытый дескриптор,
+    чтобы ответ не зависел от того, удалят ли его позже.
+    """
+    for _ in range(2):
+        path = cache.get(size, name)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return path, f.read(), os.fstat(f.fileno())
+        except FileNotFoundError:
+            continue
+    return None
+
+
+@router.api_route(
+    "/thumbnails/{size}/{name}",
+    methods=["GET", "HEAD"],
+    summary="Уменьшенная копия фотографии",
+    description="Возвращает копию снимка нужного размера (thumb, medium или из настроек "
+    "thumbnail_sizes). Копия создаётся при первом запросе, если её ещё нет",
+)
+async def get_thumbnail(size: str, name: str, request: Request) -> Response:
+    cache = get_detector_pool().thumbnails
+    thumbnail = await asyncio.to_thread(read_thumbnail, cache, size, name)
+    if thumbnail is None:
+        raise PhotoNotFoundException
+    path, content, stat = thumbnail
+
+    # Имена снимков уникальны и не переиспользуются, поэтому копию можно
+    # кэшировать навсегда; ETag меняется только при пересоздании файла.
+    etag = f'"{size}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content, media_type=mimetypes.guess_type(path)[0], headers=headers
+    )
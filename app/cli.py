@@ -0,0 +1,170 @@
+"""
+Служебные команды без запуска веб-сервера.
+
+    python -m app.cli ingest footage.mp4 photos/ --full-frame
+    python -m app.cli retention
+    python -m app.cli backfill-stats
+    python -m app.cli backfill-phash
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+import cv2
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.repositories.detector import DetectionDAO
+from app.repositories.stats import DetectionCountDAO
+from app.services.detectors.phash import dhash
+from app.services.detectors.thumbnails import create_thumbnail_cache
+from app.services.ingestion import BatchIngestor, IngestOptions
+from app.services.retention import RetentionWorker
+
+
+def ingest(args: argparse.Namespace) -> None:
+    options = IngestOptions(
+        camera_id=args.camera_id,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        full_frame=args.full_frame,
+        save=not args.dry_run,
+        min_interval_s=args.min_interval,
+        state_path=args.state,
+        restart=args.restart,
+    )
+    report = asyncio.run(BatchIngestor(settings, options).run(args.paths))
+
+    print(json.dumps(report.as_dict(), indent=4, ensure_ascii=False))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report.as_dict(with_frames=True), f, indent=4, ensure_ascii=False)
+
+
+def retention(args: argparse.Namespace) -> None:
+    overrides = {
+        key: value
+        for key, value in {
+            "retention_days": args.days,
+            "retention_max_mb": args.max_mb,
+            "retention_archive": args.archive,
+        }.items()
+        if value is not None
+    }
+    config = settings.model_copy(update=overrides)
+    worker = RetentionWorker(config, create_thumbnail_cache(config))
+    report = asyncio.run(worker.run_once())
+    print(json.dumps(report.as_dict(), indent=4, ensure_ascii=False))
+
+
+def backfill_stats(_args: argparse.Namespace) -> None:
+    total = asyncio.run(DetectionCountDAO.rebuild())
+    print(f"Сводная таблица пересчитана, обнаружений: {total}")
+
+
+async def fill_phashes(batch_size: int) -> tuple[int, int]:
+    """Посчитать хеши снимков, сохранённых до появления колонки phash."""
+    hashed = missing = 0
+    after_id = 0
+    while detections := await DetectionDAO.get_without_phash(after_id, batch_size):
+        after_id = detections[-1].id
+        values = []
+        for detection in detections:
+            image = await asyncio.to_thread(cv2.imread, detection.image_path)
+            if image is None:
+                missing += 1
+                continue
+            values.append({"id": detection.id, "phash": dhash(image)})
+        await DetectionDAO.set_phashes(values)
+        hashed += len(values)
+        logging.info("Посчитано хешей: %s", hashed)
+    return hashed, missing
+
+
+def backfill_phash(args: argparse.Namespace) -> None:
+    hashed, missing = asyncio.run(fill_phashes(args.batch_size))
+    print(f"Посчитано хешей: {hashed}, снимков не найдено на диске: {missing}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_ingest = commands.add_parser(
+        "ingest", help="Обработать записанные видео, изображения и папки с изображениями"
+    )
+    parser_ingest.add_argument("paths", nargs="+", help="Видеофайлы, изображения или папки")
+    parser_ingest.add_argument("--camera-id", type=int, default=0, help="Камера для записей в БД")
+    parser_ingest.add_argument("--chunk-size", type=int, default=64, help="Кадров в одной порции")
+    parser_ingest.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Число процессов, не больше числа ядер; 0 — по числу ядер минус одно",
+    )
+    parser_ingest.add_argument(
+        "--full-frame", action="store_true", help="Искать лица во всём кадре"
+    )
+    parser_ingest.add_argument(
+        "--min-interval",
+        type=float,
+        default=5.0,
+        help="Не чаще одной вырезки за столько секунд видео",
+    )
+    parser_ingest.add_argument(
+        "--state", default="ingest_state.json", help="Файл со смещениями обработанных файлов"
+    )
+    parser_ingest.add_argument(
+        "--restart", action="store_true", help="Начать файлы с начала"
+    )
+    parser_ingest.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Ничего не сохранять, только отчёт — для сравнения детекции на записях",
+    )
+    parser_ingest.add_argument(
+        "--report", help="Записать отчёт с номерами кадров, где найдены лица, в JSON"
+    )
+    parser_ingest.set_defaults(handler=ingest)
+
+    parser_retention = commands.add_parser(
+        "retention", help="Удалить старые обнаружения и снимки по правилам хранения"
+    )
+    parser_retention.add_argument(
+        "--days", type=float, help="Вместо retention_days из настроек"
+    )
+    parser_retention.add_argument(
+        "--max-mb", type=int, help="Вместо retention_max_mb из настроек"
+    )
+    parser_retention.add_argument(
+        "--archive", choices=["none", "tar", "zip"], help="Вместо retention_archive"
+    )
+    parser_retention.set_defaults(handler=retention)
+
+    parser_backfill = commands.add_parser(
+        "backfill-stats",
+        help="Пересчитать статистику /stats по всем обнаружениям; запись в БД на это время "
+        "блокируется",
+    )
+    parser_backfill.set_defaults(handler=backfill_stats)
+
+    parser_phash = commands.add_parser(
+        "backfill-phash", help="Посчитать перцептивные хеши снимков, сохранённых без них"
+    )
+    parser_phash.add_argument(
+        "--batch-size", type=int, default=500, help="Обнаружений в одном UPDATE"
+    )
+    parser_phash.set_defaults(handler=backfill_phash)
+    return parser
+
+
+def main() -> None:
+    setup_logging()
+    args = build_parser().parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
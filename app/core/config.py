@@ -1,6 +1,26 @@
 import json
+import os
+from collections.abc import Callable
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+
+class CameraSettings(BaseModel):
+    id: int = Field(ge=0, description="Идентификатор камеры в API и в базе данных")
+    camera_index: Annotated[int, Field(ge=0)] | str = Field(
+        0, description="Индекс устройства или путь/URL видеопотока для cv2.VideoCapture"
+    )
+    x: int | None = Field(None, ge=0, description="X-координата области для этой камеры")
+    y: int | None = Field(None, ge=0, description="Y-координата области для этой камеры")
+    width: int | None = Field(None, gt=0, description="Ширина области для этой камеры")
+    height: int | None = Field(None, gt=0, description="Высота области для этой камеры")
+    face_model_selection: int | None = Field(
+        None, ge=0, le=1, description="Модель распознавания для этой камеры"
+    )
+    face_min_detection_confidence: float | None = Field(
+        None, ge=0.0, le=1.0, description="Порог confidence для этой камеры"
+    )
 
 
 class Settings(BaseModel):
@@ -18,16 +38,364 @@ class Settings(BaseModel):
         description="Минимальное значение confidence для фиксации лица",
     )
     save_path: str = Field("saved_photos", description="Путь для сохранения фото")
-    show_camera: bool = Field(
-        False, description="Включение/выключение 'debug' окна opencv камеры"
+    capture_mode: Literal["sync", "latest"] = Field(
+        "latest",
+        description="Захват кадров: sync — чтение в потоке детектора, "
+        "latest — отдельный поток захвата, детектор берёт только свежий кадр",
+    )
+    capture_buffer_size: int = Field(
+        1, ge=1, le=8, description="Размер кольцевого буфера кадров в режиме latest"
+    )
+    camera_open_attempts: int = Field(
+        5, ge=1, description="Сколько раз пытаться открыть камеру при запуске"
+    )
+    camera_open_retry_s: float = Field(
+        0.5, ge=0.0, description="Пауза между попытками открыть камеру, секунды"
+    )
+    inference_backend: Literal["inline", "process"] = Field(
+        "inline",
+        description="Где выполняется детекция лиц: inline — в потоке камеры, "
+        "process — в пуле процессов с передачей кадров через shared memory",
+    )
+    inference_workers: int = Field(
+        0, ge=0, description="Число процессов детекции, 0 — по числу ядер минус одно"
+    )
+    inference_width: Literal[0] | Annotated[int, Field(ge=128)] = Field(
+        0,
+        description="Верхняя граница ширины изображения для детекции лиц: более "
+        "широкая область уменьшается в 2, 4, 8... раз, пока не станет не шире неё, "
+        "поэтому модель может видеть изображение почти вдвое уже (1300 px при 640 — "
+        "325 px); рамки пересчитываются в пиксели области. 0 — полный размер, иначе "
+        "не меньше 128 — входа модели MediaPipe",
+    )
+    warmup: Literal["none", "model", "camera"] = Field(
+        "model",
+        description="Прогрев после запуска сервера в фоне: model — загрузить модель, "
+        "camera — ещё и открыть камеры; none — всё при первом /start",
+    )
+    motion_gating: bool = Field(
+        True, description="Запускать детекцию лиц только при движении в области"
+    )
+    motion_threshold: float = Field(
+        0.01,
+        ge=0.0,
+        le=1.0,
+        description="Доля изменившихся пикселей области, считающаяся движением",
+    )
+    motion_pixel_threshold: int = Field(
+        25, ge=1, le=255, description="Порог изменения яркости пикселя относительно фона"
+    )
+    motion_keepalive_s: float = Field(
+        1.0,
+        ge=0.0,
+        description="Запускать детекцию хотя бы раз в столько секунд даже без движения",
+    )
+    motion_downscale_width: int = Field(
+        160, ge=16, description="Ширина уменьшенной копии области для оценки движения"
+    )
+    track_iou_threshold: float = Field(
+        0.3,
+        gt=0.0,
+        le=1.0,
+        description="Минимальное пересечение рамок (IoU), чтобы считать их одним лицом",
+    )
+    track_ttl_s: float = Field(
+        1.0, gt=0.0, description="Через сколько секунд без подтверждения лицо считается ушедшим"
+    )
+    track_min_hits: int = Field(
+        3, ge=1, description="Сколько детекций нужно лицу, чтобы его снимок сохранился"
+    )
+    track_save_after_s: float = Field(
+        5.0,
+        ge=0.0,
+        description="Сохранить лучший снимок лица, которое в кадре дольше стольких секунд; "
+        "ушедшее раньше лицо сохраняется сразу",
+    )
+    track_detect_every: int = Field(
+        3,
+        ge=1,
+        description="Пока лица в кадре, полная детекция на каждом N-м кадре, "
+        "между ними рамки сдвигаются по шаблону; 1 — детекция на каждом кадре",
+    )
+    track_match_threshold: float = Field(
+        0.6,
+        ge=0.0,
+        le=1.0,
+        description="Минимальное сходство шаблона лица, чтобы сдвинуть рамку без детекции",
+    )
+    dedup_window_s: float = Field(
+        60.0,
+        ge=0.0,
+        description="Сравнивать новую вырезку со снимками за столько секунд; 0 — не отсеивать",
+    )
+    dedup_max_distance: int = Field(
+        6,
+        ge=0,
+        le=32,
+        description="Вырезка, отличающаяся от недавней не больше чем на столько бит "
+        "перцептивного хеша, не сохраняется",
+    )
+    idle_fps: float = Field(
+        5.0,
+        ge=0.0,
+        description="Темп обработки кадров, пока лиц нет; 0 — без ограничения. "
+        "Ограничение темпа рассчитано на capture_mode=latest",
+    )
+    active_fps: float = Field(
+        15.0,
+        ge=0.0,
+        description="Темп обработки в течение active_hold_s после появления лица",
+    )
+    confirm_fps: float = Field(
+        0.0,
+        ge=0.0,
+        description="Темп в окне подтверждения лица перед сохранением; 0 — максимальный",
+    )
+    active_hold_s: float = Field(
+        5.0, ge=0.0, description="Сколько секунд держать active_fps после лица в кадре"
+    )
+    read_backoff_max_s: float = Field(
+        2.0, gt=0.0, description="Максимальная пауза между повторами при ошибках чтения кадра"
+    )
+    db_batch_size: int = Field(
+        50, ge=1, le=1000, description="Сколько обнаружений записывать в БД одним INSERT"
+    )
+    db_flush_interval_ms: int = Field(
+        500,
+        ge=0,
+        description="Максимальная задержка записи обнаружений в БД, миллисекунды",
+    )
+    db_journal_mode: Literal["wal", "delete"] = Field(
+        "wal",
+        description="Журнал SQLite: wal — чтение не ждёт записи, delete — журнал отката",
+    )
+    db_synchronous: Literal["off", "normal", "full"] = Field(
+        "normal",
+        description="PRAGMA synchronous: с WAL normal не теряет целостность при сбое",
+    )
+    db_mmap_mb: int = Field(
+        64, ge=0, description="Сколько МБ базы читать через mmap, 0 — не использовать"
+    )
+    db_cache_mb: int = Field(16, ge=1, description="Кэш страниц SQLite на соединение, МБ")
+    db_busy_timeout_ms: int = Field(
+        5000, ge=0, description="Сколько ждать освобождения блокировки базы, миллисекунды"
+    )
+    db_read_pool_size: int = Field(
+        4, ge=1, description="Соединений для чтения, запись всегда идёт через одно"
+    )
+    image_format: Literal["jpg", "webp"] = Field(
+        "jpg", description="Формат сохраняемых снимков"
+    )
+    image_quality: int = Field(
+        90, ge=1, le=100, description="Качество JPEG/WebP сохраняемых снимков"
+    )
+    image_writer_workers: int = Field(
+        2, ge=1, description="Число потоков кодирования и записи снимков"
+    )
+    image_writer_queue_size: int = Field(
+        8, ge=1, description="Сколько снимков может ждать записи на диск"
+    )
+    image_writer_policy: Literal["drop", "block"] = Field(
+        "drop",
+        description="При заполненной очереди записи: drop — отбросить снимок, "
+        "block — ждать в потоке детектора",
+    )
+    thumbnail_path: str = Field(
+        "thumbnails", description="Папка для уменьшенных копий снимков"
     )
+    thumbnail_sizes: dict[str, int] = Field(
+        default_factory=lambda: {"thumb": 320, "medium": 640},
+        description="Размеры уменьшенных копий: имя → ширина в пикселях",
+    )
+    thumbnail_quality: int = Field(
+        80, ge=1, le=100, description="Качество JPEG/WebP уменьшенных копий"
+    )
+    thumbnail_cache_max_mb: int = Field(
+        256, ge=1, description="Максимальный объём уменьшенных копий на диске, МБ"
+    )
+    thumbnail_on_write: bool = Field(
+        True,
+        description="Создавать уменьшенные копии сразу при сохранении снимка, "
+        "иначе при первом запросе",
+    )
+    clip_enabled: bool = Field(
+        False,
+        description="Записывать видеофрагмент вокруг каждого обнаружения; поток "
+        "детектора сжимает кадры в JPEG с частотой clip_fps",
+    )
+    clip_path: str = Field("clips", description="Папка для видеофрагментов")
+    clip_pre_s: float = Field(
+        5.0, ge=0.0, description="Сколько секунд до обнаружения включать во фрагмент"
+    )
+    clip_post_s: float = Field(
+        5.0, ge=0.0, description="Сколько секунд после обнаружения включать во фрагмент"
+    )
+    clip_max_s: float = Field(
+        30.0,
+        gt=0.0,
+        description="Максимальная длина фрагмента, когда в него попадают несколько "
+        "обнаружений подряд, секунды",
+    )
+    clip_fps: float = Field(
+        10.0, gt=0.0, le=60.0, description="Частота кадров во фрагменте"
+    )
+    clip_buffer_mb: int = Field(
+        16, ge=1, description="Объём кольцевого буфера кадров JPEG на камеру, МБ"
+    )
+    clip_quality: int = Field(
+        70, ge=1, le=100, description="Качество JPEG кадров в кольцевом буфере"
+    )
+    clip_codec: str = Field(
+        "mp4v",
+        min_length=4,
+        max_length=4,
+        description="FourCC кодека MP4; avc1 (H.264), если OpenCV собран с ним",
+    )
+    clip_queue_size: int = Field(
+        4, ge=1, description="Сколько фрагментов может ждать записи, лишние отбрасываются"
+    )
+    preview_fps: float = Field(
+        10.0,
+        gt=0.0,
+        le=30.0,
+        description="Частота кадров живого просмотра, не зависит от темпа детекции",
+    )
+    preview_width: int = Field(
+        640, ge=64, description="Ширина кадра живого просмотра, более широкие уменьшаются"
+    )
+    preview_quality: int = Field(
+        70, ge=1, le=100, description="Качество JPEG кадров живого просмотра"
+    )
+    retention_days: float = Field(
+        0.0, ge=0.0, description="Удалять обнаружения и снимки старше стольких дней, 0 — хранить всё"
+    )
+    retention_max_mb: int = Field(
+        0, ge=0, description="Максимальный объём папки снимков, МБ; 0 — без ограничения"
+    )
+    retention_interval_s: float = Field(
+        3600.0, gt=0.0, description="Как часто запускать очистку, секунды"
+    )
+    retention_batch_size: int = Field(
+        500, ge=1, le=5000, description="Сколько записей удалять за один DELETE"
+    )
+    retention_archive: Literal["none", "tar", "zip"] = Field(
+        "none",
+        description="Перед удалением складывать снимки в архив: tar — tar.gz, zip — zip",
+    )
+    retention_archive_path: str = Field("archive", description="Папка для архивов снимков")
+    retention_vacuum_pages: int = Field(
+        0,
+        ge=0,
+        description="Сколько свободных страниц БД возвращать за запуск, 0 — все",
+    )
+    sse_queue_size: int = Field(
+        100,
+        ge=1,
+        description="Очередь событий SSE на клиента, при переполнении вытесняются старые",
+    )
+    sse_replay_size: int = Field(
+        256, ge=0, description="Сколько последних событий хранить для Last-Event-ID"
+    )
+    sse_heartbeat_s: float = Field(
+        15.0, gt=0, description="Интервал комментариев-heartbeat в потоке SSE, секунды"
+    )
+    recent_cache_s: float = Field(
+        7200.0,
+        ge=0.0,
+        description="Обнаружения за сколько последних секунд держать в памяти для /humans, "
+        "0 — всегда читать из БД",
+    )
+    recent_cache_max_rows: int = Field(
+        20000, ge=1, description="Максимальное число обнаружений в памяти для /humans"
+    )
+    settings_watch: bool = Field(
+        True, description="Применять изменения settings.json без перезапуска"
+    )
+    settings_poll_interval_s: float = Field(
+        1.0,
+        gt=0.0,
+        description="Как часто проверять settings.json, если inotify недоступен, секунды",
+    )
+    cameras: list[CameraSettings] = Field(
+        default_factory=list,
+        description="Камеры со своими областями и порогами. "
+        "Пустой список — одна камера 0 с настройками верхнего уровня",
+    )
+
+    @model_validator(mode="after")
+    def check_unique_camera_ids(self) -> "Settings":
+        ids = [camera.id for camera in self.cameras]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Идентификаторы камер должны быть уникальными")
+        return self
+
+    def camera_list(self) -> list[CameraSettings]:
+        return self.cameras or [CameraSettings(id=0)]
+
+    def for_camera(self, camera: CameraSettings) -> "Settings":
+        """Настройки верхнего уровня с переопределениями конкретной камеры."""
+        overrides = camera.model_dump(
+            exclude_none=True, exclude={"id", "camera_index"}
+        )
+        return self.model_copy(update={**overrides, "cameras": []})
 
 
-def load_config(config_path: str = "settings.json") -> Settings:
+CONFIG_PATH = "settings.json"
+
+# Поля, которые применяются на работающих камерах без перезапуска: их читает
+# цикл детекции между кадрами или фоновая очистка перед каждым запуском.
+# Остальные поля сохраняются, но действуют только после перезапуска.
+HOT_RELOAD_FIELDS = frozenset(
+    {
+        "x",
+        "y",
+        "width",
+        "height",
+        "face_model_selection",
+        "face_min_detection_confidence",
+        "inference_width",
+        "motion_gating",
+        "motion_threshold",
+        "motion_pixel_threshold",
+        "motion_keepalive_s",
+        "motion_downscale_width",
+        "track_iou_threshold",
+        "track_ttl_s",
+        "track_min_hits",
+        "track_save_after_s",
+        "track_detect_every",
+        "track_match_threshold",
+        "dedup_window_s",
+        "dedup_max_distance",
+        "idle_fps",
+        "active_fps",
+        "confirm_fps",
+        "active_hold_s",
+        "read_backoff_max_s",
+        "preview_fps",
+        "preview_width",
+        "preview_quality",
+        "retention_days",
+        "retention_max_mb",
+        "retention_interval_s",
+        "retention_batch_size",
+        "retention_archive",
+        "retention_archive_path",
+        "retention_vacuum_pages",
+        "settings_poll_interval_s",
+    }
+)
+
+
+def read_config(config_path: str = CONFIG_PATH) -> Settings:
+    """Прочитать и проверить файл настроек; ошибки разбора не перехватываются."""
+    with open(config_path) as f:
+        return Settings.model_validate(json.load(f))
+
+
+def load_config(config_path: str = CONFIG_PATH) -> Settings:
     try:
-        with open(config_path) as f:
-            raw_config = json.load(f)
-            return Settings.model_validate(raw_config)
+        return read_config(config_path)
     except FileNotFoundError:
         default_config = Settings()  # type: ignore
         with open(config_path, "w") as f:
@@ -35,8 +403,69 @@ def load_config(config_path: str = "settings.json") -> Settings:
         return default_config
 
 
+def save_config(config: Settings, config_path: str = CONFIG_PATH) -> None:
+    """Записать настройки во временный файл и атомарно заменить им файл настроек."""
+    tmp_path = f"{config_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(config.model_dump(), f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, config_path)
+
+
+def hot_reload(current: Settings, new: Settings) -> Settings:
+    """
+    Настройки, с которыми продолжают работать запущенные компоненты: поля из
+    ``HOT_RELOAD_FIELDS`` и переопределения камер берутся из ``new``, остальные
+    остаются прежними до перезапуска.
+    """
+    update = {name: getattr(new, name) for name in HOT_RELOAD_FIELDS}
+    return current.model_copy(update={**update, "cameras": new.cameras})
+
+
+def restart_required(old: Settings, new: Settings) -> list[str]:
+    """Изменённые поля, которые вступят в силу только после перезапуска."""
+    fields = [
+        name
+        for name in Settings.model_fields
+        if name not in HOT_RELOAD_FIELDS
+        and name != "cameras"
+        and getattr(old, name) != getattr(new, name)
+    ]
+    # Области и пороги камер применяются сразу, состав камер и устройства — нет.
+    old_cameras = {(c.id, c.camera_index) for c in old.camera_list()}
+    if old_cameras != {(c.id, c.camera_index) for c in new.camera_list()}:
+        fields.append("cameras")
+    return fields
+
+
 settings = load_config()
 
+_current = settings
+_subscribers: list[Callable[[Settings], None]] = []
+
+
+def get_settings() -> Settings:
+    """
+    Действующие настройки.
+
+    Модуль ``settings`` — снимок на момент запуска; всё, что должно видеть
+    изменения из PATCH /settings и settings.json, читает настройки здесь
+    или подписывается через ``subscribe``.
+    """
+    return _current
+
+
+def subscribe(callback: Callable[[Settings], None]) -> None:
+    """Вызывать ``callback`` с новыми настройками после каждого их изменения."""
+    _subscribers.append(callback)
+
+
+def set_settings(new: Settings) -> None:
+    """Заменить действующие настройки и оповестить подписчиков."""
+    global _current  # noqa: PLW0603
+    _current = new
+    for callback in _subscribers:
+        callback(new)
+
 
 if __name__ == "__main__":
     settings = load_config()
@@ -1,15 +1,34 @@
 import asyncio
 from contextlib import asynccontextmanager
-from typing import Any
 
 from fastapi import FastAPI
 
-from app.services.detectors import detector
+from app.core.config import CONFIG_PATH, settings, subscribe
+from app.database.core import dispose_engines
+from app.services.broadcaster import EventBroadcaster
+from app.services.detectors import get_detector_pool
+from app.services.ingestion import IngestJobs
+from app.services.recent_detections import RecentDetections
+from app.services.retention import RetentionWorker
+from app.services.settings_watcher import SettingsWatcher
 
 
 class State:
     def __init__(self) -> None:
-        self.event_queue: asyncio.Queue[Any] = asyncio.Queue()
+        self.broadcaster = EventBroadcaster(
+            queue_size=settings.sse_queue_size,
+            replay_size=settings.sse_replay_size,
+            heartbeat_s=settings.sse_heartbeat_s,
+        )
+        self.recent_detections = RecentDetections(
+            settings.recent_cache_s, settings.recent_cache_max_rows
+        )
+        self.ingest_jobs = IngestJobs()
+        self.ingest_jobs.on_written = self.recent_detections.refresh
+        # Кэш уменьшенных копий общий с пулом камер, передаётся в lifespan.
+        self.retention = RetentionWorker(settings, recent=self.recent_detections)
+        self.settings_watcher = SettingsWatcher(CONFIG_PATH)
+        self.warmup: asyncio.Future[None] | None = None
         self.detector_loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
 
 
@@ -18,6 +37,39 @@ app_state = State()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    detector.event_queue = app_state.event_queue  # type: ignore
-    detector.loop = app_state.detector_loop  # type: ignore
+    detector_pool = get_detector_pool()
+    # Цикл, созданный при импорте, uvicorn не запускает: детекторы сохраняют
+    # обнаружения и публикуют события через цикл, в котором работает сервер.
+    app_state.detector_loop = asyncio.get_running_loop()
+    detector_pool.bind(app_state.broadcaster, app_state.detector_loop)
+    # Кэш /humans обновляется после сброса буферов, в которые пишут детекторы.
+    for detector in detector_pool:
+        detector.detection_saver.write_buffer.on_written = (
+            app_state.recent_detections.refresh
+        )
+    app_state.retention.thumbnails = detector_pool.thumbnails
+    subscribe(detector_pool.apply_settings)
+    # Настройки применяются в рабочем потоке, а очистка запускает задачу
+    # asyncio, поэтому её подписка выполняется в цикле сервера.
+    subscribe(
+        lambda new: app_state.detector_loop.call_soon_threadsafe(
+            app_state.retention.apply_settings, new
+        )
+    )
+    app_state.retention.start()
+    app_state.settings_watcher.start()
+    if detector_pool.settings.warmup != "none":
+        # Сервер отвечает сразу, модели и камеры догружаются в фоне; /ready
+        # показывает, когда прогрев закончен.
+        app_state.warmup = asyncio.ensure_future(
+            asyncio.to_thread(detector_pool.warm_up)
+        )
     yield
+    if app_state.warmup is not None:
+        await app_state.warmup
+    await app_state.settings_watcher.stop()
+    await app_state.retention.stop()
+    await app_state.ingest_jobs.cancel_all()
+    await asyncio.to_thread(detector_pool.close)
+    await detector_pool.write_buffer.flush()
+    await dispose_engines()
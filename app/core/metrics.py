@@ -0,0 +1,194 @@
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+# Границы корзин в секундах: от 0.1 мс до 2.5 с.
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+
+class Counter:
+    """Монотонный счётчик; с ``function`` значение читается из неё при выгрузке."""
+
+    def __init__(self, function: Callable[[], float] | None = None) -> None:
+        self.value = 0
+        self.function = function
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+    def get(self) -> float:
+        return self.function() if self.function else self.value
+
+
+class Gauge:
+    """Текущее значение; с ``function`` значение читается из неё при выгрузке."""
+
+    def __init__(self, function: Callable[[], float] | None = None) -> None:
+        self.value = 0.0
+        self.function = function
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def get(self) -> float:
+        return self.function() if self.function else self.value
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами.
+
+    Наблюдение — поиск корзины и три сложения над заранее выделенным списком,
+    без аллокаций и блокировок. Пишет в гистограмму один поток, читатели
+    получают согласованный с точностью до одного наблюдения снимок.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        # Последняя корзина (+Inf) не перебирается: выше неё границы нет.
+        for bound, count in zip(self.buckets, self.counts[:-1], strict=True):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+        }
+
+
+Metric = Counter | Gauge | Histogram
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class _Family:
+    kind: str
+    help_text: str
+    children: dict[Labels, Metric] = field(default_factory=dict)
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик с выгрузкой в текстовом формате Prometheus.
+
+    Метрики регистрируются один раз при создании компонентов; на горячем пути
+    компоненты обновляют уже созданные объекты напрямую. Повторная
+    регистрация с тем же именем и метками заменяет прежнюю метрику.
+    """
+
+    def __init__(self) -> None:
+        self._families: dict[str, _Family] = {}
+
+    def counter(
+        self,
+        name: str,
+        help_text: str,
+        labels: dict[str, Any] | None = None,
+        function: Callable[[], float] | None = None,
+    ) -> Counter:
+        return self._register(name, "counter", help_text, labels, Counter(function))
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        labels: dict[str, Any] | None = None,
+        function: Callable[[], float] | None = None,
+    ) -> Gauge:
+        return self._register(name, "gauge", help_text, labels, Gauge(function))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: dict[str, Any] | None = None,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(name, "histogram", help_text, labels, Histogram(buckets))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name, family in self._families.items():
+            lines.append(f"# HELP {name} {family.help_text}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for labels, metric in list(family.children.items()):
+                if isinstance(metric, Histogram):
+                    lines.extend(self._render_histogram(name, labels, metric))
+                else:
+                    value = _format_value(metric.get())
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _render_histogram(
+        self, name: str, labels: Labels, histogram: Histogram
+    ) -> list[str]:
+        lines = []
+        cumulative = 0
+        counts = list(histogram.counts)
+        for bound, count in zip((*histogram.buckets, float("inf")), counts, strict=True):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+    def _register(self, name, kind, help_text, labels, metric):
+        family = self._families.setdefault(name, _Family(kind, help_text))
+        key = tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+        family.children[key] = metric
+        return metric
+
+
+registry = MetricsRegistry()
@@ -1,5 +1,68 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import os
+from typing import Any
 
-DATABASE_URL = "sqlite+aiosqlite:///./database.db"
-engine = create_async_engine(DATABASE_URL, echo=False)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.core.config import Settings, settings
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./database.db")
+
+
+def set_pragmas(config: Settings, read_only: bool = False) -> Any:
+    """
+    Обработчик события connect, настраивающий каждое новое соединение SQLite.
+
+    journal_mode хранится в самом файле базы, остальные прагмы действуют
+    только на соединение, поэтому выполняются при каждом подключении.
+    Журнал задаётся и для чтения: приложение может начать работу с запросов
+    галереи, не открыв ни одного соединения для записи.
+    """
+
+    def on_connect(dbapi_connection: Any, _connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode = {config.db_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {config.db_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout = {config.db_busy_timeout_ms}")
+        cursor.execute(f"PRAGMA cache_size = -{config.db_cache_mb * 1024}")
+        cursor.execute(f"PRAGMA mmap_size = {config.db_mmap_mb * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+    return on_connect
+
+
+def create_engines(url: str, config: Settings) -> tuple[AsyncEngine, AsyncEngine]:
+    """
+    Создать движки для записи и для чтения.
+
+    SQLite допускает только одного писателя, поэтому у движка записи одно
+    соединение: транзакции приложения встают в очередь пула, а не ловят
+    SQLITE_BUSY. Чтение идёт через отдельный пул и в режиме WAL не ждёт
+    записи, а видит последнее зафиксированное состояние базы.
+    """
+    write_engine = create_async_engine(url, echo=False, pool_size=1, max_overflow=0)
+    read_engine = create_async_engine(
+        url, echo=False, pool_size=config.db_read_pool_size, max_overflow=0
+    )
+    event.listen(write_engine.sync_engine, "connect", set_pragmas(config))
+    event.listen(
+        read_engine.sync_engine, "connect", set_pragmas(config, read_only=True)
+    )
+    return write_engine, read_engine
+
+
+engine, read_engine = create_engines(DATABASE_URL, settings)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+async_read_session_maker = async_sessionmaker(read_engine, expire_on_commit=False)
+
+
+async def dispose_engines() -> None:
+    await engine.dispose()
+    await read_engine.dispose()
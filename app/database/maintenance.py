@@ -0,0 +1,45 @@
+import logging
+
+from app.database.core import engine
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+async def enable_incremental_vacuum() -> None:
+    """
+    Перевести базу в режим auto_vacuum=INCREMENTAL.
+
+    Режим применяется только после полного VACUUM, поэтому он выполняется
+    один раз, при первом вызове на базе в другом режиме.
+    """
+    async with engine.connect() as connection:
+        conn = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        mode = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        if mode == AUTO_VACUUM_INCREMENTAL:
+            return
+        logger.info("Перевод базы в режим incremental auto_vacuum, выполняется VACUUM")
+        await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+
+
+async def incremental_vacuum(pages: int = 0) -> int:
+    """
+    Вернуть файловой системе свободные страницы базы.
+
+    :param pages: Сколько страниц освободить за раз, 0 — все свободные.
+    :return: Сколько байт освобождено.
+    """
+    async with engine.connect() as connection:
+        conn = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        page_size = (await conn.exec_driver_sql("PRAGMA page_size")).scalar()
+        before = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+        # Прагма освобождает по странице на шаг, а execute() в sqlite3 делает
+        # у запроса без колонок только один шаг; executescript доводит до конца.
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.executescript(  # type: ignore
+            f"PRAGMA incremental_vacuum({int(pages)});"
+        )
+        after = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+        return (before - after) * page_size
@@ -12,3 +12,35 @@ InvalidDateRangeException = HTTPException(
     status_code=status.HTTP_400_BAD_REQUEST,
     detail="Ошибка: параметр 'start' не может быть позже 'end'.",
 )
+CameraNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Ошибка: Камера с таким идентификатором не найдена",
+)
+InvalidCursorException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Ошибка: некорректное значение параметра 'after'.",
+)
+IngestJobNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Ошибка: задание обработки с таким идентификатором не найдено",
+)
+IngestPathNotFoundException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Ошибка: файл или папка для обработки не найдены",
+)
+PhotoNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Ошибка: фотография не найдена",
+)
+DetectionNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Ошибка: обнаружение с таким идентификатором не найдено",
+)
+PhashMissingException = HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail="Ошибка: у снимка нет перцептивного хеша, выполните python -m app.cli backfill-phash",
+)
+UnknownSettingsException = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    detail="Ошибка: в запросе есть поля, которых нет в настройках",
+)
@@ -1,10 +1,23 @@
+import os
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
+from app.api import (
+    camera,
+    configuration,
+    events,
+    ingest,
+    metrics,
+    photos,
+    retention,
+    static,
+    stats,
+    thumbnails,
+)
 from app.core.config import settings
 from app.core.lifespan import lifespan
 from app.core.logging_config import setup_logging
-from app.api import camera, events, photos, static
 
 setup_logging()
 
@@ -18,9 +31,19 @@ app = FastAPI(
 )
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
+# Пул камер создаётся лениво, а StaticFiles нужны готовые папки.
+os.makedirs(settings.save_path, exist_ok=True)
 app.mount("/saved_photos", StaticFiles(directory=settings.save_path), name="photos")
+os.makedirs(settings.clip_path, exist_ok=True)
+app.mount("/clips", StaticFiles(directory=settings.clip_path), name="clips")
 
 app.include_router(static.router)
 app.include_router(camera.router)
 app.include_router(photos.router)
+app.include_router(thumbnails.router)
 app.include_router(events.router)
+app.include_router(metrics.router)
+app.include_router(ingest.router)
+app.include_router(retention.router)
+app.include_router(stats.router)
+app.include_router(configuration.router)
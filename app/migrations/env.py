@@ -4,7 +4,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
-from app.database.core import Base
+from app.database.base import Base
 from app.models.detector import Detection
 
 # this is the Alembic Config object, which provides
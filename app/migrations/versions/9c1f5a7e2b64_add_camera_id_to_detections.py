@@ -0,0 +1,35 @@
+"""Add camera_id to detections
+
+Revision ID: 9c1f5a7e2b64
+Revises: 4e3b8ce5f3d0
+Create Date: 2026-10-18 10:12:40.512337
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c1f5a7e2b64"
+down_revision: Union[str, None] = "4e3b8ce5f3d0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "detections",
+        sa.Column("camera_id", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        op.f("ix_detections_camera_id"), "detections", ["camera_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_detections_camera_id"), table_name="detections")
+    with op.batch_alter_table("detections") as batch_op:
+        batch_op.drop_column("camera_id")
@@ -0,0 +1,34 @@
+"""Create detectioncounts table
+
+Revision ID: b7d2e4f1a9c3
+Revises: 9c1f5a7e2b64
+Create Date: 2026-10-18 16:40:12.204518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d2e4f1a9c3"
+down_revision: Union[str, None] = "9c1f5a7e2b64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "detectioncounts",
+        sa.Column("granularity", sa.String(), nullable=False),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("camera_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("granularity", "bucket", "camera_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("detectioncounts")
@@ -0,0 +1,40 @@
+"""Add phash to detections
+
+Revision ID: d41c7a9e3f58
+Revises: b7d2e4f1a9c3
+Create Date: 2026-10-18 17:05:31.918204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d41c7a9e3f58"
+down_revision: Union[str, None] = "b7d2e4f1a9c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BANDS = 4
+BAND_BITS = 16
+
+
+def upgrade() -> None:
+    op.add_column("detections", sa.Column("phash", sa.BigInteger(), nullable=True))
+    for band in range(BANDS):
+        op.create_index(
+            f"ix_detections_phash_band{band}",
+            "detections",
+            [sa.text(f"(phash >> {band * BAND_BITS}) & {(1 << BAND_BITS) - 1}")],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    for band in range(BANDS):
+        op.drop_index(f"ix_detections_phash_band{band}", table_name="detections")
+    with op.batch_alter_table("detections") as batch_op:
+        batch_op.drop_column("phash")
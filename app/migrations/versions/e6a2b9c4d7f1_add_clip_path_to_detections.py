@@ -0,0 +1,42 @@
+"""Add clip_path to detections
+
+Revision ID: e6a2b9c4d7f1
+Revises: d41c7a9e3f58
+Create Date: 2026-10-18 19:42:07.261845
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6a2b9c4d7f1"
+down_revision: Union[str, None] = "d41c7a9e3f58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Индексы по полосам phash из d41c7a9e3f58: batch-режим пересоздаёт таблицу
+# и теряет индексы по выражениям, поэтому они пересоздаются вручную.
+BANDS = 4
+BAND_BITS = 16
+
+
+def upgrade() -> None:
+    op.add_column("detections", sa.Column("clip_path", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    for band in range(BANDS):
+        op.drop_index(f"ix_detections_phash_band{band}", table_name="detections")
+    with op.batch_alter_table("detections") as batch_op:
+        batch_op.drop_column("clip_path")
+    for band in range(BANDS):
+        op.create_index(
+            f"ix_detections_phash_band{band}",
+            "detections",
+            [sa.text(f"(phash >> {band * BAND_BITS}) & {(1 << BAND_BITS) - 1}")],
+            unique=False,
+        )
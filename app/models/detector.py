@@ -1,13 +1,30 @@
 from datetime import datetime
 
 import pytz
-from sqlalchemy import TIMESTAMP
+from sqlalchemy import TIMESTAMP, BigInteger, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database.base import Base
 
+# Мультииндекс перцептивного хеша: четыре индекса по 16-битным полосам. У хешей
+# на расстоянии Хэмминга d хотя бы одна полоса отличается не больше чем на d // 4
+# бит, поэтому поиск похожих — несколько точечных запросов к индексам.
+PHASH_BANDS = 4
+PHASH_BAND_BITS = 16
+
+
+def phash_band(band: int) -> str:
+    """Выражение полосы хеша, совпадающее с выражением её индекса."""
+    shift = band * PHASH_BAND_BITS
+    return f"(phash >> {shift}) & {(1 << PHASH_BAND_BITS) - 1}"
+
 
 class Detection(Base):
+    __table_args__ = tuple(
+        Index(f"ix_detections_phash_band{band}", text(phash_band(band)))
+        for band in range(PHASH_BANDS)
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
@@ -15,7 +32,25 @@ class Detection(Base):
         index=True,
     )
     image_path: Mapped[str]
+    camera_id: Mapped[int] = mapped_column(default=0, server_default="0", index=True)
     x: Mapped[int]
     y: Mapped[int]
     width: Mapped[int]
     height: Mapped[int]
+    phash: Mapped[int | None] = mapped_column(BigInteger)
+    # Видеофрагмент вокруг обнаружения; один фрагмент может относиться к нескольким.
+    clip_path: Mapped[str | None]
+
+
+class DetectionCount(Base):
+    """
+    Число обнаружений за минуту, час или сутки по каждой камере.
+
+    Обновляется в той же транзакции, что и вставка обнаружений, и не
+    уменьшается при их удалении: статистика переживает очистку снимков.
+    """
+
+    granularity: Mapped[str] = mapped_column(primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(primary_key=True)
+    camera_id: Mapped[int] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
@@ -31,6 +31,12 @@ class BaseRepository(ABC, Generic[T]):
         """Добавить новую запись."""
         pass
 
+    @classmethod
+    @abstractmethod
+    async def bulk_add(cls, rows: list[dict[str, Any]]) -> int:
+        """Добавить несколько записей одним запросом."""
+        pass
+
     @classmethod
     @abstractmethod
     async def update(cls, filter_by: dict[str, Any], **values: Any) -> int:
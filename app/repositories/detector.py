@@ -1,24 +1,299 @@
+import itertools
+from collections.abc import AsyncIterator
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import select
+import anyio
+import anyio.lowlevel
+from sqlalchemy import Select, func, literal_column, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.core import async_session_maker
-from app.models.detector import Detection
+from app.database.core import async_read_session_maker, async_session_maker
+from app.models.detector import PHASH_BAND_BITS, PHASH_BANDS, Detection, phash_band
 from app.repositories.sqlalchemy_repository import SQLAlchemyRepository
+from app.repositories.stats import DetectionCountDAO, to_local
+
+MASK_64 = (1 << 64) - 1
+
+
+def band_neighbors(value: int, radius: int) -> list[int]:
+    """Значения полосы хеша, отличающиеся от ``value`` не больше чем на ``radius`` бит."""
+    values = [value]
+    for flips in range(1, radius + 1):
+        for bits in itertools.combinations(range(PHASH_BAND_BITS), flips):
+            flipped = value
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
 
 
 class DetectionDAO(SQLAlchemyRepository[Detection]):
     model = Detection
 
+    @classmethod
+    async def _after_insert(
+        cls, session: AsyncSession, rows: list[dict[str, Any]]
+    ) -> None:
+        await DetectionCountDAO.count_rows(session, rows)
+
+    @classmethod
+    def _newest_first(
+        cls,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        camera_id: int | None = None,
+        after: tuple[datetime, int] | None = None,
+    ) -> Select[tuple[Detection]]:
+        """
+        Запрос обнаружений от новых к старым по ключу (timestamp, id).
+
+        Условие ``after`` записано так, чтобы SQLite использовал индекс
+        ix_detections_timestamp: он содержит rowid, то есть id, и задаёт
+        нужный порядок без сортировки.
+
+        :param after: Ключ последней записи предыдущей страницы.
+        """
+        query = select(cls.model).order_by(
+            cls.model.timestamp.desc(), cls.model.id.desc()
+        )
+        if start is not None:
+            query = query.where(cls.model.timestamp >= to_local(start))
+        if end is not None:
+            query = query.where(cls.model.timestamp <= to_local(end))
+        if camera_id is not None:
+            query = query.where(cls.model.camera_id == camera_id)
+        if after is not None:
+            after_timestamp, after_id = to_local(after[0]), after[1]
+            query = query.where(
+                cls.model.timestamp <= after_timestamp,
+                or_(
+                    cls.model.timestamp < after_timestamp,
+                    cls.model.id < after_id,
+                ),
+            )
+        return query
+
     @classmethod
     async def get_detections_by_date(
-        cls, start: datetime, end: datetime
+        cls,
+        start: datetime,
+        end: datetime | None = None,
+        camera_id: int | None = None,
+        limit: int | None = None,
+        after: tuple[datetime, int] | None = None,
     ) -> list[Detection]:
-        async with async_session_maker() as session:
+        async with async_read_session_maker() as session:
+            query = cls._newest_first(start, end, camera_id, after).limit(limit)
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    @classmethod
+    async def get_page(
+        cls,
+        limit: int | None,
+        after: tuple[datetime, int] | None = None,
+        camera_id: int | None = None,
+    ) -> list[Detection]:
+        """
+        Страница обнаружений от новых к старым.
+
+        :param limit: Размер страницы, None — без ограничения.
+        :param after: Ключ (timestamp, id) последней записи предыдущей страницы.
+        :param camera_id: Идентификатор камеры.
+        :return: Список объектов модели.
+        """
+        async with async_read_session_maker() as session:
+            query = cls._newest_first(camera_id=camera_id, after=after).limit(limit)
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    @classmethod
+    async def stream(
+        cls,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        camera_id: int | None = None,
+        after: tuple[datetime, int] | None = None,
+        chunk_size: int = 500,
+    ) -> AsyncIterator[Detection]:
+        """
+        Построчно отдавать обнаружения от новых к старым, не загружая всю таблицу.
+
+        Отмена при обрыве соединения клиента принимается между порциями строк:
+        запросы к БД и закрытие курсора экранированы от неё, иначе SQLAlchemy
+        сочтёт прерванный запрос ошибкой соединения и закроет его посреди
+        работы. Отмена anyio повторяется на каждом await в отменённой области,
+        поэтому экранировать нужно и закрытие. Отправка клиенту, который уже
+        отключился, не ждёт, поэтому перед каждой порцией стоит явная точка
+        отмены, иначе выгрузка дошла бы до конца таблицы.
+
+        :param chunk_size: Сколько строк выбирать из курсора за раз.
+        """
+        query = cls._newest_first(start, end, camera_id, after).execution_options(
+            yield_per=chunk_size
+        )
+        async with async_read_session_maker() as session:
+            try:
+                with anyio.CancelScope(shield=True):
+                    rows = (await session.stream(query)).scalars()
+                while True:
+                    await anyio.lowlevel.checkpoint()
+                    with anyio.CancelScope(shield=True):
+                        chunk = await rows.fetchmany(chunk_size)
+                    if not chunk:
+                        break
+                    for detection in chunk:
+                        yield detection
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await session.close()
+
+    @classmethod
+    async def get_newer(cls, after_id: int) -> list[Detection]:
+        """
+        Обнаружения, добавленные после ``after_id``, в порядке id.
+
+        SQLite выдаёт id по возрастанию в порядке фиксации вставок, поэтому
+        запрос по диапазону первичного ключа находит все новые записи.
+
+        :param after_id: Наибольший id, который уже известен.
+        :return: Список объектов модели.
+        """
+        async with async_read_session_maker() as session:
             query = (
                 select(cls.model)
-                .where(cls.model.timestamp >= start, cls.model.timestamp <= end)
-                .order_by(cls.model.timestamp.desc())
+                .where(cls.model.id > after_id)
+                .order_by(cls.model.id)
             )
             result = await session.execute(query)
             return list(result.scalars().all())
+
+    @classmethod
+    async def get_max_id(cls) -> int:
+        """Наибольший id в таблице, 0 — если она пуста."""
+        async with async_read_session_maker() as session:
+            result = await session.execute(select(func.max(cls.model.id)))
+            return result.scalar_one() or 0
+
+    @classmethod
+    async def get_clip_paths(cls, **filter_by: list[Any]) -> set[str]:
+        """
+        Видеофрагменты, на которые ссылаются обнаружения.
+
+        :param filter_by: Колонка и список её значений, например ``id=[...]``
+            или ``clip_path=[...]``.
+        :return: Множество путей к фрагментам.
+        """
+        async with async_read_session_maker() as session:
+            query = (
+                select(cls.model.clip_path)
+                .distinct()
+                .where(
+                    cls.model.clip_path.is_not(None),
+                    *[getattr(cls.model, k).in_(v) for k, v in filter_by.items()],
+                )
+            )
+            result = await session.execute(query)
+            return set(result.scalars().all())  # type: ignore
+
+    @classmethod
+    async def get_oldest(cls, before: datetime, limit: int) -> list[Detection]:
+        """
+        Самые старые обнаружения раньше ``before``, по индексу ix_detections_timestamp.
+
+        :param before: Граница по времени, не включительно.
+        :param limit: Сколько записей вернуть.
+        :return: Список объектов модели от старых к новым.
+        """
+        async with async_read_session_maker() as session:
+            query = (
+                select(cls.model)
+                .where(cls.model.timestamp < before)
+                .order_by(cls.model.timestamp, cls.model.id)
+                .limit(limit)
+            )
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    @classmethod
+    async def find_similar(
+        cls,
+        phash: int,
+        max_distance: int,
+        limit: int,
+        exclude_id: int | None = None,
+        camera_id: int | None = None,
+    ) -> list[tuple[Detection, int]]:
+        """
+        Обнаружения с похожим снимком, от самых похожих к менее похожим.
+
+        Кандидаты выбираются по индексам полос хеша: полоса каждого кандидата
+        отличается от полосы искомого хеша не больше чем на
+        ``max_distance // PHASH_BANDS`` бит. Точное расстояние Хэмминга
+        проверяется уже по выбранным строкам.
+
+        :param phash: Перцептивный хеш снимка.
+        :param max_distance: Максимальное расстояние Хэмминга.
+        :param limit: Сколько обнаружений вернуть.
+        :param exclude_id: Не возвращать это обнаружение, например сам образец.
+        :param camera_id: Искать только среди снимков этой камеры.
+        :return: Список пар (обнаружение, расстояние).
+        """
+        radius = max_distance // PHASH_BANDS
+        band_mask = (1 << PHASH_BAND_BITS) - 1
+        conditions = [
+            literal_column(f"({phash_band(band)})").in_(
+                band_neighbors((phash >> band * PHASH_BAND_BITS) & band_mask, radius)
+            )
+            for band in range(PHASH_BANDS)
+        ]
+        query = select(cls.model).where(or_(*conditions))
+        if exclude_id is not None:
+            query = query.where(cls.model.id != exclude_id)
+        if camera_id is not None:
+            query = query.where(cls.model.camera_id == camera_id)
+
+        async with async_read_session_maker() as session:
+            result = await session.execute(query)
+            candidates = result.scalars().all()
+
+        matches = []
+        for detection in candidates:
+            distance = ((detection.phash ^ phash) & MASK_64).bit_count()  # type: ignore
+            if distance <= max_distance:
+                matches.append((detection, distance))
+        matches.sort(key=lambda match: (match[1], -match[0].id))
+        return matches[:limit]
+
+    @classmethod
+    async def get_without_phash(cls, after_id: int, limit: int) -> list[Detection]:
+        """
+        Обнаружения без перцептивного хеша в порядке id.
+
+        :param after_id: Вернуть записи с id больше этого.
+        :param limit: Сколько записей вернуть.
+        :return: Список объектов модели.
+        """
+        async with async_read_session_maker() as session:
+            query = (
+                select(cls.model)
+                .where(cls.model.phash.is_(None), cls.model.id > after_id)
+                .order_by(cls.model.id)
+                .limit(limit)
+            )
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    @classmethod
+    async def set_phashes(cls, values: list[dict[str, int]]) -> None:
+        """
+        Записать хеши нескольким обнаружениям одним executemany.
+
+        :param values: Словари с ключами ``id`` и ``phash``.
+        """
+        if not values:
+            return
+        async with async_session_maker() as session:
+            async with session.begin():
+                await session.execute(update(cls.model), values)
@@ -1,12 +1,14 @@
 from typing import Any, TypeVar
 
 from sqlalchemy import delete as sqlalchemy_delete
-from sqlalchemy import select
+from sqlalchemy import insert as sqlalchemy_insert
+from sqlalchemy import inspect, select
 from sqlalchemy import update as sqlalchemy_update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.base import Base
-from app.database.core import async_session_maker
+from app.database.core import async_read_session_maker, async_session_maker
 from app.repositories.base import BaseRepository
 
 T = TypeVar("T", bound=Base)
@@ -17,6 +19,20 @@ class SQLAlchemyRepository(BaseRepository[T]):
 
     model: type[T]
 
+    @classmethod
+    async def _after_insert(
+        cls, session: AsyncSession, rows: list[dict[str, Any]]
+    ) -> None:
+        """
+        Вызывается в транзакции вставки до её фиксации.
+
+        Наследники переопределяют метод, чтобы обновить зависимые таблицы
+        вместе с добавленными записями.
+
+        :param session: Сессия текущей транзакции.
+        :param rows: Значения добавленных записей.
+        """
+
     @classmethod
     async def find_all(cls, **filter_by: Any) -> list[T]:
         """
@@ -25,7 +41,7 @@ class SQLAlchemyRepository(BaseRepository[T]):
         :param filter_by: Параметры фильтрации.
         :return: Список объектов модели.
         """
-        async with async_session_maker() as session:
+        async with async_read_session_maker() as session:
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return list(result.scalars().all())
@@ -38,7 +54,7 @@ class SQLAlchemyRepository(BaseRepository[T]):
         :param data_id: Идентификатор записи.
         :return: Объект модели или None.
         """
-        async with async_session_maker() as session:
+        async with async_read_session_maker() as session:
             query = select(cls.model).filter_by(id=data_id)
             result = await session.execute(query)
             return result.scalar_one_or_none()
@@ -51,7 +67,7 @@ class SQLAlchemyRepository(BaseRepository[T]):
         :param filter_by: Параметры фильтрации.
         :return: Объект модели или None.
         """
-        async with async_session_maker() as session:
+        async with async_read_session_maker() as session:
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalar_one_or_none()
@@ -69,12 +85,45 @@ class SQLAlchemyRepository(BaseRepository[T]):
                 new_instance = cls.model(**values)
                 session.add(new_instance)
                 try:
+                    await session.flush()
+                    await cls._after_insert(
+                        session,
+                        [
+                            {
+                                attr.key: getattr(new_instance, attr.key)
+                                for attr in inspect(cls.model).column_attrs
+                            }
+                        ],
+                    )
                     await session.commit()
                     return new_instance
                 except SQLAlchemyError as e:
                     await session.rollback()
                     raise e
 
+    @classmethod
+    async def bulk_add(cls, rows: list[dict[str, Any]]) -> int:
+        """
+        Добавить несколько записей одним многострочным INSERT в одной транзакции.
+
+        :param rows: Данные новых записей, у всех строк одинаковый набор полей.
+        :return: Количество добавленных строк.
+        """
+        if not rows:
+            return 0
+
+        async with async_session_maker() as session:
+            async with session.begin():
+                query = sqlalchemy_insert(cls.model).values(rows)
+                result = await session.execute(query)
+                try:
+                    await cls._after_insert(session, rows)
+                    await session.commit()
+                    return result.rowcount
+                except SQLAlchemyError as e:
+                    await session.rollback()
+                    raise e
+
     @classmethod
     async def update(cls, filter_by: dict[str, Any], **values: Any) -> int:
         """
@@ -106,7 +155,8 @@ class SQLAlchemyRepository(BaseRepository[T]):
         Удалить записи, соответствующие фильтру.
 
         :param delete_all: Флаг удаления всех записей таблицы (осторожно).
-        :param filter_by: Параметры фильтрации.
+        :param filter_by: Параметры фильтрации. Список или кортеж значений
+            удаляет записи с любым из них (``IN``).
         :return: Количество удалённых строк.
         """
         if not delete_all and not filter_by:
@@ -114,7 +164,14 @@ class SQLAlchemyRepository(BaseRepository[T]):
 
         async with async_session_maker() as session:
             async with session.begin():
-                query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
+                query = sqlalchemy_delete(cls.model).where(
+                    *[
+                        getattr(cls.model, k).in_(v)
+                        if isinstance(v, list | tuple | set)
+                        else getattr(cls.model, k) == v
+                        for k, v in filter_by.items()
+                    ]
+                )
                 result = await session.execute(query)
                 try:
                     await session.commit()
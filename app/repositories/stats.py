@@ -0,0 +1,145 @@
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any, Literal
+
+import pytz
+from sqlalchemy import String, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.core import async_read_session_maker, async_session_maker
+from app.models.detector import Detection, DetectionCount
+from app.repositories.sqlalchemy_repository import SQLAlchemyRepository
+
+Granularity = Literal["minute", "hour", "day"]
+GRANULARITIES: tuple[Granularity, ...] = ("minute", "hour", "day")
+TIMEZONE = pytz.timezone("Europe/Samara")
+
+# Строк сводной таблицы в одном INSERT, с запасом до лимита переменных SQLite.
+UPSERT_CHUNK = 1000
+
+
+def to_local(timestamp: datetime) -> datetime:
+    """Время без часового пояса, как его хранит SQLite: местное Europe/Samara."""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(TIMEZONE).replace(tzinfo=None)
+
+
+def bucket_start(timestamp: datetime, granularity: Granularity) -> datetime:
+    """Начало минуты, часа или суток, в которые попадает ``timestamp``."""
+    timestamp = to_local(timestamp).replace(second=0, microsecond=0)
+    if granularity == "minute":
+        return timestamp
+    if granularity == "hour":
+        return timestamp.replace(minute=0)
+    return timestamp.replace(hour=0, minute=0)
+
+
+class DetectionCountDAO(SQLAlchemyRepository[DetectionCount]):
+    model = DetectionCount
+
+    @classmethod
+    async def count_rows(
+        cls, session: AsyncSession, rows: Iterable[dict[str, Any]]
+    ) -> None:
+        """
+        Прибавить добавленные обнаружения к счётчикам всех интервалов.
+
+        :param session: Сессия транзакции, в которой добавлены обнаружения.
+        :param rows: Значения добавленных обнаружений.
+        """
+        counts: Counter[tuple[str, datetime, int]] = Counter()
+        for row in rows:
+            timestamp = row.get("timestamp") or datetime.now(TIMEZONE)
+            camera_id = row.get("camera_id") or 0
+            for granularity in GRANULARITIES:
+                counts[granularity, bucket_start(timestamp, granularity), camera_id] += 1
+        await cls._upsert(session, counts)
+
+    @classmethod
+    async def _upsert(
+        cls, session: AsyncSession, counts: Counter[tuple[str, datetime, int]]
+    ) -> None:
+        items = [
+            {"granularity": g, "bucket": b, "camera_id": c, "count": n}
+            for (g, b, c), n in counts.items()
+        ]
+        for i in range(0, len(items), UPSERT_CHUNK):
+            query = sqlite_insert(cls.model).values(items[i : i + UPSERT_CHUNK])
+            query = query.on_conflict_do_update(
+                index_elements=["granularity", "bucket", "camera_id"],
+                set_={"count": cls.model.count + query.excluded.count},
+            )
+            await session.execute(query)
+
+    @classmethod
+    async def get_counts(
+        cls,
+        granularity: Granularity,
+        start: datetime,
+        end: datetime,
+        camera_id: int | None = None,
+    ) -> list[tuple[datetime, int]]:
+        """
+        Число обнаружений по интервалам от старых к новым.
+
+        Читается только диапазон первичного ключа (granularity, bucket),
+        таблица обнаружений не затрагивается. Интервалы без обнаружений не
+        возвращаются.
+
+        :param granularity: Длина интервала: minute, hour или day.
+        :param start: Начало диапазона, берётся интервал, в который оно попадает.
+        :param end: Конец диапазона, включительно.
+        :param camera_id: Идентификатор камеры, None — сумма по всем камерам.
+        :return: Список пар (начало интервала, число обнаружений).
+        """
+        async with async_read_session_maker() as session:
+            query = (
+                select(cls.model.bucket, func.sum(cls.model.count))
+                .where(
+                    cls.model.granularity == granularity,
+                    cls.model.bucket >= bucket_start(start, granularity),
+                    cls.model.bucket <= to_local(end),
+                )
+                .group_by(cls.model.bucket)
+                .order_by(cls.model.bucket)
+            )
+            if camera_id is not None:
+                query = query.where(cls.model.camera_id == camera_id)
+            result = await session.execute(query)
+            return [(bucket, int(count)) for bucket, count in result.all()]
+
+    @classmethod
+    async def rebuild(cls) -> int:
+        """
+        Пересчитать сводную таблицу по всем обнаружениям.
+
+        Выполняется в одной транзакции: DELETE в начале берёт блокировку
+        записи, поэтому обнаружения, добавленные другим процессом во время
+        пересчёта, не потеряются и не посчитаются дважды. Обнаружения
+        группируются по минутам в SQLite, часы и сутки складываются из минут.
+
+        :return: Сколько обнаружений посчитано.
+        """
+        minute = func.substr(Detection.timestamp, 1, 16, type_=String)
+        async with async_session_maker() as session:
+            async with session.begin():
+                await session.execute(delete(cls.model))
+                result = await session.execute(
+                    select(minute, Detection.camera_id, func.count()).group_by(
+                        minute, Detection.camera_id
+                    )
+                )
+                counts: Counter[tuple[str, datetime, int]] = Counter()
+                total = 0
+                for key, camera_id, count in result.all():
+                    started = datetime.strptime(key, "%Y-%m-%d %H:%M")
+                    for granularity in GRANULARITIES:
+                        counts[
+                            granularity, bucket_start(started, granularity), camera_id
+                        ] += count
+                    total += count
+                await cls._upsert(session, counts)
+            return total
@@ -2,6 +2,8 @@ from datetime import datetime
 
 from pydantic import BaseModel, ConfigDict, HttpUrl
 
+from app.models.detector import Detection
+
 
 class DetectionOut(BaseModel):
     model_config = ConfigDict(
@@ -10,5 +12,31 @@ class DetectionOut(BaseModel):
     )
 
     id: int
+    camera_id: int
     timestamp: datetime
     image_url: HttpUrl
+    thumbnail_url: HttpUrl
+    clip_url: HttpUrl | None = None
+
+    @classmethod
+    def from_detection(cls, detection: Detection) -> "DetectionOut":
+        name = detection.image_path.split("/")[-1]
+        clip_url = None
+        if detection.clip_path:
+            clip_url = f"http://localhost:5000/clips/{detection.clip_path.split('/')[-1]}"
+        return cls(
+            id=detection.id,
+            camera_id=detection.camera_id,
+            timestamp=detection.timestamp,
+            image_url=f"http://localhost:5000/saved_photos/{name}",  # type: ignore
+            thumbnail_url=f"http://localhost:5000/thumbnails/thumb/{name}",  # type: ignore
+            clip_url=clip_url,  # type: ignore
+        )
+
+
+class SimilarDetectionOut(DetectionOut):
+    distance: int
+
+    @classmethod
+    def from_match(cls, detection: Detection, distance: int) -> "SimilarDetectionOut":
+        return cls(**DetectionOut.from_detection(detection).model_dump(), distance=distance)
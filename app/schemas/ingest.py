@@ -0,0 +1,36 @@
+import os
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+
+class IngestRequest(BaseModel):
+    paths: list[str] = Field(
+        min_length=1, description="Видеофайлы, изображения или папки с изображениями"
+    )
+    camera_id: int = Field(0, ge=0, description="Идентификатор камеры для записей в БД")
+    chunk_size: int = Field(64, ge=1, le=1024, description="Кадров в одной порции")
+    workers: int = Field(
+        0,
+        ge=0,
+        le=os.cpu_count() or 1,
+        description="Число процессов, не больше числа ядер; 0 — по числу ядер минус одно",
+    )
+    full_frame: bool = Field(
+        False, description="Искать лица во всём кадре, а не в области из настроек"
+    )
+    save: bool = Field(
+        True, description="Сохранять вырезки и записи в БД; false — только отчёт"
+    )
+    min_interval_s: float = Field(
+        5.0, ge=0.0, description="Не чаще одной вырезки за столько секунд видео"
+    )
+    restart: bool = Field(False, description="Начать файлы с начала, а не с сохранённого смещения")
+
+
+class IngestJobOut(BaseModel):
+    id: str
+    paths: list[str]
+    status: str
+    error: str | None
+    report: dict[str, Any]
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class StatsBucket(BaseModel):
+    model_config = ConfigDict(
+        json_encoders={datetime: lambda v: v.strftime("%Y-%m-%d %H:%M:%S")},
+    )
+
+    bucket: datetime
+    count: int
+
+
+class StatsOut(BaseModel):
+    model_config = ConfigDict(
+        json_encoders={datetime: lambda v: v.strftime("%Y-%m-%d %H:%M:%S")},
+    )
+
+    granularity: str
+    start: datetime
+    end: datetime
+    camera_id: int | None
+    total: int
+    buckets: list[StatsBucket]
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.metrics import registry
+
+HEARTBEAT = b": heartbeat\n\n"
+
+
+class Subscriber:
+    def __init__(self, queue_size: int) -> None:
+        self.queue: deque[bytes] = deque(maxlen=queue_size)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+
+
+class EventBroadcaster:
+    """
+    Рассылка событий SSE всем подключённым клиентам.
+
+    Событие сериализуется в готовое сообщение SSE один раз, и одни и те же
+    байты кладутся в очереди всех подписчиков. У каждого подписчика своя
+    ограниченная очередь: если клиент не успевает читать, самые старые
+    сообщения вытесняются и он не тормозит остальных. Последние события
+    хранятся в кольцевом буфере для повтора по заголовку ``Last-Event-ID``.
+    Все методы вызываются в потоке event loop.
+    """
+
+    def __init__(
+        self, queue_size: int = 100, replay_size: int = 256, heartbeat_s: float = 15.0
+    ) -> None:
+        self.queue_size = queue_size
+        self.heartbeat_s = heartbeat_s
+        self._subscribers: set[Subscriber] = set()
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=replay_size)
+        self._last_id = 0
+        self.dropped = 0
+        self.connections = 0
+
+        registry.gauge(
+            "human_capture_sse_subscribers",
+            "Подключённые клиенты SSE",
+            function=lambda: len(self._subscribers),
+        )
+        registry.counter(
+            "human_capture_sse_connections_total",
+            "Подключения клиентов SSE",
+            function=lambda: self.connections,
+        )
+        registry.counter(
+            "human_capture_sse_events_total",
+            "Опубликованные события SSE",
+            function=lambda: self._last_id,
+        )
+        registry.counter(
+            "human_capture_sse_dropped_total",
+            "Сообщения SSE, вытесненные из очередей медленных клиентов",
+            function=lambda: self.dropped,
+        )
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, data: dict[str, Any]) -> None:
+        self._last_id += 1
+        message = f"id: {self._last_id}\ndata: {json.dumps(data)}\n\n".encode()
+        self._history.append((self._last_id, message))
+
+        for subscriber in self._subscribers:
+            if len(subscriber.queue) == self.queue_size:
+                subscriber.dropped += 1
+                self.dropped += 1
+            subscriber.queue.append(message)
+            subscriber.wakeup.set()
+
+    async def subscribe(self, last_event_id: int | None = None) -> AsyncIterator[bytes]:
+        """Поток сообщений SSE для одного клиента, начиная после last_event_id."""
+        subscriber = Subscriber(self.queue_size)
+        if last_event_id is not None:
+            subscriber.queue.extend(
+                message
+                for event_id, message in self._history
+                if event_id > last_event_id
+            )
+        self._subscribers.add(subscriber)
+        self.connections += 1
+
+        try:
+            while True:
+                if not subscriber.queue:
+                    subscriber.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(
+                            subscriber.wakeup.wait(), timeout=self.heartbeat_s
+                        )
+                    except asyncio.TimeoutError:
+                        yield HEARTBEAT
+                        continue
+
+                while subscriber.queue:
+                    yield subscriber.queue.popleft()
+        finally:
+            self._subscribers.discard(subscriber)
@@ -1,5 +1,28 @@
 __all__ = [
-    "detector",
+    "DetectorPool",
+    "get_detector_pool",
 ]
 
-from .base import detector
+import threading
+
+from app.core.config import get_settings
+
+from .pool import DetectorPool
+
+_pool: DetectorPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_detector_pool() -> DetectorPool:
+    """
+    Пул камер приложения.
+
+    Создаётся при первом обращении, а не при импорте: импорт app.main не
+    строит конвейеры, модели загружаются при прогреве или первом кадре.
+    """
+    global _pool  # noqa: PLW0603
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DetectorPool(get_settings())
+    return _pool
@@ -2,140 +2,387 @@ import asyncio
 import logging
 import threading
 import time
+from typing import Any
 
 import cv2
 
-from app.core.config import Settings, settings
+from app.core.config import Settings
+from app.core.metrics import registry
+from app.services.broadcaster import EventBroadcaster
 from app.services.detectors.camera_manager import CameraManager
+from app.services.detectors.clips import ClipRecorder, ClipWriter, create_clip_writer
 from app.services.detectors.detection_saver import DetectionSaver
-from app.services.detectors.face_detector import FaceDetector
 from app.services.detectors.frame_processor import FrameProcessor
+from app.services.detectors.image_writer import ImageWriter
+from app.services.detectors.inference import InferenceBackend, InlineInferenceBackend
+from app.services.detectors.metrics import PipelineMetrics
+from app.services.detectors.preview import LivePreview
+from app.services.detectors.scheduler import FrameRateScheduler
+from app.services.detectors.thumbnails import DerivativeCache
+from app.services.detectors.tracker import FaceTracker, Track
+from app.services.detectors.write_buffer import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
 
 class HumanDetector:
-    def __init__(self, settings: Settings, show_camera: bool = False):
-        self.face_detector = FaceDetector()
+    def __init__(
+        self,
+        settings: Settings,
+        camera_id: int = 0,
+        camera_index: int | str = 0,
+        *,
+        inference: InferenceBackend | None = None,
+        write_buffer: WriteBehindBuffer | None = None,
+        image_writer: ImageWriter | None = None,
+        thumbnails: DerivativeCache | None = None,
+        clip_writer: ClipWriter | None = None,
+    ):
+        self.inference = (
+            inference if inference is not None else InlineInferenceBackend(settings)
+        )
         self.frame_processor = FrameProcessor(settings)
-        self.detection_saver = DetectionSaver(settings)
-        self.camera = CameraManager()
+        self.clips = ClipRecorder(
+            settings,
+            camera_id,
+            clip_writer if clip_writer is not None else create_clip_writer(settings),
+        )
+        self.detection_saver = DetectionSaver(
+            settings,
+            camera_id=camera_id,
+            write_buffer=write_buffer,
+            image_writer=image_writer,
+            thumbnails=thumbnails,
+            clips=self.clips,
+        )
+        self.preview = LivePreview(settings, camera_id)
+        self.camera = CameraManager(
+            camera_index=camera_index,
+            capture_mode=settings.capture_mode,
+            buffer_size=settings.capture_buffer_size,
+        )
 
         self.settings = settings
-        self.window_name = "Human Detection"
+        self.camera_id = camera_id
         self.running = False
         self.thread = None
         self.lock = threading.Lock()
-        self.detection_start_time = None
-        self.last_save_time = 0
-        self.event_queue = None
+        self.broadcaster = None
         self.loop = None
-        self.show_camera = show_camera
+        self.metrics = PipelineMetrics(camera_id)
+        self.scheduler = FrameRateScheduler(settings)
+        self.tracker = FaceTracker(settings)
+        self.last_face_time: float | None = None
+        self._stop_event = threading.Event()
+        self._pending_settings: Settings | None = None
+        self._settings_lock = threading.Lock()
+        # Время холодного старта: загрузка модели, открытие камеры и путь от
+        # start() до первого обработанного кадра, секунды.
+        self.startup: dict[str, float | None] = {
+            "model_s": None,
+            "camera_open_s": None,
+            "first_frame_s": None,
+        }
+        self._started_at = 0.0
+        self._register_metrics()
+
+    def _configure_loop(self, settings: Settings) -> None:
+        self.scheduler.configure(settings)
+        self.tracker.configure(settings)
+
+    def update_settings(self, settings: Settings) -> None:
+        """
+        Перейти на новые настройки камеры.
+
+        Работающая камера применяет их в своём потоке перед следующим кадром,
+        поэтому кадр целиком обрабатывается либо со старыми, либо с новыми
+        настройками. Остановленная применяет сразу.
+        """
+        with self.lock:
+            if self.running:
+                with self._settings_lock:
+                    self._pending_settings = settings
+                return
+            self._apply_settings(settings)
+
+    def _apply_pending_settings(self) -> None:
+        with self._settings_lock:
+            settings, self._pending_settings = self._pending_settings, None
+        if settings is not None:
+            self._apply_settings(settings)
+
+    def _apply_settings(self, settings: Settings) -> None:
+        old = self.settings
+        self.settings = settings
+        self.frame_processor.configure(settings)
+        self.detection_saver.settings = settings
+        self.inference.configure(settings)
+        self.preview.configure(settings)
+        self._configure_loop(settings)
+        if (old.x, old.y, old.width, old.height) != (
+            settings.x,
+            settings.y,
+            settings.width,
+            settings.height,
+        ):
+            # Рамки треков заданы в координатах прежней области.
+            self._save_tracks(self.tracker.reset())
+        logger.info("Камера %s: применены новые настройки", self.camera_id)
+
+    def _register_metrics(self) -> None:
+        """Счётчики кадров и темп цикла читаются из камеры и планировщика при выгрузке."""
+        camera = {"camera": self.camera_id}
+        registry.counter(
+            "human_capture_frames_total",
+            "Кадры, снятые с камеры",
+            camera,
+            lambda: self.camera.stats.captured,
+        )
+        registry.counter(
+            "human_capture_frames_processed_total",
+            "Кадры, обработанные детектором",
+            camera,
+            lambda: self.camera.stats.processed,
+        )
+        registry.counter(
+            "human_capture_frames_dropped_total",
+            "Кадры, вытесненные более свежими до обработки",
+            camera,
+            lambda: self.camera.stats.dropped,
+        )
+        registry.gauge(
+            "human_capture_capture_lag_frames",
+            "Кадры, снятые с камеры и ещё не обработанные",
+            camera,
+            lambda: self.camera.stats.lag,
+        )
+        registry.gauge(
+            "human_capture_effective_fps",
+            "Фактический темп цикла детекции",
+            camera,
+            lambda: self.scheduler.effective_fps,
+        )
+        registry.gauge(
+            "human_capture_running",
+            "1, если детектор камеры запущен",
+            camera,
+            lambda: int(self.running),
+        )
+
+    @property
+    def ready(self) -> bool:
+        """Модель загружена, а при warmup=camera ещё и камера открыта."""
+        if not self.inference.ready:
+            return False
+        return (
+            self.settings.warmup != "camera" or self.running or self.camera.connected
+        )
+
+    def warm_up(self) -> None:
+        """
+        Загрузить модель и при warmup=camera открыть камеру, не начиная захват.
+
+        Выполняется под ``self.lock``: /start, пришедший во время прогрева,
+        дождётся его, а не станет строить вторую модель параллельно.
+        """
+        with self.lock:
+            if self.running:
+                return
+            if not self.inference.ready:
+                started = time.perf_counter()
+                self.inference.warm_up(
+                    (self.settings.height, self.settings.width, 3), self.settings
+                )
+                self.startup["model_s"] = round(time.perf_counter() - started, 3)
+            if self.settings.warmup == "camera" and not self.camera.connected:
+                started = time.perf_counter()
+                if self.camera.connect():
+                    self.startup["camera_open_s"] = round(
+                        time.perf_counter() - started, 3
+                    )
+                else:
+                    logger.warning(
+                        "Камера %s не открылась при прогреве", self.camera_id
+                    )
+
+    def _open_camera(self) -> bool:
+        """Открыть камеру, повторяя попытки: её может ещё держать прошлый запуск."""
+        started = time.perf_counter()
+        for attempt in range(self.settings.camera_open_attempts):
+            if attempt and self._stop_event.wait(self.settings.camera_open_retry_s):
+                return False
+            if self.camera.open():
+                self.startup["camera_open_s"] = round(time.perf_counter() - started, 3)
+                logger.info("Камера %s открыта", self.camera_id)
+                return True
+        logger.error(
+            "Камера %s занята или недоступна, невозможно запустить", self.camera_id
+        )
+        return False
 
     def _run(self) -> None:
         try:
-            if not self.camera.open():
+            if not self._open_camera():
                 self.running = False
                 return
 
             while self.running:
+                self._apply_pending_settings()
+                self.scheduler.select_state(
+                    confirming=self.tracker.pending,
+                    last_face_time=self.last_face_time,
+                )
+                self.scheduler.wait(self._stop_event)
+                if not self.running:
+                    break
+
+                started = time.perf_counter()
                 frame = self.camera.read_frame()
                 if frame is None:
+                    self.scheduler.read_failed(self._stop_event)
                     continue
-
-                roi = self.frame_processor.get_roi(frame)
-                if roi is None:
-                    logger.error("ROI выходит за границы кадра")
+                self.scheduler.read_succeeded()
+                if not self._process_frame(frame, started):
                     break
 
-                results = self.face_detector.process(roi)
-
-                if self.face_detector.is_human_detected(results):
-                    current_time = time.time()
-
-                    if self.detection_start_time is None:
-                        self.detection_start_time = current_time
-                    elif current_time - self.detection_start_time >= 5:
-                        if current_time - self.last_save_time >= 5:
-                            detection = results.detections[0]
-                            x_rel, y_rel, w_rel, h_rel = (
-                                self.face_detector.get_face_bounding_box(
-                                    detection, roi.shape
-                                )
-                            )
-
-                            x_abs: int = x_rel + self.settings.x
-                            y_abs: int = y_rel + self.settings.y
-
-                            image_path = self.detection_saver.save_human_image(
-                                frame, x_abs, y_abs, w_rel, h_rel
-                            )
-                            if image_path:
-                                asyncio.run_coroutine_threadsafe(
-                                    self.detection_saver.save_to_database(image_path),
-                                    self.loop,
-                                )
-
-                                if self.event_queue and self.loop:
-                                    event_data = {
-                                        "image_path": image_path,
-                                        "timestamp": int(time.time()),
-                                    }
-                                    self.loop.call_soon_threadsafe(
-                                        self.event_queue.put_nowait, event_data
-                                    )
-                            self.last_save_time = current_time
-                            self.detection_start_time = None
-                else:
-                    self.detection_start_time = None
-
-                if self.show_camera:
-                    self.frame_processor.draw_roi(frame)
-                    cv2.imshow(self.window_name, frame)
-                    if cv2.waitKey(1) & 0xFF == ord("q"):
-                        self.running = False
-
         except Exception as e:
             logger.error("Ошибка в потоке детектора: %s", repr(e))
         finally:
+            self._save_tracks(self.tracker.reset())
+            self.clips.close()
             with self.lock:
                 self.camera.release()
-                if self.show_camera:
-                    cv2.destroyWindow(self.window_name)
-                    cv2.waitKey(1)
                 self.running = False
-            logger.info("Камера и окна закрыты")
+            logger.info(
+                "Камера %s закрыта. Статистика кадров: %s",
+                self.camera_id,
+                self.camera.stats.as_dict(),
+            )
+
+    def _process_frame(self, frame: cv2.typing.MatLike, started: float) -> bool:
+        """
+        Провести прочитанный кадр через все этапы конвейера.
+
+        :param started: Момент начала чтения кадра по ``time.perf_counter``.
+        :return: False, если цикл нужно остановить.
+        """
+        stages = self.metrics.stages
+        read_done = time.perf_counter()
+        stages["read"].observe(read_done - started)
+
+        roi = self.frame_processor.get_roi(frame)
+        if roi is None:
+            logger.error("ROI выходит за границы кадра камеры %s", self.camera_id)
+            return False
+        roi_done = time.perf_counter()
+        stages["roi"].observe(roi_done - read_done)
+
+        run_inference = self.frame_processor.should_run_inference(
+            roi,
+            tracking=self.tracker.detection_due() if self.tracker.tracks else None,
+        )
+        motion_done = time.perf_counter()
+        stages["motion"].observe(motion_done - roi_done)
+
+        if run_inference:
+            faces = self.inference.detect(roi, self.settings, self.metrics)
+            self.metrics.inference_runs.inc()
+            crop_started = time.perf_counter()
+            ready = self.tracker.update(
+                frame, roi, (self.settings.x, self.settings.y), faces
+            )
+        else:
+            faces = []
+            self.metrics.inference_skipped.inc()
+            crop_started = time.perf_counter()
+            ready = self.tracker.predict(roi)
+        self.camera.mark_processed()
+        if self.startup["first_frame_s"] is None:
+            self.startup["first_frame_s"] = round(
+                time.perf_counter() - self._started_at, 3
+            )
+
+        if faces:
+            self.metrics.detections.inc()
+        if self.tracker.tracks:
+            self.last_face_time = time.monotonic()
+        self._save_tracks(ready)
+        clip_started = time.perf_counter()
+        stages["crop"].observe(clip_started - crop_started)
+
+        # Кадр попадает в буфер после сохранения: фрагмент обнаружения
+        # на этом кадре начинается раньше него и включает его.
+        self.clips.add(frame)
+        preview_started = time.perf_counter()
+        stages["clip"].observe(preview_started - clip_started)
+
+        if self.preview.watched:
+            self._update_preview(frame)
+        stages["preview"].observe(time.perf_counter() - preview_started)
+        return True
+
+    def _update_preview(self, frame: cv2.typing.MatLike) -> None:
+        """Передать кадр в живой просмотр с рамками треков в координатах кадра."""
+        x, y = self.settings.x, self.settings.y
+        self.preview.update(
+            frame,
+            (x, y, self.settings.width, self.settings.height),
+            [(x + bx, y + by, w, h) for bx, by, w, h in (t.box for t in self.tracker.tracks)],
+        )
+
+    def _save_tracks(self, tracks: list[Track]) -> None:
+        """Сохранить лучший снимок каждого завершённого или подтверждённого трека."""
+        for track in tracks:
+            if self.detection_saver.save_crop(track.best_crop, track.id):  # type: ignore
+                self.metrics.saves.inc()
+            track.best_crop = None
+
+    def bind(
+        self, broadcaster: EventBroadcaster, loop: asyncio.AbstractEventLoop
+    ) -> None:
+        self.broadcaster = broadcaster
+        self.loop = loop
+        self.detection_saver.broadcaster = broadcaster
+        self.detection_saver.loop = loop
+
+    def stats(self) -> dict[str, int]:
+        return self.camera.stats.as_dict()
+
+    def pipeline_stats(self) -> dict[str, Any]:
+        return {**self.metrics.snapshot(), "scheduler": self.scheduler.snapshot()}
 
     def start(self):
         with self.lock:
             if not self.running:
-                for _ in range(5):
-                    if self.camera.is_camera_free():
-                        break
-                    time.sleep(0.5)
-                else:
-                    logger.error("Камера занята, невозможно запустить")
-                    return
-
+                self.inference.start()
+                self._stop_event.clear()
+                self._started_at = time.perf_counter()
+                self.startup["first_frame_s"] = None
                 self.running = True
-                self.thread = threading.Thread(target=self._run)
+                self.thread = threading.Thread(
+                    target=self._run, name=f"detector-{self.camera_id}"
+                )
                 self.thread.start()
-                logger.info("Камера успешно запущена")
+                logger.info("Камера %s запускается", self.camera_id)
 
     def stop(self):
         with self.lock:
-            if self.running:
-                self.running = False
-                if self.thread and self.thread.is_alive():
-                    self.thread.join(timeout=1.0)
-                    if self.thread.is_alive():
-                        logger.warning("Поток завис, принудительное завершение")
-                        self.camera.release()
-                self.thread = None
-                logger.info("Камера остановлена")
-
-
-detector = HumanDetector(
-    settings=settings,
-    show_camera=settings.show_camera,
-)
+            if not self.running:
+                # Камера могла остаться открытой после прогрева.
+                self.camera.release()
+                return
+            self.running = False
+            self._stop_event.set()
+            thread, self.thread = self.thread, None
+
+        # Поток детектора берёт self.lock при завершении, поэтому ждём его без
+        # блокировки, иначе join всегда заканчивался бы по таймауту.
+        if thread and thread.is_alive():
+            thread.join(timeout=1.0)
+            if thread.is_alive():
+                logger.warning("Поток завис, принудительное завершение")
+                with self.lock:
+                    self.camera.release()
+        self.detection_saver.flush_threadsafe()
+        logger.info("Камера %s остановлена", self.camera_id)
+
@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def reuse(
+    buffer: np.ndarray | None, shape: tuple[int, ...], dtype: type = np.uint8
+) -> np.ndarray:
+    """
+    Вернуть ``buffer``, если он подходит по форме и типу, иначе новый массив.
+
+    Результат передаётся в ``dst`` функций OpenCV: пока размер области не
+    меняется, кадры обрабатываются в одних и тех же массивах без выделения
+    памяти на каждом кадре.
+    """
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        return np.empty(shape, dtype=dtype)
+    return buffer
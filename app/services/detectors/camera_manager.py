@@ -1,39 +1,179 @@
 import logging
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
 
 import cv2
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class CaptureStats:
+    """Счётчики кадров: сколько снято с камеры, отброшено и обработано."""
+
+    captured: int = 0
+    dropped: int = 0
+    processed: int = 0
+
+    @property
+    def lag(self) -> int:
+        """Кадры, снятые с камеры, но ещё не обработанные и не отброшенные."""
+        return self.captured - self.dropped - self.processed
+
+    def as_dict(self) -> dict[str, int]:
+        return {**asdict(self), "lag": self.lag}
+
+
 class CameraManager:
-    def __init__(self, camera_index: int = 0):
+    """
+    Работа с камерой в одном из двух режимов.
+
+    ``sync`` — кадр читается из ``cv2.VideoCapture`` в момент вызова
+    ``read_frame``. ``latest`` — отдельный поток постоянно читает камеру в
+    небольшой кольцевой буфер, а ``read_frame`` отдаёт самый свежий кадр и
+    отбрасывает остальные, поэтому медленный детектор не копит очередь
+    устаревших кадров в буфере драйвера.
+
+    Кадры читаются в одни и те же массивы: в ``sync`` — в один, в
+    ``latest`` — в небольшой пул, куда возвращаются отброшенные кадры.
+    Кадр, отданный ``read_frame``, остаётся верным до следующего вызова;
+    всё, что нужно дольше, вызывающий копирует сам.
+    """
+
+    def __init__(
+        self,
+        camera_index: int | str = 0,
+        capture_mode: str = "sync",
+        buffer_size: int = 1,
+    ):
         self.camera_index = camera_index
+        self.capture_mode = capture_mode
         self.cap = None
+        self.stats = CaptureStats()
 
-    def open(self):
+        self._buffer: deque[np.ndarray] = deque(maxlen=buffer_size)
+        self._frame: np.ndarray | None = None
+        self._free: list[np.ndarray] = []
+        self._condition = threading.Condition()
+        self._grabber: threading.Thread | None = None
+        self._grabber_stop = threading.Event()
+
+    @property
+    def threaded(self) -> bool:
+        return self.capture_mode == "latest"
+
+    @property
+    def connected(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def connect(self) -> bool:
+        """
+        Открыть устройство, не начиная захват; уже открытое не переоткрывается.
+
+        Попытка открыть занятую камеру просто не удаётся, поэтому отдельная
+        проверка «свободна ли камера» не нужна.
+        """
+        if self.connected:
+            return True
         self.cap = cv2.VideoCapture(self.camera_index)
         if not self.cap.isOpened():
-            logger.error("Не удалось открыть камеру")
+            self.cap.release()
+            self.cap = None
             return False
         return True
 
-    def read_frame(self):
+    def open(self):
+        if not self.connect():
+            logger.warning("Не удалось открыть камеру %s", self.camera_index)
+            return False
+
+        self.stats = CaptureStats()
+        if self.threaded:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self._start_grabber()
+        return True
+
+    def read_frame(self, timeout: float = 1.0):
+        if self.threaded:
+            return self._take_latest(timeout)
+
         if self.cap:
-            ret, frame = self.cap.read()
+            ret, frame = self.cap.read(image=self._frame)
             if not ret:
                 logger.error("Ошибка при чтении кадра")
                 return None
+            self._frame = frame
+            self.stats.captured += 1
             return frame
         return None
 
+    def mark_processed(self) -> None:
+        self.stats.processed += 1
+
     def release(self):
+        self._stop_grabber()
         if self.cap and self.cap.isOpened():
             self.cap.release()
             self.cap = None
 
-    def is_camera_free(self) -> bool:
-        test_cap = cv2.VideoCapture(self.camera_index)
-        if test_cap.isOpened():
-            test_cap.release()
-            return True
-        return False
+    def _start_grabber(self) -> None:
+        self._buffer.clear()
+        self._grabber_stop.clear()
+        self._grabber = threading.Thread(
+            target=self._grab_loop, name=f"camera-grabber-{self.camera_index}"
+        )
+        self._grabber.daemon = True
+        self._grabber.start()
+
+    def _stop_grabber(self) -> None:
+        if self._grabber is None:
+            return
+        self._grabber_stop.set()
+        if self._grabber is not threading.current_thread():
+            self._grabber.join(timeout=1.0)
+        self._grabber = None
+        with self._condition:
+            self.stats.dropped += len(self._buffer)
+            self._buffer.clear()
+            self._free.clear()
+            self._frame = None
+            self._condition.notify_all()
+
+    def _grab_loop(self) -> None:
+        cap = self.cap
+        while cap is not None and not self._grabber_stop.is_set():
+            with self._condition:
+                target = self._free.pop() if self._free else None
+            ret, frame = cap.read(image=target)
+            if not ret:
+                logger.error("Ошибка при чтении кадра")
+                if target is not None:
+                    with self._condition:
+                        self._free.append(target)
+                self._grabber_stop.wait(0.1)
+                continue
+
+            with self._condition:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.stats.dropped += 1
+                    self._free.append(self._buffer.popleft())
+                self._buffer.append(frame)
+                self.stats.captured += 1
+                self._condition.notify()
+
+    def _take_latest(self, timeout: float):
+        with self._condition:
+            if not self._buffer:
+                self._condition.wait(timeout)
+            if not self._buffer:
+                return None
+            # Кадр, отданный в прошлый раз, и вытесненные кадры идут на новое чтение.
+            if self._frame is not None:
+                self._free.append(self._frame)
+            self._frame = self._buffer.pop()
+            self.stats.dropped += len(self._buffer)
+            self._free.extend(self._buffer)
+            self._buffer.clear()
+            return self._frame
@@ -0,0 +1,285 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from app.core.config import Settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Кадр буфера: время time.monotonic() и байты JPEG от cv2.imencode.
+Frame = tuple[float, np.ndarray]
+
+
+class FrameRing:
+    """
+    Последние кадры камеры в виде JPEG с ограничением по объёму.
+
+    Кадры хранятся сжатыми, поэтому в буфер того же объёма помещается в
+    десятки раз больше секунд, чем несжатых массивов. Когда суммарный размер
+    превышает ``max_bytes`` или кадр старше ``max_age_s`` секунд, удаляются
+    самые старые кадры. Используется только из потока детектора.
+    """
+
+    def __init__(self, max_bytes: int, max_age_s: float) -> None:
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.bytes = 0
+        self._frames: deque[Frame] = deque()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def append(self, timestamp: float, data: np.ndarray) -> None:
+        self._frames.append((timestamp, data))
+        self.bytes += data.nbytes
+        while self._frames and (
+            self.bytes > self.max_bytes
+            or timestamp - self._frames[0][0] > self.max_age_s
+        ):
+            _, old = self._frames.popleft()
+            self.bytes -= old.nbytes
+
+    def between(self, start: float, end: float) -> list[Frame]:
+        """Кадры со временем от ``start`` до ``end`` включительно, от старых к новым."""
+        return [frame for frame in self._frames if start <= frame[0] <= end]
+
+    def clear(self) -> None:
+        self._frames.clear()
+        self.bytes = 0
+
+
+class ClipWriter:
+    """
+    Сборка MP4 из кадров кольцевого буфера в фоновом потоке.
+
+    Кадры в буфере идут с неравными интервалами: детектор замедляется, когда
+    в кадре никого нет. Фрагмент пишется с постоянной частотой ``fps``, на
+    каждый отсчёт берётся последний кадр не позже него, так что фрагмент
+    проигрывается в реальном времени. Файл пишется под временным именем и
+    переименовывается, когда готов. Если в очереди ``queue_size``
+    фрагментов, новый отбрасывается: поток детектора никогда не ждёт записи.
+    """
+
+    def __init__(self, directory: str, codec: str = "mp4v", queue_size: int = 4) -> None:
+        self.directory = directory
+        self.fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.queue_size = queue_size
+        self.written = 0
+        self.dropped = 0
+        self.write_seconds = registry.histogram(
+            "human_capture_clip_write_seconds",
+            "Время сборки и записи видеофрагмента, секунды",
+            buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+        )
+        registry.counter(
+            "human_capture_clips_total",
+            "Записанные видеофрагменты",
+            function=lambda: self.written,
+        )
+        registry.counter(
+            "human_capture_clips_dropped_total",
+            "Видеофрагменты, отброшенные из-за переполнения очереди записи",
+            function=lambda: self.dropped,
+        )
+        registry.gauge(
+            "human_capture_clip_write_queue",
+            "Видеофрагменты в очереди записи",
+            function=lambda: self._pending,
+        )
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-writer")
+        self._pending = 0
+        self._condition = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+
+    def submit(self, frames: list[Frame], fps: float, path: str) -> bool:
+        """Поставить фрагмент в очередь записи, False — фрагмент отброшен."""
+        with self._condition:
+            if self._pending >= self.queue_size:
+                self.dropped += 1
+                logger.warning("Очередь записи фрагментов заполнена, %s отброшен", path)
+                return False
+            self._pending += 1
+
+        self._executor.submit(self._write, frames, fps, path)
+        return True
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _write(self, frames: list[Frame], fps: float, path: str) -> None:
+        started = time.perf_counter()
+        stem, extension = os.path.splitext(path)
+        tmp_path = f"{stem}.part{extension}"
+        try:
+            image = cv2.imdecode(frames[0][1], cv2.IMREAD_COLOR)
+            height, width = image.shape[:2]
+            writer = cv2.VideoWriter(tmp_path, self.fourcc, fps, (width, height))
+            if not writer.isOpened():
+                logger.error("Не удалось открыть запись фрагмента %s", path)
+                return
+
+            try:
+                first = frames[0][0]
+                ticks = int((frames[-1][0] - first) * fps) + 1
+                index = 0
+                for tick in range(ticks):
+                    moment = first + tick / fps
+                    latest = index
+                    while latest + 1 < len(frames) and frames[latest + 1][0] <= moment:
+                        latest += 1
+                    if latest != index:
+                        index = latest
+                        image = cv2.imdecode(frames[index][1], cv2.IMREAD_COLOR)
+                        if image.shape[:2] != (height, width):
+                            image = cv2.resize(image, (width, height))
+                    writer.write(image)
+            finally:
+                writer.release()
+            os.replace(tmp_path, path)
+            self.written += 1
+            logger.info("Видеофрагмент сохранён: %s", path)
+        except Exception as e:
+            logger.error("Ошибка при записи фрагмента %s: %s", path, repr(e))
+        finally:
+            with self._condition:
+                self.write_seconds.observe(time.perf_counter() - started)
+                self._pending -= 1
+                self._condition.notify_all()
+
+
+def create_clip_writer(settings: Settings) -> ClipWriter:
+    return ClipWriter(
+        settings.clip_path,
+        codec=settings.clip_codec,
+        queue_size=settings.clip_queue_size,
+    )
+
+
+@dataclass
+class _PendingClip:
+    path: str
+    start: float
+    end: float
+    detections: int = 1
+
+
+class ClipRecorder:
+    """
+    Видеофрагменты вокруг обнаружений одной камеры.
+
+    Каждый обработанный кадр, но не чаще ``clip_fps`` раз в секунду,
+    сжимается в JPEG и кладётся в кольцевой буфер. Обнаружение открывает
+    фрагмент от ``clip_pre_s`` секунд до него до ``clip_post_s`` секунд
+    после; обнаружения, пришедшие до конца фрагмента, продлевают его, но не
+    дальше ``clip_max_s``, и ссылаются на тот же файл. Когда буфер догоняет
+    конец фрагмента, его кадры передаются в ClipWriter. Все методы, кроме
+    ``release``, вызываются из потока детектора; ``release`` вызывается и из
+    потока записи снимков, поэтому счётчик обнаружений фрагмента меняется
+    под блокировкой.
+    """
+
+    def __init__(self, settings: Settings, camera_id: int, writer: ClipWriter) -> None:
+        self.settings = settings
+        self.camera_id = camera_id
+        self.writer = writer
+        self.max_s = max(settings.clip_max_s, settings.clip_pre_s + settings.clip_post_s)
+        self.ring = FrameRing(
+            settings.clip_buffer_mb * 1024 * 1024, settings.clip_pre_s + self.max_s
+        )
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, settings.clip_quality]
+        self._interval = 1 / settings.clip_fps
+        self._last_frame = -math.inf
+        self._pending: _PendingClip | None = None
+        self._lock = threading.Lock()
+
+        registry.gauge(
+            "human_capture_clip_buffer_bytes",
+            "Объём кадров JPEG в кольцевом буфере камеры",
+            {"camera": camera_id},
+            lambda: self.ring.bytes,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.clip_enabled
+
+    def add(self, frame: cv2.typing.MatLike) -> None:
+        """Положить кадр в буфер и отдать на запись фрагмент, конец которого наступил."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self._last_frame >= self._interval:
+            success, encoded = cv2.imencode(".jpg", frame, self.params)
+            if success:
+                self.ring.append(now, encoded)
+                self._last_frame = now
+        if self._pending is not None and now >= self._pending.end:
+            self._finish()
+
+    def trigger(self) -> str | None:
+        """
+        Отметить обнаружение.
+
+        :return: Путь к фрагменту, который его покажет, или None, если
+            фрагменты не записываются.
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        pending = self._pending
+        if pending is not None and now <= pending.end:
+            pending.end = min(now + self.settings.clip_post_s, pending.start + self.max_s)
+            with self._lock:
+                pending.detections += 1
+            return pending.path
+        if pending is not None:
+            # Конец фрагмента уже наступил, но add() ещё не успел его отдать:
+            # на его файл ссылаются сохранённые обнаружения.
+            self._finish()
+
+        name = f"clip_{self.camera_id}_{int(time.time() * 1000)}.mp4"
+        self._pending = _PendingClip(
+            path=f"{self.settings.clip_path}/{name}",
+            start=now - self.settings.clip_pre_s,
+            end=now + self.settings.clip_post_s,
+        )
+        return self._pending.path
+
+    def release(self, path: str | None) -> None:
+        """Обнаружение не сохранено: фрагмент без обнаружений не записывается."""
+        with self._lock:
+            pending = self._pending
+            if pending is not None and pending.path == path:
+                pending.detections -= 1
+
+    def close(self) -> None:
+        """Записать начатый фрагмент из того, что успело попасть в буфер, и очистить буфер."""
+        if self._pending is not None:
+            self._finish()
+        self.ring.clear()
+        self._last_frame = -math.inf
+
+    def _finish(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None or pending.detections <= 0:
+            return
+        frames = self.ring.between(pending.start, pending.end)
+        if not frames:
+            logger.warning("Нет кадров для фрагмента %s", pending.path)
+            return
+        self.writer.submit(frames, self.settings.clip_fps, pending.path)
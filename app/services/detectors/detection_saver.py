@@ -1,57 +1,228 @@
 import asyncio
 import logging
 import os
+import threading
 import time
-from typing import Any
+from collections import deque
+from datetime import datetime
+from functools import partial
 
 import cv2
+import pytz
 
 from app.core.config import Settings
+from app.core.metrics import registry
 from app.repositories.detector import DetectionDAO
+from app.services.broadcaster import EventBroadcaster
+from app.services.detectors.clips import ClipRecorder
+from app.services.detectors.image_writer import ImageWriter
+from app.services.detectors.phash import dhash, hamming
+from app.services.detectors.thumbnails import DerivativeCache
+from app.services.detectors.write_buffer import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
 
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def create_image_writer(settings: Settings) -> ImageWriter:
+    return ImageWriter(
+        workers=settings.image_writer_workers,
+        queue_size=settings.image_writer_queue_size,
+        policy=settings.image_writer_policy,
+        image_format=settings.image_format,
+        quality=settings.image_quality,
+    )
+
+
 class DetectionSaver:
     def __init__(
         self,
         settings: Settings,
-        event_queue: asyncio.Queue[Any] | None = None,
+        camera_id: int = 0,
+        broadcaster: EventBroadcaster | None = None,
         loop: asyncio.AbstractEventLoop | None = None,
+        *,
+        write_buffer: WriteBehindBuffer | None = None,
+        image_writer: ImageWriter | None = None,
+        thumbnails: DerivativeCache | None = None,
+        clips: ClipRecorder | None = None,
     ) -> None:
         self.settings = settings
-        self.event_queue = event_queue
+        self.camera_id = camera_id
+        self.broadcaster = broadcaster
         self.loop = loop
+        # Пустой WriteBehindBuffer ложен из-за __len__, поэтому сравнение с None.
+        self.write_buffer = (
+            write_buffer
+            if write_buffer is not None
+            else WriteBehindBuffer(
+                DetectionDAO,
+                batch_size=settings.db_batch_size,
+                flush_interval_ms=settings.db_flush_interval_ms,
+            )
+        )
+        self.image_writer = (
+            image_writer if image_writer is not None else create_image_writer(settings)
+        )
+        self.thumbnails = thumbnails
+        self.clips = clips
+        # (время, хеш) недавно сохранённых вырезок для отсева почти совпадающих.
+        # Пополняется из потока записи снимков, читается из потока детектора.
+        self._recent: deque[tuple[float, int]] = deque()
+        self._recent_lock = threading.Lock()
+        self.duplicates = registry.counter(
+            "human_capture_duplicates_total",
+            "Вырезки, отброшенные как почти совпадающие с недавно сохранёнными",
+            {"camera": camera_id},
+        )
         os.makedirs(settings.save_path, exist_ok=True)
 
-    def save_human_image(
-        self, frame: cv2.typing.MatLike, x: int, y: int, w: int, h: int
+    def save_crop(
+        self, crop: cv2.typing.MatLike, track_id: int | None = None
     ) -> str | None:
-        h_img, w_img = frame.shape[:2]
-        x = max(0, x)
-        y = max(0, y)
-        w = min(w, w_img - x)
-        h = min(h, h_img - y)
-
-        roi = frame[y : y + h, x : x + w]
-        if roi.size == 0:
-            return None
-
-        path = f"{self.settings.save_path}/human_{int(time.time())}.jpg"
-        success = cv2.imwrite(path, roi)
+        """
+        Поставить вырезку с человеком в очередь записи.
 
-        if not success:
-            logger.error("Ошибка при сохранении изображения в: %s", path)
+        Вырезка должна быть копией, а не видом на буфер кадра: кодирование и
+        запись на диск идут в ImageWriter, когда кадр уже перезаписан. Запись в
+        БД и событие SSE отправляются только после того, как файл целиком
+        записан. Возвращает будущий путь к файлу или None, если вырезка
+        отброшена: почти совпадает с недавним снимком или очередь переполнена.
+        Номер трека добавляется к имени файла: снимки разных людей одного кадра
+        не должны совпасть по имени. Запись в БД ссылается на видеофрагмент,
+        который ClipRecorder допишет после окончания post-roll. Хеш вырезки
+        запоминается для отсева дубликатов только после записи файла; если
+        записать его не удалось, фрагмент освобождается.
+        """
+        phash = dhash(crop)
+        if self._is_duplicate(phash):
+            self.duplicates.inc()
             return None
+        clip_path = self.clips.trigger() if self.clips is not None else None
 
-        logger.info("Человек обнаружен. Фото сохранено: %s", path)
+        detected_at = datetime.now(pytz.timezone("Europe/Samara"))
+        suffix = f"_{track_id}" if track_id is not None else ""
+        path = (
+            f"{self.settings.save_path}/"
+            f"human_{self.camera_id}_{int(detected_at.timestamp() * 1000)}{suffix}"
+            f"{self.image_writer.extension}"
+        )
+        queued = self.image_writer.submit(
+            crop,
+            path,
+            partial(
+                self._on_image_written,
+                detected_at=detected_at,
+                image=crop,
+                phash=phash,
+                clip_path=clip_path,
+            ),
+            partial(self._on_image_failed, clip_path=clip_path),
+        )
+        if not queued:
+            if self.clips is not None:
+                self.clips.release(clip_path)
+            return None
         return path
 
-    async def save_to_database(self, image_path: str):
-        await DetectionDAO.add(
+    def _is_duplicate(self, phash: int) -> bool:
+        """
+        Есть ли среди снимков, записанных за ``dedup_window_s`` секунд,
+        отличающийся от этой вырезки не больше чем на ``dedup_max_distance``
+        бит хеша.
+        """
+        window = self.settings.dedup_window_s
+        if window <= 0:
+            return False
+
+        now = time.monotonic()
+        with self._recent_lock:
+            while self._recent and now - self._recent[0][0] > window:
+                self._recent.popleft()
+            return any(
+                hamming(phash, recent) <= self.settings.dedup_max_distance
+                for _, recent in self._recent
+            )
+
+    def _remember(self, phash: int) -> None:
+        if self.settings.dedup_window_s > 0:
+            with self._recent_lock:
+                self._recent.append((time.monotonic(), phash))
+
+    def _on_image_written(
+        self,
+        image_path: str,
+        detected_at: datetime,
+        image: cv2.typing.MatLike,
+        phash: int | None = None,
+        clip_path: str | None = None,
+    ) -> None:
+        logger.info("Человек обнаружен. Фото сохранено: %s", image_path)
+        if phash is not None:
+            self._remember(phash)
+        if self.thumbnails is not None and self.settings.thumbnail_on_write:
+            # Вырезка уже в памяти, копии дешевле сделать сейчас, чем декодировать
+            # файл при первом запросе галереи.
+            self.thumbnails.store(image, os.path.basename(image_path))
+        if self.loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(
+            self.save_to_database(image_path, detected_at, phash, clip_path), self.loop
+        )
+        if self.broadcaster:
+            event_data = {
+                "camera_id": self.camera_id,
+                "image_path": image_path,
+                "thumbnail_path": f"thumbnails/thumb/{os.path.basename(image_path)}",
+                "clip_path": clip_path,
+                "timestamp": int(detected_at.timestamp()),
+            }
+            self.loop.call_soon_threadsafe(self.broadcaster.publish, event_data)
+
+    def _on_image_failed(self, image_path: str, clip_path: str | None = None) -> None:
+        """Снимок не записан: обнаружения не будет, фрагмент на него не ссылается."""
+        if self.clips is not None:
+            self.clips.release(clip_path)
+
+    async def save_to_database(
+        self,
+        image_path: str,
+        detected_at: datetime | None = None,
+        phash: int | None = None,
+        clip_path: str | None = None,
+    ):
+        self.write_buffer.add(
+            timestamp=detected_at or datetime.now(pytz.timezone("Europe/Samara")),
             image_path=image_path,
+            camera_id=self.camera_id,
             x=self.settings.x,
             y=self.settings.y,
             width=self.settings.width,
             height=self.settings.height,
+            phash=phash,
+            clip_path=clip_path,
         )
+
+    def flush_threadsafe(self, timeout: float = 5.0) -> None:
+        """Дописать снимки из очереди, сбросить буфер записи в БД и дождаться."""
+        if not self.image_writer.wait_idle(timeout):
+            logger.warning("Не все снимки успели записаться на диск")
+        if self.loop is None or not self.loop.is_running():
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self.write_buffer.flush(), self.loop)
+        if _running_loop() is self.loop:
+            # Ждать результат в потоке самого цикла нельзя, запись завершится сама.
+            return
+
+        try:
+            future.result(timeout=timeout)
+        except Exception as e:
+            logger.error("Не удалось сбросить буфер записи в БД: %s", repr(e))
@@ -1,11 +1,91 @@
+import time
+
 import cv2
+import numpy as np
 
 from app.core.config import Settings
+from app.services.detectors.buffers import reuse
+
+
+class MotionDetector:
+    """
+    Дешёвая оценка движения в области кадра.
+
+    Область уменьшается до ширины ``width``, переводится в оттенки серого и
+    сравнивается с медленно обновляемым фоном. Результат — доля пикселей,
+    яркость которых отличается от фона больше чем на ``pixel_threshold``.
+    Промежуточные изображения пишутся в одни и те же буферы.
+    """
+
+    def __init__(
+        self,
+        width: int = 160,
+        pixel_threshold: int = 25,
+        learning_rate: float = 0.05,
+    ) -> None:
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.learning_rate = learning_rate
+        self._background: np.ndarray | None = None
+        self._small: np.ndarray | None = None
+        self._gray: np.ndarray | None = None
+        self._diff: np.ndarray | None = None
+
+    def reset(self) -> None:
+        self._background = None
+
+    def update(self, roi: cv2.typing.MatLike) -> float:
+        height, width = roi.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        self._small = cv2.resize(
+            roi,
+            size,
+            dst=reuse(self._small, (size[1], size[0], 3)),
+            interpolation=cv2.INTER_AREA,
+        )
+        self._gray = cv2.cvtColor(
+            self._small, cv2.COLOR_BGR2GRAY, dst=reuse(self._gray, self._small.shape[:2])
+        )
+        gray = cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            return 1.0
+
+        self._diff = diff = cv2.convertScaleAbs(
+            self._background, dst=reuse(self._diff, gray.shape)
+        )
+        cv2.absdiff(gray, diff, dst=diff)
+        cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=diff)
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+        return cv2.countNonZero(diff) / diff.size
 
 
 class FrameProcessor:
     def __init__(self, settings: Settings):
         self.settings: Settings = settings
+        self.motion_detector = MotionDetector(
+            width=settings.motion_downscale_width,
+            pixel_threshold=settings.motion_pixel_threshold,
+        )
+        self.last_inference_time = 0.0
+
+    def configure(self, settings: Settings) -> None:
+        """
+        Перейти на новые область и пороги движения. Если изменилась область
+        или ширина уменьшенного кадра, фон набирается заново.
+        """
+        old = self.settings
+        motion = self.motion_detector
+        if (
+            (old.x, old.y, old.width, old.height)
+            != (settings.x, settings.y, settings.width, settings.height)
+            or motion.width != settings.motion_downscale_width
+        ):
+            motion.reset()
+        motion.width = settings.motion_downscale_width
+        motion.pixel_threshold = settings.motion_pixel_threshold
+        self.settings = settings
 
     def get_roi(self, frame: cv2.typing.MatLike) -> cv2.typing.MatLike | None:
         height, width = frame.shape[:2]
@@ -21,10 +101,30 @@ class FrameProcessor:
             self.settings.x : self.settings.x + self.settings.width,
         ]
 
-    def draw_roi(self, frame: cv2.typing.MatLike):
-        pt1 = (self.settings.x, self.settings.y)
-        pt2 = (
-            self.settings.x + self.settings.width,
-            self.settings.y + self.settings.height,
+    def should_run_inference(
+        self, roi: cv2.typing.MatLike, tracking: bool | None = None
+    ) -> bool:
+        """
+        Решить, нужно ли запускать детекцию лиц на этом кадре.
+
+        Пока трекер ведёт лица, решает он: ``tracking`` — пора ли полной
+        детекции. Иначе детекция идёт при движении в области больше
+        ``motion_threshold`` и не реже одного раза в ``motion_keepalive_s``
+        секунд, чтобы не пропустить неподвижного человека. Фон обновляется на
+        каждом кадре.
+        """
+        now = time.monotonic()
+        moving = (
+            self.settings.motion_gating
+            and self.motion_detector.update(roi) >= self.settings.motion_threshold
         )
-        cv2.rectangle(frame, pt1=pt1, pt2=pt2, color=(0, 255, 0), thickness=2)
+        if tracking is not None:
+            run = tracking
+        elif not self.settings.motion_gating:
+            run = True
+        else:
+            keepalive = now - self.last_inference_time >= self.settings.motion_keepalive_s
+            run = moving or keepalive
+        if run:
+            self.last_inference_time = now
+        return run
@@ -0,0 +1,129 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+def encode_params(image_format: str, quality: int) -> tuple[str, list[int]]:
+    """Расширение файла и параметры cv2.imencode для формата снимков."""
+    if image_format == "webp":
+        return ".webp", [cv2.IMWRITE_WEBP_QUALITY, quality]
+    return ".jpg", [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+
+class ImageWriter:
+    """
+    Кодирование и запись снимков в ограниченном пуле потоков.
+
+    Поток детектора только ставит копию кадра в очередь. Воркер кодирует её
+    через ``cv2.imencode``, пишет во временный файл и атомарно переименовывает,
+    после чего вызывает ``on_written`` — файл к этому моменту уже целиком на
+    диске. Если снимок не удалось закодировать или записать, вызывается
+    ``on_failed``. Если в очереди ``queue_size`` снимков, политика ``drop`` отбрасывает
+    новый снимок, а ``block`` ждёт освобождения места.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 8,
+        policy: str = "drop",
+        image_format: str = "jpg",
+        quality: int = 90,
+    ) -> None:
+        self.queue_size = queue_size
+        self.policy = policy
+        self.extension, self.params = encode_params(image_format, quality)
+        self.dropped = 0
+        self.write_seconds = registry.histogram(
+            "human_capture_image_write_seconds",
+            "Время кодирования и записи снимка на диск, секунды",
+        )
+        registry.gauge(
+            "human_capture_image_write_queue",
+            "Снимки в очереди записи на диск",
+            function=lambda: self._pending,
+        )
+        registry.counter(
+            "human_capture_image_write_dropped_total",
+            "Снимки, отброшенные из-за переполнения очереди записи",
+            function=lambda: self.dropped,
+        )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="image-writer"
+        )
+        self._pending = 0
+        self._condition = threading.Condition()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(
+        self,
+        image: cv2.typing.MatLike,
+        path: str,
+        on_written: Callable[[str], None],
+        on_failed: Callable[[str], None] | None = None,
+    ) -> bool:
+        """Поставить снимок в очередь записи, False — снимок отброшен."""
+        with self._condition:
+            if self._pending >= self.queue_size:
+                if self.policy == "drop":
+                    self.dropped += 1
+                    logger.warning("Очередь записи снимков заполнена, снимок отброшен")
+                    return False
+                self._condition.wait_for(lambda: self._pending < self.queue_size)
+            self._pending += 1
+
+        self._executor.submit(self._write, image, path, on_written, on_failed)
+        return True
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Дождаться записи всех поставленных в очередь снимков."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _write(
+        self,
+        image: cv2.typing.MatLike,
+        path: str,
+        on_written: Callable[[str], None],
+        on_failed: Callable[[str], None] | None,
+    ) -> None:
+        started = time.perf_counter()
+        written = False
+        try:
+            success, encoded = cv2.imencode(self.extension, image, self.params)
+            if success:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(encoded)
+                os.replace(tmp_path, path)
+                written = True
+                on_written(path)
+            else:
+                logger.error("Ошибка при кодировании изображения: %s", path)
+        except Exception as e:
+            logger.error("Ошибка при сохранении изображения в %s: %s", path, repr(e))
+        finally:
+            with self._condition:
+                # Воркеров несколько, гистограмма обновляется под уже взятой
+                # блокировкой очереди, чтобы не терять наблюдения.
+                self.write_seconds.observe(time.perf_counter() - started)
+                self._pending -= 1
+                self._condition.notify_all()
+        if not written and on_failed is not None:
+            on_failed(path)
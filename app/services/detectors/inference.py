@@ -0,0 +1,315 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from abc import ABC, abstractmethod
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+
+import cv2
+import numpy as np
+
+from app.core.config import Settings
+from app.services.detectors.face_detector import FaceBox, FaceDetector
+from app.services.detectors.metrics import PipelineMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBackend(ABC):
+    """Способ запуска детекции лиц для HumanDetector."""
+
+    # Необязательные хуки: пустая реализация по умолчанию — осознанный выбор.
+    def start(self) -> None:  # noqa: B027
+        """Подготовить ресурсы перед первым кадром."""
+
+    @property
+    def ready(self) -> bool:
+        """Модель загружена, первый кадр не будет ждать её построения."""
+        return True
+
+    def warm_up(self, shape: tuple[int, ...], settings: Settings) -> None:
+        """Загрузить модель заранее, прогнав через неё пустой кадр формы ``shape``."""
+        self.start()
+        self.detect(np.zeros(shape, dtype=np.uint8), settings)
+
+    def configure(self, settings: Settings) -> None:  # noqa: B027
+        """Применить изменённые модель и порог, вызывается между кадрами."""
+
+    @abstractmethod
+    def detect(
+        self,
+        roi: cv2.typing.MatLike,
+        settings: Settings,
+        metrics: PipelineMetrics | None = None,
+    ) -> list[FaceBox]:
+        """Найти лица в области кадра, время этапов записать в metrics."""
+
+    def close(self) -> None:  # noqa: B027
+        """Освободить ресурсы."""
+
+
+class InlineInferenceBackend(InferenceBackend):
+    """
+    Детекция прямо в потоке детектора, модель своя у каждой камеры.
+
+    Модель строится при первом кадре или при прогреве, а не при создании
+    бэкенда: импорт приложения и запуск сервера не ждут MediaPipe.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._face_detector: FaceDetector | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def face_detector(self) -> FaceDetector:
+        if self._face_detector is None:
+            with self._lock:
+                if self._face_detector is None:
+                    started = time.perf_counter()
+                    self._face_detector = FaceDetector(self.settings)
+                    logger.info(
+                        "Модель детекции загружена за %.2f с",
+                        time.perf_counter() - started,
+                    )
+        return self._face_detector
+
+    @property
+    def ready(self) -> bool:
+        return self._face_detector is not None
+
+    def configure(self, settings: Settings) -> None:
+        self.settings = settings
+        if self._face_detector is None:
+            return
+        if self._face_detector.configure(settings):
+            logger.info(
+                "Модель детекции пересоздана: model_selection=%s, порог %s",
+                settings.face_model_selection,
+                settings.face_min_detection_confidence,
+            )
+
+    def detect(
+        self,
+        roi: cv2.typing.MatLike,
+        settings: Settings,
+        metrics: PipelineMetrics | None = None,
+    ) -> list[FaceBox]:
+        faces = self.face_detector.detect(roi)
+        if metrics is not None:
+            convert_s, inference_s = self.face_detector.timings
+            metrics.stages["convert"].observe(convert_s)
+            metrics.stages["inference"].observe(inference_s)
+        return faces
+
+
+def _worker_main(conn: Connection) -> None:
+    """
+    Цикл процесса-воркера: кадр берётся из shared memory, обратно уходят рамки
+    и время подготовки кадра и MediaPipe.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cv2.setNumThreads(1)
+
+    # Модель на каждый model_selection, порог применяется к ней перед кадром.
+    detectors: dict[int, FaceDetector] = {}
+    segment: SharedMemory | None = None
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        name, shape, model_selection, confidence, inference_width = message
+        try:
+            if segment is None or segment.name != name:
+                if segment is not None:
+                    segment.close()
+                segment = SharedMemory(name=name)
+
+            detector = detectors.get(model_selection)
+            if detector is None or detector.min_confidence != confidence:
+                config = Settings(
+                    face_model_selection=model_selection,
+                    face_min_detection_confidence=confidence,
+                )  # type: ignore
+                if detector is None:
+                    detector = detectors[model_selection] = FaceDetector(config)
+                else:
+                    detector.configure(config)
+            detector.max_width = inference_width
+
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=segment.buf)
+            faces = [tuple(face) for face in detector.detect(frame)]
+            conn.send((faces, *detector.timings))
+        except Exception as e:  # noqa: BLE001
+            conn.send(e)
+
+    if segment is not None:
+        segment.close()
+
+
+class _Worker:
+    def __init__(self, context: multiprocessing.context.SpawnContext) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.segment: SharedMemory | None = None
+
+    def frame_view(self, shape: tuple[int, ...]) -> np.ndarray:
+        size = int(np.prod(shape))
+        if self.segment is None or self.segment.size < size:
+            self.release_segment()
+            self.segment = SharedMemory(create=True, size=size)
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.segment.buf)
+
+    def release_segment(self) -> None:
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+        self.release_segment()
+
+
+class ProcessInferenceBackend(InferenceBackend):
+    """
+    Детекция в отдельных процессах, кадры передаются через shared memory.
+
+    У каждого воркера свой сегмент разделяемой памяти: область кадра
+    копируется в него один раз без pickle, по pipe уходят только имя сегмента,
+    форма массива и параметры модели. Бэкенд общий для всех камер пула, поток
+    детектора берёт свободного воркера и ждёт результат, не удерживая GIL.
+    """
+
+    def __init__(self, workers: int = 0) -> None:
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self._context = multiprocessing.get_context("spawn")
+        self._all: list[_Worker] = []
+        self._idle: queue.Queue[_Worker | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._warm = False
+
+    @property
+    def ready(self) -> bool:
+        return self._warm
+
+    def warm_up(self, shape: tuple[int, ...], settings: Settings) -> None:
+        """Запустить процессы и построить модель в каждом: воркеры берутся по кругу."""
+        if self._warm:
+            return
+        self.start()
+        frame = np.zeros(shape, dtype=np.uint8)
+        for _ in range(self.workers):
+            self.detect(frame, settings)
+        self._warm = True
+
+    def start(self) -> None:
+        with self._lock:
+            if not self._all:
+                # Убрать метку закрытия, оставленную close().
+                self._drain()
+            while len(self._all) < self.workers:
+                worker = _Worker(self._context)
+                self._all.append(worker)
+                self._idle.put(worker)
+            logger.info("Запущено процессов детекции: %s", len(self._all))
+
+    def detect(
+        self,
+        roi: cv2.typing.MatLike,
+        settings: Settings,
+        metrics: PipelineMetrics | None = None,
+    ) -> list[FaceBox]:
+        if not self._all:
+            self.start()
+
+        worker = self._idle.get()
+        if worker is None:
+            # Бэкенд закрыт: метка возвращается в очередь для следующего
+            # ждущего потока.
+            self._idle.put(None)
+            return []
+        try:
+            np.copyto(worker.frame_view(roi.shape), roi)
+            worker.conn.send(
+                (
+                    worker.segment.name,  # type: ignore
+                    roi.shape,
+                    settings.face_model_selection,
+                    settings.face_min_detection_confidence,
+                    settings.inference_width,
+                )
+            )
+            result = worker.conn.recv()
+        except (EOFError, BrokenPipeError, OSError) as e:
+            logger.error("Процесс детекции завершился: %s", repr(e))
+            worker = self._replace(worker)
+            return []
+        finally:
+            self._release(worker)
+
+        if isinstance(result, Exception):
+            logger.error("Ошибка в процессе детекции: %s", repr(result))
+            return []
+
+        faces, convert_s, inference_s = result
+        # Как и у inline, готовность наступает и без прогрева — после первого
+        # кадра, прошедшего через модель.
+        self._warm = True
+        if metrics is not None:
+            metrics.stages["convert"].observe(convert_s)
+            metrics.stages["inference"].observe(inference_s)
+        return [FaceBox(*face) for face in faces]
+
+    def close(self) -> None:
+        """
+        Остановить воркеры. Очередь не подменяется: потоки, ждущие в ней
+        свободного воркера, получают метку None и возвращают пустой результат.
+        """
+        with self._lock:
+            for worker in self._all:
+                worker.close()
+            self._all.clear()
+            self._drain()
+            self._idle.put(None)
+            self._warm = False
+
+    def _drain(self) -> None:
+        with self._idle.mutex:
+            self._idle.queue.clear()
+
+    def _release(self, worker: _Worker) -> None:
+        """Вернуть воркера в очередь, если его не остановил close()."""
+        with self._lock:
+            if worker in self._all:
+                self._idle.put(worker)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        with self._lock:
+            worker.close()
+            if worker not in self._all:
+                return worker
+            replacement = _Worker(self._context)
+            self._all[self._all.index(worker)] = replacement
+            return replacement
+
@@ -0,0 +1,57 @@
+from typing import Any
+
+from app.core.metrics import MetricsRegistry, registry
+
+
+class PipelineMetrics:
+    """
+    Время этапов и счётчики одного конвейера детекции.
+
+    Гистограммы и счётчики создаются один раз и регистрируются в реестре
+    /metrics с меткой камеры; цикл детектора обновляет их напрямую.
+    """
+
+    STAGES = ("read", "roi", "motion", "convert", "inference", "crop", "clip", "preview")
+
+    def __init__(self, camera_id: int = 0, registry: MetricsRegistry = registry) -> None:
+        camera = {"camera": camera_id}
+        self.stages = {
+            stage: registry.histogram(
+                "human_capture_stage_seconds",
+                "Время этапа конвейера детекции, секунды",
+                {**camera, "stage": stage},
+            )
+            for stage in self.STAGES
+        }
+        self.inference_runs = registry.counter(
+            "human_capture_inference_total",
+            "Кадры, на которых запускалась или пропускалась детекция лиц",
+            {**camera, "result": "run"},
+        )
+        self.inference_skipped = registry.counter(
+            "human_capture_inference_total",
+            "Кадры, на которых запускалась или пропускалась детекция лиц",
+            {**camera, "result": "skipped"},
+        )
+        self.detections = registry.counter(
+            "human_capture_detections_total",
+            "Кадры, на которых найдено хотя бы одно лицо",
+            camera,
+        )
+        self.saves = registry.counter(
+            "human_capture_saves_total",
+            "Вырезки, поставленные в очередь записи",
+            camera,
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "stages": {
+                stage: histogram.snapshot()
+                for stage, histogram in self.stages.items()
+            },
+            "inference_runs": self.inference_runs.value,
+            "inference_skipped": self.inference_skipped.value,
+            "detections": self.detections.value,
+            "saves": self.saves.value,
+        }
@@ -0,0 +1,25 @@
+import cv2
+import numpy as np
+
+HASH_SIZE = 8
+MASK_64 = (1 << 64) - 1
+
+
+def dhash(image: cv2.typing.MatLike) -> int:
+    """
+    Разностный перцептивный хеш (dHash) изображения BGR, 64 бита.
+
+    Изображение уменьшается до 9x8 в оттенках серого, каждый бит — ярче ли
+    пиксель соседа справа. Хеш устойчив к масштабу, сжатию и небольшим
+    изменениям яркости. Возвращается со знаком, как его хранит INTEGER SQLite.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a: int, b: int) -> int:
+    """Число различающихся битов двух хешей."""
+    return ((a ^ b) & MASK_64).bit_count()
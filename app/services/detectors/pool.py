@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Iterator
+
+import cv2
+
+from app.core.config import Settings, hot_reload
+from app.repositories.detector import DetectionDAO
+from app.services.broadcaster import EventBroadcaster
+from app.services.detectors.base import HumanDetector
+from app.services.detectors.clips import create_clip_writer
+from app.services.detectors.detection_saver import create_image_writer
+from app.services.detectors.inference import (
+    InferenceBackend,
+    ProcessInferenceBackend,
+)
+from app.services.detectors.thumbnails import create_thumbnail_cache
+from app.services.detectors.write_buffer import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class DetectorPool:
+    """
+    Набор независимых конвейеров детекции, по одному на камеру.
+
+    Каждый конвейер работает в своём потоке. OpenCV и MediaPipe отпускают GIL
+    на время тяжёлых вычислений, поэтому потоки разных камер занимают разные
+    ядра; внутренний пул потоков OpenCV делится между камерами поровну, чтобы
+    конвейеры не конкурировали за одни и те же ядра. С бэкендом ``process``
+    все камеры делят один пул процессов детекции. Буфер записи в БД, пулы
+    записи снимков и видеофрагментов и кэш уменьшенных копий тоже общие,
+    чтобы обнаружения разных камер попадали в одни и те же INSERT, а число
+    потоков записи не росло с числом камер.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.inference: InferenceBackend | None = None
+        if settings.inference_backend == "process":
+            self.inference = ProcessInferenceBackend(settings.inference_workers)
+        self.write_buffer = WriteBehindBuffer(
+            DetectionDAO,
+            batch_size=settings.db_batch_size,
+            flush_interval_ms=settings.db_flush_interval_ms,
+        )
+        self.image_writer = create_image_writer(settings)
+        self.thumbnails = create_thumbnail_cache(settings)
+        self.clip_writer = create_clip_writer(settings)
+
+        self.detectors: dict[int, HumanDetector] = {
+            camera.id: HumanDetector(
+                settings=settings.for_camera(camera),
+                camera_id=camera.id,
+                camera_index=camera.camera_index,
+                inference=self.inference,
+                write_buffer=self.write_buffer,
+                image_writer=self.image_writer,
+                thumbnails=self.thumbnails,
+                clip_writer=self.clip_writer,
+            )
+            for camera in settings.camera_list()
+        }
+        cv2.setNumThreads(max(1, (os.cpu_count() or 1) // len(self.detectors)))
+
+    @property
+    def ready(self) -> bool:
+        """Все камеры прогреты: модели загружены, при warmup=camera камеры открыты."""
+        return all(detector.ready for detector in self)
+
+    def warm_up(self) -> None:
+        """
+        Прогреть камеры по очереди; выполняется в фоне после запуска сервера.
+
+        Общий пул процессов детекции прогревается один раз, на первой камере.
+        """
+        started = time.perf_counter()
+        for detector in self:
+            try:
+                detector.warm_up()
+            except Exception as e:  # noqa: PERF203
+                logger.error(
+                    "Ошибка прогрева камеры %s: %s", detector.camera_id, repr(e)
+                )
+        logger.info("Прогрев завершён за %.2f с", time.perf_counter() - started)
+
+    def __iter__(self) -> Iterator[HumanDetector]:
+        return iter(self.detectors.values())
+
+    def __len__(self) -> int:
+        return len(self.detectors)
+
+    @property
+    def default(self) -> HumanDetector:
+        """Первая камера из настроек, ей управляют /start и /stop."""
+        return next(iter(self.detectors.values()))
+
+    def get(self, camera_id: int) -> HumanDetector | None:
+        return self.detectors.get(camera_id)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """
+        Передать камерам изменённые области, пороги и темп.
+
+        Камеры, которых нет в новых настройках, работают с прежними до
+        перезапуска; новые камеры тоже появятся только после него.
+        """
+        self.settings = hot_reload(self.settings, settings)
+        cameras = {camera.id: camera for camera in self.settings.camera_list()}
+        for camera_id, detector in self.detectors.items():
+            camera = cameras.get(camera_id)
+            if camera is not None:
+                detector.update_settings(self.settings.for_camera(camera))
+
+    def bind(
+        self, broadcaster: EventBroadcaster, loop: asyncio.AbstractEventLoop
+    ) -> None:
+        for detector in self:
+            detector.bind(broadcaster, loop)
+
+    def stop_all(self) -> None:
+        for detector in self:
+            detector.stop()
+
+    def close(self) -> None:
+        self.stop_all()
+        # Общий пул процессов закрывается один раз, собственные модели камер —
+        # каждая своя.
+        for detector in self:
+            if detector.inference is not self.inference:
+                detector.inference.close()
+        if self.inference is not None:
+            self.inference.close()
+        self.image_writer.close()
+        self.clip_writer.close()
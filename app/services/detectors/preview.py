@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import math
+import time
+from collections.abc import AsyncIterator, Iterable
+
+import cv2
+import numpy as np
+
+from app.core.config import Settings
+from app.core.metrics import registry
+from app.services.detectors.buffers import reuse
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = "frame"
+ROI_COLOR = (0, 255, 0)
+FACE_COLOR = (0, 0, 255)
+
+
+class LivePreview:
+    """
+    Живой просмотр камеры в MJPEG с рамками области и лиц.
+
+    Поток детектора готовит кадр просмотра только пока есть зрители и не
+    чаще ``preview_fps`` раз в секунду, независимо от темпа детекции. Кадр
+    сначала уменьшается до ``preview_width``, потом на нём рисуются рамки,
+    поэтому стоимость не зависит от разрешения камеры. JPEG и заголовок части
+    multipart собираются один раз и отдаются всем зрителям одним объектом
+    bytes; зритель, не успевающий за потоком, пропускает кадры, а не копит
+    очередь.
+    """
+
+    def __init__(self, settings: Settings, camera_id: int) -> None:
+        self.camera_id = camera_id
+        self.viewers = 0
+        self.encoded = 0
+        self.configure(settings)
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._part: bytes | None = None
+        self._event: asyncio.Event | None = None
+        self._last_frame = -math.inf
+        self._canvas: np.ndarray | None = None
+
+        camera = {"camera": camera_id}
+        registry.gauge(
+            "human_capture_preview_viewers",
+            "Зрители живого просмотра камеры",
+            camera,
+            lambda: self.viewers,
+        )
+        registry.counter(
+            "human_capture_preview_frames_total",
+            "Кадры живого просмотра, сжатые в JPEG",
+            camera,
+            lambda: self.encoded,
+        )
+
+    def configure(self, settings: Settings) -> None:
+        self.interval = 1 / settings.preview_fps
+        self.width = settings.preview_width
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, settings.preview_quality]
+
+    @property
+    def watched(self) -> bool:
+        return self.viewers > 0 and self._loop is not None
+
+    def update(
+        self,
+        frame: cv2.typing.MatLike,
+        roi: tuple[int, int, int, int],
+        faces: Iterable[tuple[int, int, int, int]],
+    ) -> None:
+        """
+        Подготовить кадр просмотра из кадра камеры. Вызывается из потока детектора.
+
+        :param frame: Полный кадр камеры, не изменяется.
+        :param roi: Область детекции (x, y, ширина, высота) в координатах кадра.
+        :param faces: Рамки лиц (x, y, ширина, высота) в координатах кадра.
+        """
+        if not self.watched:
+            return
+        now = time.monotonic()
+        if now - self._last_frame < self.interval:
+            return
+        self._last_frame = now
+
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.width / width)
+        if scale < 1.0:
+            size = (self.width, max(1, round(height * scale)))
+            self._canvas = reuse(self._canvas, (size[1], size[0], *frame.shape[2:]))
+            cv2.resize(frame, size, dst=self._canvas, interpolation=cv2.INTER_AREA)
+        else:
+            self._canvas = reuse(self._canvas, frame.shape)
+            np.copyto(self._canvas, frame)
+
+        self._draw_box(roi, scale, ROI_COLOR)
+        for box in faces:
+            self._draw_box(box, scale, FACE_COLOR)
+
+        success, encoded = cv2.imencode(".jpg", self._canvas, self.params)
+        if not success:
+            return
+        self.encoded += 1
+        data = encoded.tobytes()
+        part = (
+            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n"
+        ).encode() + data + b"\r\n"
+        try:
+            self._loop.call_soon_threadsafe(self._publish, part)  # type: ignore
+        except RuntimeError:
+            # Event loop закрыт: сервер останавливается.
+            self._loop = None
+
+    def _draw_box(
+        self, box: tuple[int, int, int, int], scale: float, color: tuple[int, int, int]
+    ) -> None:
+        x, y, w, h = (round(value * scale) for value in box)
+        cv2.rectangle(self._canvas, (x, y), (x + w, y + h), color, 2)  # type: ignore
+
+    def _publish(self, part: bytes) -> None:
+        self._part = part
+        event, self._event = self._event, None
+        if event is not None:
+            event.set()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """
+        Части multipart/x-mixed-replace для одного зрителя.
+
+        Сначала отдаётся последний готовый кадр, если он есть, затем каждый
+        новый. Зритель считается, пока генератор не закрыт.
+        """
+        self._loop = asyncio.get_running_loop()
+        self.viewers += 1
+        logger.info(
+            "Камера %s: зритель подключился к просмотру, всего %s",
+            self.camera_id,
+            self.viewers,
+        )
+        try:
+            part = self._part
+            while True:
+                if part is not None:
+                    yield part
+                if self._event is None:
+                    self._event = asyncio.Event()
+                await self._event.wait()
+                part = self._part
+        finally:
+            self.viewers -= 1
+            if not self.viewers:
+                self._part = None
+            logger.info(
+                "Камера %s: зритель отключился от просмотра, осталось %s",
+                self.camera_id,
+                self.viewers,
+            )
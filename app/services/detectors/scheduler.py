@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Any
+
+from app.core.config import Settings
+
+IDLE = "idle"
+ACTIVE = "active"
+CONFIRM = "confirm"
+
+
+class FrameRateScheduler:
+    """
+    Темп цикла детекции в зависимости от состояния.
+
+    ``idle`` — лиц давно не было, кадры обрабатываются с ``idle_fps``.
+    ``active`` — лицо было в кадре последние ``active_hold_s`` секунд
+    (например, сразу после сохранения снимка), темп ``active_fps``.
+    ``confirm`` — идёт окно подтверждения найденного лица, темп
+    ``confirm_fps``; 0 означает без ограничения. При ошибках чтения кадра
+    пауза растёт экспоненциально до ``read_backoff_max_s`` и сбрасывается после
+    первого удачного чтения.
+    """
+
+    def __init__(self, settings: Settings, backoff_initial_s: float = 0.05) -> None:
+        self.backoff_initial_s = backoff_initial_s
+        self.configure(settings)
+
+        self.state = IDLE
+        self.effective_fps = 0.0
+        self.read_failures = 0
+        self._backoff = 0.0
+        self._last_tick: float | None = None
+
+    def configure(self, settings: Settings) -> None:
+        """Изменить темп состояний; действует со следующего кадра."""
+        self.rates = {
+            IDLE: settings.idle_fps,
+            ACTIVE: settings.active_fps,
+            CONFIRM: settings.confirm_fps,
+        }
+        self.active_hold_s = settings.active_hold_s
+        self.backoff_max_s = settings.read_backoff_max_s
+
+    def select_state(self, confirming: bool, last_face_time: float | None) -> str:
+        if confirming:
+            self.state = CONFIRM
+        elif (
+            last_face_time is not None
+            and time.monotonic() - last_face_time < self.active_hold_s
+        ):
+            self.state = ACTIVE
+        else:
+            self.state = IDLE
+        return self.state
+
+    @property
+    def target_fps(self) -> float:
+        return self.rates[self.state]
+
+    def wait(self, stop_event: threading.Event) -> None:
+        """Дождаться следующего кадра по текущему темпу и обновить фактический FPS."""
+        now = time.monotonic()
+        if self._last_tick is not None and self.target_fps > 0:
+            delay = 1 / self.target_fps - (now - self._last_tick)
+            if delay > 0 and stop_event.wait(delay):
+                return
+            now = time.monotonic()
+
+        if self._last_tick is not None:
+            interval = now - self._last_tick
+            if interval > 0:
+                rate = 1 / interval
+                self.effective_fps += 0.1 * (rate - self.effective_fps)
+        self._last_tick = now
+
+    def read_failed(self, stop_event: threading.Event) -> None:
+        self.read_failures += 1
+        self._backoff = min(
+            self.backoff_max_s, max(self.backoff_initial_s, self._backoff * 2)
+        )
+        stop_event.wait(self._backoff)
+        self._last_tick = None
+
+    def read_succeeded(self) -> None:
+        self._backoff = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "target_fps": self.target_fps,
+            "effective_fps": round(self.effective_fps, 2),
+            "read_failures": self.read_failures,
+        }
@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from app.core.config import Settings
+from app.core.metrics import registry
+from app.services.detectors.image_writer import encode_params
+
+logger = logging.getLogger(__name__)
+
+
+class DerivativeCache:
+    """
+    Уменьшенные копии сохранённых снимков на диске.
+
+    Для каждого размера из ``sizes`` (имя → ширина в пикселях) копия лежит
+    в ``cache_dir/<размер>/``. Копии создаются сразу при записи снимка из уже
+    декодированной вырезки или при первом запросе из файла. Суммарный объём
+    ограничен ``max_bytes``: при превышении удаляются давно не запрошенные
+    копии, при следующем запросе они создаются заново. Методы потокобезопасны.
+    """
+
+    def __init__(
+        self,
+        source_dir: str,
+        cache_dir: str,
+        sizes: dict[str, int],
+        max_bytes: int,
+        *,
+        image_format: str = "jpg",
+        quality: int = 80,
+    ) -> None:
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.sizes = sizes
+        self.max_bytes = max_bytes
+        self.extension, self.params = encode_params(image_format, quality)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._load_index()
+
+        registry.gauge(
+            "human_capture_thumbnail_cache_bytes",
+            "Объём уменьшенных копий снимков на диске",
+            function=lambda: self._total,
+        )
+        for result in ("hit", "miss"):
+            registry.counter(
+                "human_capture_thumbnail_requests_total",
+                "Запросы уменьшенных копий: hit — копия уже была, miss — создана",
+                {"result": result},
+                lambda result=result: self.hits if result == "hit" else self.misses,
+            )
+        registry.counter(
+            "human_capture_thumbnail_evictions_total",
+            "Уменьшенные копии, удалённые из-за ограничения объёма",
+            function=lambda: self.evictions,
+        )
+
+    def path(self, size: str, name: str) -> str:
+        stem = os.path.splitext(name)[0]
+        return os.path.join(self.cache_dir, size, f"{stem}{self.extension}")
+
+    def store(self, image: cv2.typing.MatLike, name: str) -> None:
+        """Создать все размеры из уже декодированного снимка."""
+        for size in self.sizes:
+            self._write(size, name, image)
+
+    def get(self, size: str, name: str) -> str | None:
+        """Путь к копии снимка ``name``, None — нет такого размера или снимка."""
+        if size not in self.sizes or os.path.basename(name) != name:
+            return None
+
+        path = self.path(size, name)
+        with self._lock:
+            if path in self._entries and os.path.exists(path):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return path
+
+        source = os.path.join(self.source_dir, name)
+        image = cv2.imread(source) if os.path.isfile(source) else None
+        if image is None:
+            return None
+        self.misses += 1
+        return path if self._write(size, name, image) else None
+
+    def discard(self, name: str) -> None:
+        """Удалить все копии снимка, например вместе с самим снимком."""
+        for size in self.sizes:
+            path = self.path(size, name)
+            with self._lock:
+                self._total -= self._entries.pop(path, 0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, size: str, name: str, image: cv2.typing.MatLike) -> bool:
+        width = self.sizes[size]
+        h, w = image.shape[:2]
+        if w > width:
+            image = cv2.resize(
+                image, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA
+            )
+
+        success, encoded = cv2.imencode(self.extension, image, self.params)
+        if not success:
+            logger.error("Ошибка при кодировании уменьшенной копии %s", name)
+            return False
+
+        path = self.path(size, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total += len(encoded) - self._entries.pop(path, 0)
+            self._entries[path] = len(encoded)
+            self._evict()
+        return True
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _load_index(self) -> None:
+        """Восстановить индекс по файлам на диске, старые копии — первыми на удаление."""
+        files = []
+        for size in self.sizes:
+            directory = os.path.join(self.cache_dir, size)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                files.extend(
+                    (entry.stat().st_mtime, entry.path, entry.stat().st_size)
+                    for entry in entries
+                    if entry.is_file() and not entry.name.endswith(".tmp")
+                )
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._total += size
+        with self._lock:
+            self._evict()
+
+
+def create_thumbnail_cache(settings: Settings) -> DerivativeCache:
+    return DerivativeCache(
+        source_dir=settings.save_path,
+        cache_dir=settings.thumbnail_path,
+        sizes=settings.thumbnail_sizes,
+        max_bytes=settings.thumbnail_cache_max_mb * 1024 * 1024,
+        image_format=settings.image_format,
+        quality=settings.thumbnail_quality,
+    )
@@ -0,0 +1,288 @@
+import itertools
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+from app.core.config import Settings
+from app.services.detectors.buffers import reuse
+from app.services.detectors.face_detector import FaceBox
+
+
+def iou(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> float:
+    """Отношение площади пересечения рамок (x, y, w, h) к площади объединения."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / (aw * ah + bw * bh - inter)
+
+
+def centroid_distance(
+    a: tuple[int, int, int, int], b: tuple[int, int, int, int]
+) -> float:
+    """Расстояние между центрами рамок в долях большей стороны рамки ``a``."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    dx = (ax + aw / 2) - (bx + bw / 2)
+    dy = (ay + ah / 2) - (by + bh / 2)
+    return float(np.hypot(dx, dy)) / max(aw, ah, 1)
+
+
+def crop_box(
+    frame: cv2.typing.MatLike,
+    box: tuple[int, int, int, int],
+    out: np.ndarray | None = None,
+) -> np.ndarray | None:
+    """
+    Копия области кадра, обрезанной по его границам; None, если она пустая.
+
+    Если ``out`` того же размера, копия пишется в него.
+    """
+    x, y, w, h = box
+    h_img, w_img = frame.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(w_img, x + w), min(h_img, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    region = frame[y0:y1, x0:x1]
+    out = reuse(out, region.shape)
+    np.copyto(out, region)
+    return out
+
+
+@dataclass(eq=False)
+class Track:
+    """Одно лицо, прослеженное через несколько кадров."""
+
+    id: int
+    box: tuple[int, int, int, int]
+    score: float
+    first_seen: float
+    last_seen: float
+    hits: int = 1
+    best_quality: float = 0.0
+    best_crop: np.ndarray | None = field(default=None, repr=False)
+    template: np.ndarray | None = field(default=None, repr=False)
+    # На сколько шаблон смещён от угла рамки, если рамка выходит за область.
+    template_shift: tuple[int, int] = (0, 0)
+    saved: bool = False
+
+    @property
+    def quality(self) -> float:
+        """Чем крупнее рамка и увереннее детекция, тем лучше снимок."""
+        _, _, w, h = self.box
+        return w * h * self.score
+
+
+class FaceTracker:
+    """
+    Сопоставление лиц между кадрами и выбор одного лучшего снимка на человека.
+
+    Рамки MediaPipe сопоставляются с треками жадно по IoU, а если рамки не
+    пересекаются — по расстоянию между центрами. Для каждого трека хранится
+    вырезка с наибольшим произведением площади рамки на уверенность. Трек
+    сохраняется один раз: когда он прожил ``save_after_s`` секунд или когда
+    пропал из кадра, набрав не меньше ``min_hits`` детекций.
+
+    Пока треки есть, полная детекция идёт на каждом ``detect_every``-м кадре,
+    а между ними рамки сдвигаются сопоставлением шаблона лица в окрестности
+    прежнего положения, чтобы следующая детекция сопоставилась с нужным
+    треком. Продлевает трек только детекция: трек без неё дольше ``ttl_s``
+    секунд считается ушедшим, даже если шаблон похож на что-то в кадре.
+    """
+
+    def __init__(self, settings: Settings, centroid_threshold: float = 1.0) -> None:
+        self.centroid_threshold = centroid_threshold
+        self.configure(settings)
+
+        self.tracks: list[Track] = []
+        self._ids = itertools.count(1)
+        self._frames_since_detection = 0
+        self._gray: np.ndarray | None = None
+
+    def configure(self, settings: Settings) -> None:
+        """Изменить пороги сопоставления и сохранения, текущие треки остаются."""
+        self.iou_threshold = settings.track_iou_threshold
+        self.ttl_s = settings.track_ttl_s
+        self.min_hits = settings.track_min_hits
+        self.save_after_s = settings.track_save_after_s
+        self.detect_every = settings.track_detect_every
+        self.match_threshold = settings.track_match_threshold
+
+    @property
+    def pending(self) -> bool:
+        """Есть треки, лучший снимок которых ещё не сохранён."""
+        return any(not track.saved for track in self.tracks)
+
+    def detection_due(self) -> bool:
+        """Нужна ли на этом кадре полная детекция, а не сдвиг по шаблону."""
+        return self._frames_since_detection + 1 >= self.detect_every
+
+    def update(
+        self,
+        frame: cv2.typing.MatLike,
+        roi: cv2.typing.MatLike,
+        offset: tuple[int, int],
+        faces: list[FaceBox],
+    ) -> list[Track]:
+        """
+        Учесть результат полной детекции.
+
+        :param frame: Кадр целиком, из него берутся вырезки.
+        :param roi: Область кадра, в которой искались лица.
+        :param offset: Положение области в кадре.
+        :param faces: Рамки лиц в координатах области.
+        :return: Треки, снимок которых пора сохранить.
+        """
+        now = time.monotonic()
+        self._frames_since_detection = 0
+        gray = self._to_gray(roi) if faces else None
+
+        unmatched = set(range(len(faces)))
+        for track, index in self._associate(faces):
+            face = faces[index]
+            track.box = (face.x, face.y, face.width, face.height)
+            track.score = face.score
+            track.last_seen = now
+            track.hits += 1
+            unmatched.discard(index)
+            self._refresh(track, frame, gray, offset)  # type: ignore
+
+        for index in sorted(unmatched):
+            face = faces[index]
+            track = Track(
+                id=next(self._ids),
+                box=(face.x, face.y, face.width, face.height),
+                score=face.score,
+                first_seen=now,
+                last_seen=now,
+            )
+            self.tracks.append(track)
+            self._refresh(track, frame, gray, offset)  # type: ignore
+
+        return self._collect(now)
+
+    def predict(self, roi: cv2.typing.MatLike) -> list[Track]:
+        """
+        Сдвинуть треки без полной детекции, по шаблону лица.
+
+        :return: Треки, снимок которых пора сохранить.
+        """
+        self._frames_since_detection += 1
+        if self.tracks:
+            gray = self._to_gray(roi)
+            for track in self.tracks:
+                self._match_template(track, gray)
+        return self._collect(time.monotonic())
+
+    def reset(self) -> list[Track]:
+        """Завершить все треки, например при остановке камеры."""
+        ready = [track for track in self.tracks if self._worth_saving(track)]
+        self.tracks.clear()
+        return ready
+
+    def _to_gray(self, roi: cv2.typing.MatLike) -> np.ndarray:
+        self._gray = cv2.cvtColor(
+            roi, cv2.COLOR_BGR2GRAY, dst=reuse(self._gray, roi.shape[:2])
+        )
+        return self._gray
+
+    def _associate(self, faces: list[FaceBox]) -> list[tuple[Track, int]]:
+        candidates: list[tuple[float, int, int]] = []
+        for t, track in enumerate(self.tracks):
+            for f, face in enumerate(faces):
+                box = (face.x, face.y, face.width, face.height)
+                overlap = iou(track.box, box)
+                if overlap >= self.iou_threshold:
+                    candidates.append((overlap, t, f))
+                else:
+                    distance = centroid_distance(track.box, box)
+                    if distance <= self.centroid_threshold:
+                        # Ниже любого совпадения по IoU: сначала пересекающиеся пары.
+                        candidates.append((-distance, t, f))
+
+        pairs = []
+        used_tracks: set[int] = set()
+        used_faces: set[int] = set()
+        for _, t, f in sorted(candidates, reverse=True):
+            if t in used_tracks or f in used_faces:
+                continue
+            used_tracks.add(t)
+            used_faces.add(f)
+            pairs.append((self.tracks[t], f))
+        return pairs
+
+    def _refresh(
+        self,
+        track: Track,
+        frame: cv2.typing.MatLike,
+        gray: np.ndarray,
+        offset: tuple[int, int],
+    ) -> None:
+        """
+        Обновить шаблон и, если снимок стал лучше, лучшую вырезку трека.
+
+        Вырезка — единственная копия снимка: её же получит DetectionSaver.
+        Пока рамка не меняет размер, копии пишутся в прежние массивы трека.
+        """
+        x, y, w, h = track.box
+        track.template = crop_box(gray, track.box, out=track.template)
+        track.template_shift = (max(0, -x), max(0, -y))
+        if not track.saved and track.quality > track.best_quality:
+            crop = crop_box(
+                frame, (x + offset[0], y + offset[1], w, h), out=track.best_crop
+            )
+            if crop is not None:
+                track.best_quality = track.quality
+                track.best_crop = crop
+
+    def _match_template(self, track: Track, gray: np.ndarray) -> None:
+        template = track.template
+        if template is None:
+            return
+        th, tw = template.shape[:2]
+        x, y, w, h = track.box
+        # Окно поиска — рамка, расширенная на половину своего размера.
+        x0, y0 = max(0, x - w // 2), max(0, y - h // 2)
+        x1 = min(gray.shape[1], x + w + w // 2)
+        y1 = min(gray.shape[0], y + h + h // 2)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return
+
+        scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if best >= self.match_threshold:
+            shift_x, shift_y = track.template_shift
+            track.box = (x0 + dx - shift_x, y0 + dy - shift_y, w, h)
+
+    def _collect(self, now: float) -> list[Track]:
+        ready = []
+        alive = []
+        for track in self.tracks:
+            if now - track.last_seen > self.ttl_s:
+                if self._worth_saving(track):
+                    ready.append(track)
+                continue
+            alive.append(track)
+            if (
+                self._worth_saving(track)
+                and now - track.first_seen >= self.save_after_s
+            ):
+                ready.append(track)
+        self.tracks = alive
+        for track in ready:
+            track.saved = True
+        return ready
+
+    def _worth_saving(self, track: Track) -> bool:
+        return (
+            not track.saved
+            and track.hits >= self.min_hits
+            and track.best_crop is not None
+        )
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.core.metrics import registry
+from app.repositories.sqlalchemy_repository import SQLAlchemyRepository
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Буфер отложенной записи в БД.
+
+    Строки копятся в памяти и сбрасываются одним многострочным INSERT через
+    ``bulk_add``, когда набралось ``batch_size`` строк или прошло
+    ``flush_interval_ms`` с момента первой строки в буфере. Неудачный пакет
+    остаётся в начале очереди до следующего сброса; после ``max_attempts``
+    неудач подряд его строки пишутся по одной, и строки, которые не удаётся
+    записать и так, отбрасываются с записью в лог, чтобы не задерживать
+    остальные. После записи вызывается ``on_written``, например чтобы обновить
+    кэш последних обнаружений. Все методы вызываются в потоке event loop.
+    """
+
+    def __init__(
+        self,
+        repository: type[SQLAlchemyRepository[Any]],
+        batch_size: int = 50,
+        flush_interval_ms: int = 500,
+        max_attempts: int = 3,
+    ) -> None:
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_attempts = max_attempts
+        # Неудачные попытки записать пакет в начале очереди подряд.
+        self._failures = 0
+        self._rows: list[dict[str, Any]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[int]] = set()
+        self._lock: asyncio.Lock | None = None
+        self.on_written: Callable[[], Awaitable[None]] | None = None
+
+        self.insert_seconds = registry.histogram(
+            "human_capture_db_insert_seconds",
+            "Время одного пакетного INSERT, секунды",
+        )
+        self.rows_written = registry.counter(
+            "human_capture_db_rows_total", "Строки, записанные в БД"
+        )
+        self.errors = registry.counter(
+            "human_capture_db_insert_errors_total", "Неудачные пакетные INSERT"
+        )
+        self.rows_dropped = registry.counter(
+            "human_capture_db_rows_dropped_total",
+            "Строки, отброшенные после исчерпания попыток записи",
+        )
+        registry.gauge(
+            "human_capture_db_write_queue",
+            "Строки в буфере отложенной записи в БД",
+            function=lambda: len(self._rows),
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, **values: Any) -> None:
+        self._rows.append(values)
+        if len(self._rows) >= self.batch_size:
+            self._flush_soon()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._flush_soon)
+
+    async def flush(self) -> int:
+        """Записать всё накопленное, вернуть число записанных строк."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        written = 0
+        async with self._lock:
+            self._cancel_timer()
+            while self._rows:
+                rows = self._rows[: self.batch_size]
+                del self._rows[: self.batch_size]
+                if self._failures >= self.max_attempts:
+                    self._failures = 0
+                    written += await self._write_each(rows)
+                    continue
+                started = time.perf_counter()
+                try:
+                    count = await self.repository.bulk_add(rows)
+                except Exception as e:
+                    self.errors.inc()
+                    self._failures += 1
+                    logger.error(
+                        "Ошибка записи %s строк в БД (попытка %s из %s): %s",
+                        len(rows),
+                        self._failures,
+                        self.max_attempts,
+                        repr(e),
+                    )
+                    self._rows[:0] = rows
+                    break
+                self._failures = 0
+                self.insert_seconds.observe(time.perf_counter() - started)
+                self.rows_written.inc(count)
+                written += count
+
+        if written and self.on_written is not None:
+            await self.on_written()
+        if self._rows and self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._flush_soon)
+        return written
+
+    async def _write_each(self, rows: list[dict[str, Any]]) -> int:
+        """Записать строки пакета по одной, отбросив те, что не записываются."""
+        written = 0
+        for row in rows:
+            try:
+                written += await self.repository.bulk_add([row])
+            except Exception as e:  # noqa: PERF203
+                self.rows_dropped.inc()
+                logger.error("Строка не записана в БД и отброшена: %s, %s", row, repr(e))
+        self.rows_written.inc(written)
+        return written
+
+    def _flush_soon(self) -> None:
+        self._cancel_timer()
+        task = asyncio.ensure_future(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,515 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+import cv2
+import numpy as np
+import pytz
+
+from app.core.config import Settings, get_settings
+from app.repositories.detector import DetectionDAO
+from app.services.detectors.face_detector import FaceDetector
+from app.services.detectors.image_writer import encode_params
+from app.services.detectors.phash import dhash
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+TIMEZONE = pytz.timezone("Europe/Samara")
+
+
+class Frame(NamedTuple):
+    index: int
+    timestamp: datetime
+    image: np.ndarray
+
+
+class VideoSource:
+    """
+    Кадры видеофайла, начиная с кадра ``offset``.
+
+    Время кадра отсчитывается от начала записи: времени изменения файла за
+    вычетом длительности ролика.
+    """
+
+    continuous = True
+
+    def __init__(self, path: str, offset: int = 0) -> None:
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Не удалось открыть видеофайл {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.total = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.started_at = datetime.fromtimestamp(
+            os.path.getmtime(path), TIMEZONE
+        ) - timedelta(seconds=self.total / self.fps)
+        self.index = offset
+        if offset:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, offset)
+
+    def read_chunk(self, size: int) -> list[Frame]:
+        chunk = []
+        while len(chunk) < size:
+            ret, image = self.cap.read()
+            if not ret:
+                break
+            timestamp = self.started_at + timedelta(seconds=self.index / self.fps)
+            chunk.append(Frame(self.index, timestamp, image))
+            self.index += 1
+        return chunk
+
+    def close(self) -> None:
+        self.cap.release()
+
+
+class ImageDirSource:
+    """Изображения папки по алфавиту, начиная с файла номер ``offset``."""
+
+    continuous = False
+
+    def __init__(self, path: str, offset: int = 0) -> None:
+        if os.path.isdir(path):
+            self.files = sorted(
+                os.path.join(path, name)
+                for name in os.listdir(path)
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+            )
+        else:
+            self.files = [path]
+        self.total = len(self.files)
+        self.index = offset
+
+    def read_chunk(self, size: int) -> list[Frame]:
+        chunk = []
+        while len(chunk) < size and self.index < len(self.files):
+            path = self.files[self.index]
+            image = cv2.imread(path)
+            if image is None:
+                logger.warning("Не удалось прочитать изображение %s", path)
+            else:
+                timestamp = datetime.fromtimestamp(os.path.getmtime(path), TIMEZONE)
+                chunk.append(Frame(self.index, timestamp, image))
+            self.index += 1
+        return chunk
+
+    def close(self) -> None:
+        pass
+
+
+def open_source(path: str, offset: int = 0) -> VideoSource | ImageDirSource:
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if os.path.isdir(path) or os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+        return ImageDirSource(path, offset)
+    return VideoSource(path, offset)
+
+
+class IngestState:
+    """
+    Смещения обработанных файлов для продолжения прерванной обработки.
+
+    Смещение — номер следующего кадра видео или следующего файла папки.
+    Состояние сохраняется после записи каждой порции в БД и сбрасывается,
+    если файл изменился.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries: dict[str, dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def offset(self, source: str) -> int:
+        entry = self.entries.get(os.path.abspath(source))
+        if entry is None or entry["mtime"] != os.path.getmtime(source):
+            return 0
+        return entry["offset"]
+
+    def update(self, source: str, offset: int) -> None:
+        self.entries[os.path.abspath(source)] = {
+            "offset": offset,
+            "mtime": os.path.getmtime(source),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, source: str) -> None:
+        self.entries.pop(os.path.abspath(source), None)
+
+
+@dataclass
+class IngestOptions:
+    camera_id: int = 0
+    chunk_size: int = 64
+    workers: int = 0
+    full_frame: bool = False
+    save: bool = True
+    min_interval_s: float = 5.0
+    state_path: str = "ingest_state.json"
+    restart: bool = False
+
+
+@dataclass
+class SourceReport:
+    path: str
+    offset: int = 0
+    total: int = 0
+    frames: int = 0
+    detections: int = 0
+    saved: int = 0
+    seconds: float = 0.0
+    detected_frames: list[int] = field(default_factory=list)
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    def as_dict(self, with_frames: bool = False) -> dict[str, Any]:
+        data = asdict(self)
+        if not with_frames:
+            data.pop("detected_frames")
+        return {**data, "seconds": round(self.seconds, 3), "fps": round(self.fps, 2)}
+
+
+@dataclass
+class IngestReport:
+    sources: list[SourceReport] = field(default_factory=list)
+
+    def as_dict(self, with_frames: bool = False) -> dict[str, Any]:
+        frames = sum(source.frames for source in self.sources)
+        seconds = sum(source.seconds for source in self.sources)
+        return {
+            "frames": frames,
+            "detections": sum(source.detections for source in self.sources),
+            "saved": sum(source.saved for source in self.sources),
+            "seconds": round(seconds, 3),
+            "fps": round(frames / seconds, 2) if seconds else 0.0,
+            "sources": [source.as_dict(with_frames) for source in self.sources],
+        }
+
+
+_detector: FaceDetector | None = None
+
+
+def _init_worker(model_selection: int, confidence: float) -> None:
+    global _detector  # noqa: PLW0603
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cv2.setNumThreads(1)
+    _detector = FaceDetector(
+        Settings(
+            face_model_selection=model_selection,
+            face_min_detection_confidence=confidence,
+        )  # type: ignore
+    )
+
+
+def _detect_batch(images: list[np.ndarray]) -> list[list[tuple]]:
+    return [[tuple(face) for face in _detector.detect(image)] for image in images]  # type: ignore
+
+
+class BatchIngestor:
+    """
+    Пакетная обработка записанных видео и папок с изображениями.
+
+    Файл читается порциями по ``chunk_size`` кадров в отдельном потоке, пока
+    пул процессов ищет лица в предыдущей порции. Порция делится между
+    процессами, у каждого своя модель MediaPipe. Найденные вырезки пишутся на
+    диск, строки — в БД одним INSERT на порцию, после чего сохраняется
+    смещение файла, так что прерванную обработку можно продолжить. Для видео,
+    как и в живом конвейере, сохраняется не больше одной вырезки за
+    ``min_interval_s`` секунд записи. С ``save=False`` ничего не пишется —
+    так удобно сравнивать результаты детекции на одних и тех же записях.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        options: IngestOptions,
+        on_written: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self.settings = settings
+        self.options = options
+        self.on_written = on_written
+        # Каждый процесс загружает свою модель: больше, чем ядер, не имеет смысла.
+        cpu_count = os.cpu_count() or 2
+        self.workers = min(options.workers, cpu_count) or max(1, cpu_count - 1)
+        self.state = IngestState(options.state_path)
+        self.extension, self.params = encode_params(
+            settings.image_format, settings.image_quality
+        )
+
+    async def run(
+        self, paths: list[str], report: IngestReport | None = None
+    ) -> IngestReport:
+        report = report if report is not None else IngestReport()
+        for path in paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+        os.makedirs(self.settings.save_path, exist_ok=True)
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self.settings.face_model_selection,
+                self.settings.face_min_detection_confidence,
+            ),
+        )
+        try:
+            for path in paths:
+                source_report = SourceReport(path)
+                report.sources.append(source_report)
+                await self._ingest_source(pool, path, source_report)
+        finally:
+            await asyncio.to_thread(pool.shutdown, cancel_futures=True)
+        return report
+
+    async def _ingest_source(
+        self, pool: ProcessPoolExecutor, path: str, report: SourceReport
+    ) -> None:
+        if self.options.restart:
+            self.state.reset(path)
+        report.offset = self.state.offset(path)
+        source = open_source(path, report.offset)
+        report.total = source.total
+        source_name = re.sub(r"[^\w-]", "_", os.path.basename(os.path.normpath(path)))
+
+        loop = asyncio.get_running_loop()
+        chunk_size = self.options.chunk_size
+        last_saved: datetime | None = None
+        next_chunk = loop.run_in_executor(None, source.read_chunk, chunk_size)
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk = await next_chunk
+                if not chunk:
+                    break
+                next_chunk = loop.run_in_executor(None, source.read_chunk, chunk_size)
+
+                regions = [self._region(frame.image) for frame in chunk]
+                faces = await self._detect(
+                    pool,
+                    [
+                        frame.image[y : y + h, x : x + w]
+                        for frame, (x, y, w, h) in zip(chunk, regions, strict=True)
+                    ],
+                )
+
+                crops = []
+                for frame, region, frame_faces in zip(chunk, regions, faces, strict=True):
+                    if not frame_faces:
+                        continue
+                    report.detections += 1
+                    report.detected_frames.append(frame.index)
+                    if not self.options.save or (
+                        source.continuous
+                        and last_saved is not None
+                        and (frame.timestamp - last_saved).total_seconds()
+                        < self.options.min_interval_s
+                    ):
+                        continue
+                    crop = self._crop(frame, region, frame_faces[0], source_name)
+                    if crop is not None:
+                        crops.append(crop)
+                        last_saved = frame.timestamp
+
+                if crops:
+                    await asyncio.to_thread(self._write_crops, crops)
+                    await DetectionDAO.bulk_add([row for row, _ in crops])
+                    report.saved += len(crops)
+                    if self.on_written is not None:
+                        await self.on_written()
+                if self.options.save:
+                    self.state.update(path, chunk[-1].index + 1)
+
+                report.frames += len(chunk)
+                report.seconds += time.perf_counter() - started
+        finally:
+            if not next_chunk.done():
+                await asyncio.wait([next_chunk])
+            source.close()
+
+        logger.info(
+            "Файл %s: %s кадров за %.1f с (%.1f кадров/с), лица на %s кадрах, сохранено %s",
+            path,
+            report.frames,
+            report.seconds,
+            report.fps,
+            report.detections,
+            report.saved,
+        )
+
+    def _region(self, image: np.ndarray) -> tuple[int, int, int, int]:
+        h_img, w_img = image.shape[:2]
+        if self.options.full_frame:
+            return 0, 0, w_img, h_img
+
+        s = self.settings
+        if s.x + s.width > w_img or s.y + s.height > h_img:
+            raise ValueError(
+                f"Область {s.x},{s.y} {s.width}x{s.height} выходит за границы "
+                f"кадра {w_img}x{h_img}, используйте full_frame"
+            )
+        return s.x, s.y, s.width, s.height
+
+    async def _detect(
+        self, pool: ProcessPoolExecutor, images: list[np.ndarray]
+    ) -> list[list[tuple]]:
+        """Разделить порцию между процессами и собрать рамки в исходном порядке."""
+        loop = asyncio.get_running_loop()
+        step = -(-len(images) // self.workers)
+        batches = await asyncio.gather(
+            *(
+                loop.run_in_executor(pool, _detect_batch, images[i : i + step])
+                for i in range(0, len(images), step)
+            )
+        )
+        return [faces for batch in batches for faces in batch]
+
+    def _crop(
+        self,
+        frame: Frame,
+        region: tuple[int, int, int, int],
+        face: tuple,
+        source_name: str,
+    ) -> tuple[dict[str, Any], tuple[str, np.ndarray]] | None:
+        """
+        Строка для БД и вырезка первого лица, как в DetectionSaver.
+
+        В имени файла кроме времени кадра есть имя источника и номер кадра:
+        у изображений папки, скопированной целиком, время изменения совпадает.
+        """
+        region_x, region_y, region_w, region_h = region
+        face_x, face_y, face_w, face_h, _ = face
+        h_img, w_img = frame.image.shape[:2]
+        x = max(0, region_x + face_x)
+        y = max(0, region_y + face_y)
+        w = min(face_w, w_img - x)
+        h = min(face_h, h_img - y)
+        crop = frame.image[y : y + h, x : x + w]
+        if crop.size == 0:
+            return None
+
+        path = (
+            f"{self.settings.save_path}/"
+            f"human_{self.options.camera_id}_{int(frame.timestamp.timestamp() * 1000)}"
+            f"_{source_name}_{frame.index}{self.extension}"
+        )
+        row = {
+            "timestamp": frame.timestamp,
+            "image_path": path,
+            "camera_id": self.options.camera_id,
+            "x": region_x,
+            "y": region_y,
+            "width": region_w,
+            "height": region_h,
+            "phash": dhash(crop),
+        }
+        return row, (path, crop)
+
+    def _write_crops(
+        self, crops: list[tuple[dict[str, Any], tuple[str, np.ndarray]]]
+    ) -> None:
+        for _, (path, image) in crops:
+            if not cv2.imwrite(path, image, self.params):
+                logger.error("Ошибка при сохранении изображения в %s", path)
+
+
+@dataclass
+class IngestJob:
+    id: str
+    paths: list[str]
+    options: IngestOptions
+    status: str = "queued"
+    error: str | None = None
+    report: IngestReport = field(default_factory=IngestReport)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "paths": self.paths,
+            "status": self.status,
+            "error": self.error,
+            "report": self.report.as_dict(),
+        }
+
+
+class IngestJobs:
+    """
+    Задания пакетной обработки, запущенные через API.
+
+    Задания выполняются по одному, чтобы пулы процессов разных заданий не
+    делили между собой ядра; остальные ждут в статусе ``queued``. Настройки
+    берутся действующие на момент запуска задания. Хранятся последние
+    ``max_finished`` завершённых заданий, более старые забываются.
+    """
+
+    def __init__(self, max_finished: int = 100) -> None:
+        self.max_finished = max_finished
+        self.jobs: dict[str, IngestJob] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._lock: asyncio.Lock | None = None
+        self.on_written: Callable[[], Awaitable[None]] | None = None
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self.jobs.get(job_id)
+
+    def submit(self, paths: list[str], options: IngestOptions) -> IngestJob:
+        job = IngestJob(id=uuid.uuid4().hex, paths=paths, options=options)
+        self.jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def cancel_all(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, job: IngestJob) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            job.status = "running"
+            try:
+                await BatchIngestor(get_settings(), job.options, self.on_written).run(
+                    job.paths, job.report
+                )
+                job.status = "done"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                raise
+            except Exception as e:
+                logger.error("Ошибка пакетной обработки %s: %s", job.id, repr(e))
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Забыть самые старые завершённые задания сверх ``max_finished``."""
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.status not in {"queued", "running"}
+        ]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
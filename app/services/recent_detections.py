@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from app.core.metrics import registry
+from app.models.detector import Detection
+from app.repositories.detector import DetectionDAO
+from app.repositories.stats import TIMEZONE, to_local
+from app.schemas.detector import DetectionOut
+
+logger = logging.getLogger(__name__)
+
+# Точность времени в SQLite: граница кэша сдвигается за вытесненную запись на неё.
+RESOLUTION = timedelta(microseconds=1)
+
+
+class DetectionRow(NamedTuple):
+    """Обнаружение с готовым JSON, упорядоченное по ключу (timestamp, id)."""
+
+    timestamp: datetime
+    id: int
+    camera_id: int
+    json: bytes
+
+    @classmethod
+    def from_detection(cls, detection: Detection) -> "DetectionRow":
+        return cls(
+            timestamp=to_local(detection.timestamp),
+            id=detection.id,
+            camera_id=detection.camera_id,
+            json=DetectionOut.from_detection(detection).model_dump_json().encode(),
+        )
+
+
+class RecentDetections:
+    """
+    Последние обнаружения в памяти для частых запросов /humans.
+
+    Хранятся обнаружения за ``window_s`` секунд, но не больше ``max_rows``, —
+    каждое уже сериализовано в JSON, так что ответ собирается склейкой байт
+    без обращения к SQLite и без создания DetectionOut. Запрос, начало
+    которого раньше покрытого кэшем времени, возвращает None и выполняется
+    в БД.
+
+    Кэш загружается при первом запросе. Новые записи добавляются после
+    каждого сброса буфера записи и пакета пакетной обработки: они выбираются
+    из БД по диапазону id, поэтому кэш не зависит от того, кто их вставил.
+    Очистка старых обнаружений сбрасывает кэш целиком. Записи, добавленные
+    или удалённые другими процессами, появятся только после перезагрузки.
+    Все методы вызываются в потоке event loop.
+    """
+
+    def __init__(self, window_s: float, max_rows: int) -> None:
+        self.window = timedelta(seconds=window_s)
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+
+        self._rows: list[DetectionRow] = []
+        self._ids: set[int] = set()
+        self._bytes = 0
+        self._max_id = 0
+        # Время, начиная с которого в кэше есть все записи; None — не загружен.
+        self._covered_from: datetime | None = None
+        self._generation = 0
+        self._lock: asyncio.Lock | None = None
+
+        for result in ("hit", "miss"):
+            registry.counter(
+                "human_capture_recent_cache_requests_total",
+                "Запросы /humans: hit — ответ из памяти, miss — из БД",
+                {"result": result},
+                lambda result=result: self.hits if result == "hit" else self.misses,
+            )
+        registry.gauge(
+            "human_capture_recent_cache_rows",
+            "Обнаружения в памяти для /humans",
+            function=lambda: len(self._rows),
+        )
+        registry.gauge(
+            "human_capture_recent_cache_bytes",
+            "Объём готового JSON обнаружений в памяти",
+            function=lambda: self._bytes,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > timedelta(0)
+
+    def invalidate(self) -> None:
+        """Сбросить кэш, он загрузится заново при следующем запросе."""
+        self._generation += 1
+        self._covered_from = None
+        self._rows = []
+        self._ids = set()
+        self._bytes = 0
+
+    async def refresh(self) -> None:
+        """Добавить обнаружения, записанные в БД после последнего обновления."""
+        if self._covered_from is None:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            generation = self._generation
+            try:
+                detections = await DetectionDAO.get_newer(self._max_id)
+            except Exception as e:
+                logger.error("Не удалось обновить кэш обнаружений: %s", repr(e))
+                self.invalidate()
+                return
+            if generation == self._generation:
+                self._add(detections)
+
+    async def select(
+        self,
+        start: datetime,
+        end: datetime,
+        camera_id: int | None = None,
+        limit: int | None = None,
+        after: tuple[datetime, int] | None = None,
+    ) -> list[DetectionRow] | None:
+        """
+        Обнаружения от новых к старым, как DetectionDAO.get_detections_by_date.
+
+        :return: Список обнаружений или None, если диапазон начинается раньше
+            покрытого кэшем времени и запрос нужно выполнить в БД.
+        """
+        if not self.enabled:
+            return None
+        if self._covered_from is None:
+            await self._load()
+        self._trim()
+        start, end = to_local(start), to_local(end)
+        if self._covered_from is None or start < self._covered_from:
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        low = bisect_left(self._rows, (start,))
+        high = bisect_right(self._rows, (end, math.inf))
+        if after is not None:
+            high = min(high, bisect_left(self._rows, (to_local(after[0]), after[1])))
+
+        rows = []
+        for index in range(high - 1, low - 1, -1):
+            row = self._rows[index]
+            if camera_id is not None and row.camera_id != camera_id:
+                continue
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+    async def _load(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._covered_from is not None:
+                return
+            generation = self._generation
+            covered_from = to_local(datetime.now(TIMEZONE)) - self.window
+            # Наибольший id запоминается до выборки: запись, вставленная между
+            # запросами, найдётся ещё раз при обновлении и будет пропущена.
+            max_id = await DetectionDAO.get_max_id()
+            detections = await DetectionDAO.get_detections_by_date(
+                covered_from, limit=self.max_rows
+            )
+            if generation != self._generation:
+                return
+
+            self._max_id = max_id
+            self._covered_from = covered_from
+            if len(detections) == self.max_rows:
+                self._covered_from = to_local(detections[-1].timestamp) + RESOLUTION
+            self._add(detections)
+            logger.info(
+                "Кэш обнаружений загружен: %s записей, %.1f МБ",
+                len(self._rows),
+                self._bytes / 1024 / 1024,
+            )
+
+    def _add(self, detections: Iterable[Detection]) -> None:
+        for detection in detections:
+            self._max_id = max(self._max_id, detection.id)
+            if (
+                detection.id in self._ids
+                or to_local(detection.timestamp) < self._covered_from  # type: ignore
+            ):
+                continue
+            row = DetectionRow.from_detection(detection)
+            insort(self._rows, row)
+            self._ids.add(row.id)
+            self._bytes += len(row.json)
+        self._trim()
+
+    def _trim(self) -> None:
+        """Вытеснить записи старше окна и сверх ``max_rows``, сдвинув границу кэша."""
+        if self._covered_from is None:
+            return
+        cutoff = to_local(datetime.now(TIMEZONE)) - self.window
+        drop = max(bisect_left(self._rows, (cutoff,)), len(self._rows) - self.max_rows)
+        self._covered_from = max(self._covered_from, cutoff)
+        if drop <= 0:
+            return
+
+        for row in self._rows[:drop]:
+            self._ids.discard(row.id)
+            self._bytes -= len(row.json)
+        self._covered_from = max(
+            self._covered_from, self._rows[drop - 1].timestamp + RESOLUTION
+        )
+        del self._rows[:drop]
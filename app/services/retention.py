@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import os
+import tarfile
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytz
+
+from app.core.config import Settings, hot_reload
+from app.database.maintenance import enable_incremental_vacuum, incremental_vacuum
+from app.repositories.detector import DetectionDAO
+from app.services.detectors.thumbnails import DerivativeCache
+from app.services.recent_detections import RecentDetections
+
+logger = logging.getLogger(__name__)
+
+TIMEZONE = pytz.timezone("Europe/Samara")
+
+
+@dataclass
+class RetentionReport:
+    started_at: str = ""
+    seconds: float = 0.0
+    rows_deleted: int = 0
+    files_deleted: int = 0
+    files_archived: int = 0
+    bytes_freed: int = 0
+    db_bytes_reclaimed: int = 0
+    archives: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class _Archive:
+    """Один архив на запуск очистки, файлы дописываются в него пакетами."""
+
+    def __init__(self, directory: str, kind: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(TIMEZONE).strftime("%Y%m%d_%H%M%S")
+        if kind == "zip":
+            self.path = os.path.join(directory, f"detections_{stamp}.zip")
+            self._zip: zipfile.ZipFile | None = zipfile.ZipFile(
+                self.path, "w", zipfile.ZIP_DEFLATED
+            )
+            self._tar: tarfile.TarFile | None = None
+        else:
+            self.path = os.path.join(directory, f"detections_{stamp}.tar.gz")
+            self._tar = tarfile.open(self.path, "w:gz")
+            self._zip = None
+
+    def add(self, path: str) -> None:
+        name = os.path.basename(path)
+        if self._zip is not None:
+            self._zip.write(path, arcname=name)
+        else:
+            self._tar.add(path, arcname=name)  # type: ignore
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()  # type: ignore
+
+
+class RetentionWorker:
+    """
+    Фоновая очистка старых обнаружений и снимков.
+
+    По возрасту удаляются записи старше ``retention_days``: они выбираются
+    от старых к новым по индексу времени пакетами по ``retention_batch_size``
+    и удаляются одним DELETE ... IN на пакет. По объёму удаляются самые
+    старые файлы папки снимков, пока она больше ``retention_max_mb``, вместе
+    с записями, которые на них ссылаются. Перед удалением снимки можно
+    сложить в архив, после очистки свободные страницы SQLite возвращаются
+    файловой системе через incremental VACUUM.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        thumbnails: DerivativeCache | None = None,
+        recent: RecentDetections | None = None,
+    ) -> None:
+        self.settings = settings
+        self.thumbnails = thumbnails
+        self.recent = recent
+        self.last_report: RetentionReport | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._lock: asyncio.Lock | None = None
+        self._vacuum_ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings.retention_days or self.settings.retention_max_mb)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Взять новые правила хранения; следующий запуск пройдёт уже по ним."""
+        self.settings = hot_reload(self.settings, settings)
+        self.start()
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> RetentionReport:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            report = RetentionReport(
+                started_at=datetime.now(TIMEZONE).isoformat(timespec="seconds")
+            )
+            started = time.perf_counter()
+            archive = None
+            if self.settings.retention_archive != "none":
+                archive = await asyncio.to_thread(
+                    _Archive,
+                    self.settings.retention_archive_path,
+                    self.settings.retention_archive,
+                )
+            try:
+                if self.settings.retention_days:
+                    await self._purge_by_age(report, archive)
+                if self.settings.retention_max_mb:
+                    await self._purge_by_size(report, archive)
+            finally:
+                if archive is not None:
+                    await asyncio.to_thread(archive.close)
+                    if report.files_archived:
+                        report.archives.append(archive.path)
+                    else:
+                        os.remove(archive.path)
+
+            if report.rows_deleted or report.files_deleted:
+                if not self._vacuum_ready:
+                    await enable_incremental_vacuum()
+                    self._vacuum_ready = True
+                report.db_bytes_reclaimed = await incremental_vacuum(
+                    self.settings.retention_vacuum_pages
+                )
+
+            report.seconds = round(time.perf_counter() - started, 3)
+            self.last_report = report
+            logger.info(
+                "Очистка: удалено записей %s, файлов %s (%.1f МБ), в архиве %s, "
+                "освобождено в БД %.1f МБ за %.1f с",
+                report.rows_deleted,
+                report.files_deleted,
+                report.bytes_freed / 1024 / 1024,
+                report.files_archived,
+                report.db_bytes_reclaimed / 1024 / 1024,
+                report.seconds,
+            )
+            return report
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Ошибка очистки старых обнаружений: %s", repr(e))
+            await asyncio.sleep(self.settings.retention_interval_s)
+
+    async def _purge_by_age(
+        self, report: RetentionReport, archive: _Archive | None
+    ) -> None:
+        cutoff = datetime.now(TIMEZONE) - timedelta(days=self.settings.retention_days)
+        while True:
+            rows = await DetectionDAO.get_oldest(
+                cutoff, self.settings.retention_batch_size
+            )
+            if not rows:
+                return
+            await self._purge(
+                [row.image_path for row in rows],
+                report,
+                archive,
+                id=[row.id for row in rows],
+            )
+
+    async def _purge_by_size(
+        self, report: RetentionReport, archive: _Archive | None
+    ) -> None:
+        quota = self.settings.retention_max_mb * 1024 * 1024
+        files = await asyncio.to_thread(self._photo_files)
+        total = sum(size for _, _, size in files)
+        batch_size = self.settings.retention_batch_size
+
+        index = 0
+        while total > quota and index < len(files):
+            batch = []
+            while total > quota and index < len(files) and len(batch) < batch_size:
+                _, path, size = files[index]
+                batch.append(path)
+                total -= size
+                index += 1
+            await self._purge(batch, report, archive, image_path=batch)
+
+    def _photo_files(self) -> list[tuple[float, str, int]]:
+        """Файлы папки снимков от старых к новым: (mtime, image_path, размер)."""
+        save_path = self.settings.save_path
+        if not os.path.isdir(save_path):
+            return []
+        with os.scandir(save_path) as entries:
+            files = [
+                (stat.st_mtime, f"{save_path}/{entry.name}", stat.st_size)
+                for entry in entries
+                if entry.is_file()
+                and not entry.name.endswith(".tmp")
+                and (stat := entry.stat())
+            ]
+        return sorted(files)
+
+    async def _purge(
+        self,
+        paths: list[str],
+        report: RetentionReport,
+        archive: _Archive | None,
+        **filter_by: Any,
+    ) -> None:
+        """
+        Архивировать снимки, удалить записи и только потом файлы: при сбое
+        между шагами остаются лишние файлы, которые найдёт очистка по объёму,
+        а не записи со ссылками на удалённые снимки.
+
+        Видеофрагмент удаляется вместе с последним обнаружением, которое на
+        него ссылается.
+        """
+        clips = await DetectionDAO.get_clip_paths(**filter_by)
+        if archive is not None:
+            report.files_archived += await asyncio.to_thread(
+                self._archive_files, archive, paths
+            )
+        deleted = await DetectionDAO.delete(**filter_by)
+        report.rows_deleted += deleted
+        if deleted and self.recent is not None:
+            self.recent.invalidate()
+        if clips:
+            clips -= await DetectionDAO.get_clip_paths(clip_path=list(clips))
+            if archive is not None:
+                report.files_archived += await asyncio.to_thread(
+                    self._archive_files, archive, list(clips)
+                )
+            paths = paths + sorted(clips)
+        await asyncio.to_thread(self._unlink_files, paths, report)
+
+    def _archive_files(self, archive: _Archive, paths: list[str]) -> int:
+        archived = 0
+        for path in paths:
+            if os.path.isfile(path):
+                archive.add(path)
+                archived += 1
+        return archived
+
+    def _unlink_files(self, paths: list[str], report: RetentionReport) -> None:
+        for path in paths:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            report.files_deleted += 1
+            report.bytes_freed += size
+            if self.thumbnails is not None:
+                self.thumbnails.discard(os.path.basename(path))
@@ -0,0 +1,159 @@
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+
+from pydantic import ValidationError
+
+from app.core.config import get_settings, read_config, set_settings
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+EVENT_HEADER = struct.Struct("iIII")
+# Редактор может записать файл несколькими операциями подряд.
+DEBOUNCE_S = 0.1
+
+
+class _Inotify:
+    """Ожидание изменения файла через inotify, без сторонних пакетов."""
+
+    def __init__(self, path: str) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        # Следим за папкой: settings.json заменяют целиком через rename.
+        directory = os.path.dirname(os.path.abspath(path))
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, directory.encode(), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch")
+        self.name = os.path.basename(path).encode()
+        # Запись в pipe будит select при остановке.
+        self._wake_r, self._wake_w = os.pipe()
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self.fd, self._wake_r], [], [], timeout)
+        if self.fd not in ready:
+            return False
+        changed = self._drain()
+        while select.select([self.fd], [], [], DEBOUNCE_S)[0]:
+            changed |= self._drain()
+        return changed
+
+    def _drain(self) -> bool:
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return False
+        changed = False
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            changed |= name == self.name
+        return changed
+
+    def wake(self) -> None:
+        os.write(self._wake_w, b"\0")
+
+    def close(self) -> None:
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class SettingsWatcher:
+    """
+    Перечитывание settings.json при его изменении.
+
+    На Linux изменения приходят через inotify, иначе файл проверяется по
+    времени изменения и размеру раз в ``settings_poll_interval_s`` секунд.
+    Новые настройки проверяются моделью Settings; файл с ошибкой
+    пропускается, и работа продолжается с прежними настройками.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._task: asyncio.Task[None] | None = None
+        self._stop = threading.Event()
+        self._inotify: _Inotify | None = None
+        self._stamp = self._file_stamp()
+
+    def start(self) -> None:
+        if self._task is not None or not get_settings().settings_watch:
+            return
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(self.path)
+            except OSError as e:
+                logger.warning(
+                    "inotify недоступен, settings.json проверяется по таймеру: %s", e
+                )
+        self._stop.clear()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        if self._inotify is not None:
+            self._inotify.wake()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def reload(self) -> bool:
+        """
+        Перечитать файл и применить настройки, если они изменились.
+
+        :return: True, если настройки применены.
+        """
+        try:
+            new = read_config(self.path)
+        except (OSError, json.JSONDecodeError, ValidationError) as e:
+            logger.error("settings.json не применён: %s", e)
+            return False
+        if new == get_settings():
+            return False
+        set_settings(new)
+        logger.info("Настройки из %s применены", self.path)
+        return True
+
+    async def _loop(self) -> None:
+        while not self._stop.is_set():
+            if await asyncio.to_thread(self._wait_for_change):
+                # Применение может ждать прогрева камер, поэтому не в event loop.
+                await asyncio.to_thread(self.reload)
+
+    def _wait_for_change(self) -> bool:
+        interval = get_settings().settings_poll_interval_s
+        if self._inotify is not None:
+            return self._inotify.wait(interval)
+        if self._stop.wait(interval):
+            return False
+        stamp = self._file_stamp()
+        changed, self._stamp = stamp != self._stamp, stamp
+        return changed
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
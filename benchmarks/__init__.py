@@ -0,0 +1,6 @@
+"""
+Бенчмарки конвейера детекции.
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare before.json after.json
+"""
@@ -0,0 +1,315 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from benchmarks.database import run_concurrency, run_database
+from benchmarks.memory import run_memory
+from benchmarks.pipeline import run_pipeline
+from benchmarks.scaling import run_scaling
+from benchmarks.startup import run_startup
+
+
+def in_subprocess(function: Callable[..., Any], *args: Any) -> Any:
+    """Выполнить сценарий в новом процессе, чтобы пиковый RSS был только его."""
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return executor.submit(function, *args).result()
+
+
+def environment() -> dict[str, Any]:
+    import cv2
+    import mediapipe
+
+    try:
+        commit = subprocess.run(  # noqa: S603
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "mediapipe": mediapipe.__version__,
+    }
+
+
+def parse_roi(value: str) -> tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def run_scaling_scenarios(args: argparse.Namespace) -> list[dict[str, Any]]:
+    results = []
+    for model in args.models:
+        scenario = {
+            "source": args.source,
+            "frames": args.frames,
+            "model": model,
+            "widths": args.scaling_widths,
+        }
+        results.extend(in_subprocess(run_scaling, scenario))
+    for result in results:
+        print(
+            f"model={result['model']} inference_width={result['inference_width']}: "
+            f"{result['mean_ms']} мс на кадр, ускорение x{result['speedup']}, "
+            f"recall {result['recall']}, precision {result['precision']}, "
+            f"IoU {result['mean_iou']}"
+        )
+    return results
+
+
+def run(args: argparse.Namespace) -> None:
+    results: dict[str, Any] = {"environment": environment(), "pipeline": []}
+    for model in args.models:
+        for roi in args.roi:
+            scenario = {
+                "source": args.source,
+                "frames": args.frames,
+                "roi": roi,
+                "model": model,
+                "motion_gating": args.motion_gating,
+            }
+            result = in_subprocess(run_pipeline, scenario)
+            results["pipeline"].append(result)
+            if "skipped" in result:
+                print(f"model={model} roi={roi[0]}x{roi[1]}: пропущено, {result['skipped']}")
+                continue
+            print(
+                f"model={model} roi={roi[0]}x{roi[1]}: {result['fps']} кадров/с, "
+                f"inference p95 {result['stages']['inference']['p95_ms']} мс, "
+                f"peak RSS {result['peak_rss_mb']} МБ"
+            )
+            if args.memory:
+                memory = in_subprocess(run_memory, scenario)
+                results.setdefault("memory", []).append(memory)
+                if "skipped" in memory:
+                    print(f"    память: пропущено, {memory['skipped']}")
+                    continue
+                print(
+                    f"    память за кадр: {memory['transient_kb_mean']} КБ в среднем, "
+                    f"p95 {memory['transient_kb_p95']} КБ, рост {memory['growth_kb']} КБ, "
+                    f"сборок мусора {memory['gc_collections']}"
+                )
+
+    if args.scaling:
+        results["scaling"] = run_scaling_scenarios(args)
+
+    if args.startup:
+        results["startup"] = [
+            in_subprocess(run_startup, args.source, warm) for warm in (False, True)
+        ]
+        for result in results["startup"]:
+            print(
+                f"Запуск {result['mode']}: импорт {result['import_s']} с, "
+                f"прогрев {result['warmup_s']} с, первый кадр через "
+                f"{result['first_frame_s']} с после start(), всего {result['total_s']} с"
+            )
+
+    if args.db_rows:
+        results["database"] = in_subprocess(run_database, args.db_rows, args.db_batches)
+        for result in results["database"]:
+            print(f"DB batch={result['batch_size']}: {result['rows_per_s']} строк/с")
+
+    if args.db_concurrency:
+        results["database_concurrency"] = [
+            in_subprocess(
+                run_concurrency, mode, args.db_rows, args.db_readers, args.db_concurrency
+            )
+            for mode in ("baseline", "tuned")
+        ]
+        for result in results["database_concurrency"]:
+            print(
+                f"DB {result['mode']}: чтение {result['reads_per_s']} запросов/с, "
+                f"p95 {result['read_p95_ms']} мс, запись {result['writes_rows_per_s']} строк/с"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"Результаты записаны в {args.output}")
+
+
+def scenario_key(result: dict[str, Any]) -> tuple:
+    return result["model"], tuple(result["roi"])
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "—"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare_scaling(before: list[dict[str, Any]], after: list[dict[str, Any]]) -> None:
+    previous = {(r["model"], r["inference_width"]): r for r in before}
+    for result in after:
+        old = previous.get((result["model"], result["inference_width"]))
+        if old:
+            print(
+                f"model={result['model']} inference_width={result['inference_width']}: "
+                f"{old['mean_ms']} → {result['mean_ms']} мс "
+                f"({change(old['mean_ms'], result['mean_ms'])}), "
+                f"recall {old['recall']} → {result['recall']}"
+            )
+
+
+def compare(args: argparse.Namespace) -> None:
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    previous = {scenario_key(r): r for r in before["pipeline"] if "skipped" not in r}
+    for result in after["pipeline"]:
+        old = previous.get(scenario_key(result))
+        if old is None or "skipped" in result:
+            continue
+        print(
+            f"model={result['model']} roi={result['roi'][0]}x{result['roi'][1]}: "
+            f"fps {old['fps']} → {result['fps']} ({change(old['fps'], result['fps'])}), "
+            f"peak RSS {old['peak_rss_mb']} → {result['peak_rss_mb']} МБ"
+        )
+        for stage, stats in result["stages"].items():
+            old_stats = old["stages"].get(stage)
+            if not old_stats or not stats["count"]:
+                continue
+            print(
+                f"    {stage:<10} mean {old_stats['mean_ms']} → {stats['mean_ms']} мс "
+                f"({change(old_stats['mean_ms'], stats['mean_ms'])})"
+            )
+
+    old_memory = {
+        scenario_key(r): r for r in before.get("memory", []) if "skipped" not in r
+    }
+    for result in after.get("memory", []):
+        old = old_memory.get(scenario_key(result))
+        if old is None or "skipped" in result:
+            continue
+        print(
+            f"model={result['model']} roi={result['roi'][0]}x{result['roi'][1]}: "
+            f"память за кадр {old['transient_kb_mean']} → {result['transient_kb_mean']} КБ "
+            f"({change(old['transient_kb_mean'], result['transient_kb_mean'])}), "
+            f"сборок мусора {sum(old['gc_collections'])} → {sum(result['gc_collections'])}"
+        )
+
+    compare_scaling(before.get("scaling", []), after.get("scaling", []))
+
+    old_startup = {r["mode"]: r for r in before.get("startup", [])}
+    for result in after.get("startup", []):
+        old = old_startup.get(result["mode"])
+        if old:
+            print(
+                f"Запуск {result['mode']}: импорт {old['import_s']} → {result['import_s']} с "
+                f"({change(old['import_s'], result['import_s'])}), первый кадр "
+                f"{old['first_frame_s']} → {result['first_frame_s']} с, "
+                f"всего {old['total_s']} → {result['total_s']} с"
+            )
+
+    old_db = {r["batch_size"]: r for r in before.get("database", [])}
+    for result in after.get("database", []):
+        old = old_db.get(result["batch_size"])
+        if old:
+            print(
+                f"DB batch={result['batch_size']}: {old['rows_per_s']} → "
+                f"{result['rows_per_s']} строк/с ({change(old['rows_per_s'], result['rows_per_s'])})"
+            )
+
+    old_concurrency = {r["mode"]: r for r in before.get("database_concurrency", [])}
+    for result in after.get("database_concurrency", []):
+        old = old_concurrency.get(result["mode"])
+        if old:
+            print(
+                f"DB {result['mode']}: чтение {old['reads_per_s']} → {result['reads_per_s']} "
+                f"запросов/с ({change(old['reads_per_s'], result['reads_per_s'])}), "
+                f"p95 {old['read_p95_ms']} → {result['read_p95_ms']} мс"
+            )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = commands.add_parser("run", help="Прогнать конвейер и запись в БД")
+    parser_run.add_argument(
+        "--source", help="Видео, изображение или папка; по умолчанию синтетические кадры 640x480"
+    )
+    parser_run.add_argument("--frames", type=int, default=300, help="Кадров на сценарий")
+    parser_run.add_argument(
+        "--roi",
+        type=parse_roi,
+        nargs="+",
+        default=[(160, 120), (400, 300), (640, 480)],
+        help="Размеры области, например 400x300",
+    )
+    parser_run.add_argument(
+        "--models", type=int, nargs="+", default=[0, 1], help="face_model_selection"
+    )
+    parser_run.add_argument(
+        "--motion-gating",
+        action="store_true",
+        help="Пропускать детекцию без движения; по умолчанию детекция на каждом кадре",
+    )
+    parser_run.add_argument(
+        "--memory",
+        action="store_true",
+        help="Дополнительно замерить через tracemalloc временные выделения памяти за кадр",
+    )
+    parser_run.add_argument(
+        "--scaling",
+        action="store_true",
+        help="Замерить точность и скорость детекции при уменьшенной ширине inference_width",
+    )
+    parser_run.add_argument(
+        "--scaling-widths",
+        type=int,
+        nargs="+",
+        default=[1280, 960, 640, 480, 320],
+        help="Ширины для --scaling",
+    )
+    parser_run.add_argument(
+        "--startup",
+        action="store_true",
+        help="Замерить холодный старт: импорт приложения, прогрев и первый кадр",
+    )
+    parser_run.add_argument(
+        "--db-rows", type=int, default=2000, help="Строк для замера записи в БД, 0 — пропустить"
+    )
+    parser_run.add_argument(
+        "--db-batches", type=int, nargs="+", default=[1, 50, 500], help="Размеры пакетов INSERT"
+    )
+    parser_run.add_argument(
+        "--db-concurrency",
+        type=float,
+        default=5.0,
+        help="Секунд чтения во время записи для baseline и tuned, 0 — пропустить",
+    )
+    parser_run.add_argument(
+        "--db-readers", type=int, default=4, help="Параллельных читателей в замере"
+    )
+    parser_run.add_argument("--output", default="benchmark_results.json")
+    parser_run.set_defaults(handler=run)
+
+    parser_compare = commands.add_parser("compare", help="Сравнить два файла результатов")
+    parser_compare.add_argument("before")
+    parser_compare.add_argument("after")
+    parser_compare.set_defaults(handler=compare)
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = build_parser().parse_args()
+    arguments.handler(arguments)
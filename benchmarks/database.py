@@ -0,0 +1,191 @@
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from benchmarks.pipeline import peak_rss_mb
+
+
+def run_database(rows: int, batch_sizes: list[int]) -> list[dict[str, Any]]:
+    """
+    Скорость записи обнаружений во временную SQLite-базу.
+
+    Размер пакета 1 — построчный ``DetectionDAO.add``, как до буфера
+    отложенной записи; остальные — ``bulk_add`` пакетами. Выполняется в
+    отдельном процессе, DATABASE_URL задаётся до импорта приложения.
+    """
+    db_dir = tempfile.mkdtemp(prefix="bench-db-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_dir}/bench.db"
+
+    from app.database.base import Base
+    from app.database.core import engine
+    from app.repositories.detector import DetectionDAO
+
+    async def measure() -> list[dict[str, Any]]:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        results = []
+        for batch_size in batch_sizes:
+            values = [
+                {
+                    "timestamp": datetime.now(),
+                    "image_path": f"saved_photos/human_0_{i}.jpg",
+                    "camera_id": 0,
+                    "x": 100,
+                    "y": 100,
+                    "width": 400,
+                    "height": 300,
+                }
+                for i in range(rows)
+            ]
+            started = time.perf_counter()
+            if batch_size == 1:
+                for row in values:
+                    await DetectionDAO.add(**row)
+            else:
+                for i in range(0, rows, batch_size):
+                    await DetectionDAO.bulk_add(values[i : i + batch_size])
+            elapsed = time.perf_counter() - started
+            results.append(
+                {
+                    "batch_size": batch_size,
+                    "rows": rows,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_s": round(rows / elapsed, 1),
+                }
+            )
+        await engine.dispose()
+        return results
+
+    results = asyncio.run(measure())
+    for result in results:
+        result["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+
+BASELINE_PRAGMAS = {
+    "db_journal_mode": "delete",
+    "db_synchronous": "full",
+    "db_mmap_mb": 0,
+    "db_cache_mb": 2,
+}
+
+
+def _detection(i: int) -> dict[str, Any]:
+    return {
+        "timestamp": datetime.now(),
+        "image_path": f"saved_photos/human_0_{i}.jpg",
+        "camera_id": 0,
+        "x": 100,
+        "y": 100,
+        "width": 400,
+        "height": 300,
+    }
+
+
+def _configure(mode: str, url: str, readers: int = 1) -> None:
+    """Задать базу и прагмы до первого импорта app.database.core."""
+    os.environ["DATABASE_URL"] = url
+
+    from app.core.config import settings
+
+    if mode == "baseline":
+        for key, value in BASELINE_PRAGMAS.items():
+            setattr(settings, key, value)
+    settings.db_read_pool_size = readers
+
+
+def _write_for(mode: str, url: str, seconds: float, batch_size: int) -> int:
+    """Писатель в отдельном процессе, как ``python -m app.cli ingest`` у сервера."""
+    _configure(mode, url)
+
+    from app.database.core import dispose_engines
+    from app.repositories.detector import DetectionDAO
+
+    async def write() -> int:
+        written = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            batch = [_detection(i) for i in range(batch_size)]
+            written += await DetectionDAO.bulk_add(batch)
+        await dispose_engines()
+        return written
+
+    return asyncio.run(write())
+
+
+def run_concurrency(
+    mode: str, rows: int, readers: int, seconds: float, batch_size: int = 50
+) -> dict[str, Any]:
+    """
+    Чтение страниц галереи во время непрерывной записи обнаружений.
+
+    ``baseline`` — журнал отката и synchronous=FULL, как у SQLite по
+    умолчанию, ``tuned`` — прагмы из настроек (WAL). Писатель в отдельном
+    процессе добавляет пакеты по ``batch_size`` строк, ``readers`` задач
+    читают первую страницу ``/humans``. В одном процессе блокировки почти
+    не видны: цикл событий занят самим Python, а не ожиданием SQLite.
+    """
+    db_dir = tempfile.mkdtemp(prefix="bench-db-")
+    url = f"sqlite+aiosqlite:///{db_dir}/bench.db"
+    _configure(mode, url, readers)
+
+    from app.database.base import Base
+    from app.database.core import dispose_engines, engine
+    from app.repositories.detector import DetectionDAO
+
+    async def measure() -> dict[str, Any]:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        for i in range(0, rows, 500):
+            await DetectionDAO.bulk_add(
+                [_detection(j) for j in range(i, min(i + 500, rows))]
+            )
+
+        latencies: list[float] = []
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            writer = executor.submit(_write_for, mode, url, seconds, batch_size)
+            # Ждём, пока писатель загрузит модули и начнёт запись.
+            while not writer.done():
+                if (await DetectionDAO.get_page(limit=1))[0].id > rows:
+                    break
+                await asyncio.sleep(0.05)
+
+            started = time.perf_counter()
+            deadline = started + seconds * 0.8
+
+            async def read() -> None:
+                while time.perf_counter() < deadline:
+                    query_started = time.perf_counter()
+                    await DetectionDAO.get_page(limit=50)
+                    latencies.append(time.perf_counter() - query_started)
+
+            await asyncio.gather(*(read() for _ in range(readers)))
+            elapsed = time.perf_counter() - started
+            written = await asyncio.wrap_future(writer)
+        await dispose_engines()
+
+        cuts = statistics.quantiles(latencies, n=100)
+        return {
+            "mode": mode,
+            "readers": readers,
+            "seconds": round(elapsed, 3),
+            "reads_per_s": round(len(latencies) / elapsed, 1),
+            "read_p50_ms": round(cuts[49] * 1000, 3),
+            "read_p95_ms": round(cuts[94] * 1000, 3),
+            "read_max_ms": round(max(latencies) * 1000, 3),
+            "writes_rows_per_s": round(written / seconds, 1),
+        }
+
+    result = asyncio.run(measure())
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
@@ -0,0 +1,76 @@
+import time
+from collections.abc import Callable
+
+import numpy as np
+
+from app.services.detectors.camera_manager import CameraManager, CaptureStats
+
+
+def synthetic_frames(
+    count: int = 120, width: int = 640, height: int = 480, seed: int = 0
+) -> list[np.ndarray]:
+    """Неподвижный шумовой фон и светлый квадрат, который пересекает кадр."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    size = height // 4
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = int((width - size) * i / max(1, count - 1))
+        y = (height - size) // 2
+        frame[y : y + size, x : x + size] = 230
+        frames.append(frame)
+    return frames
+
+
+def recorded_frames(path: str, count: int = 120) -> list[np.ndarray]:
+    """Первые ``count`` кадров видеофайла, изображения или папки с изображениями."""
+    from app.services.ingestion import open_source
+
+    source = open_source(path)
+    try:
+        return [frame.image for frame in source.read_chunk(count)]
+    finally:
+        source.close()
+
+
+class FakeCameraManager(CameraManager):
+    """
+    Камера, которая по кругу отдаёт заранее загруженные кадры.
+
+    После ``limit`` кадров запоминает время окончания и вызывает
+    ``on_exhausted`` — бенчмарк останавливает в нём детектор.
+    """
+
+    def __init__(
+        self,
+        frames: list[np.ndarray],
+        limit: int,
+        on_exhausted: Callable[[], None] | None = None,
+    ) -> None:
+        super().__init__(camera_index="fake", capture_mode="sync")
+        self.frames = frames
+        self.limit = limit
+        self.on_exhausted = on_exhausted
+        self.finished_at: float | None = None
+
+    def connect(self) -> bool:
+        return True
+
+    def open(self) -> bool:
+        self.stats = CaptureStats()
+        return True
+
+    def read_frame(self, timeout: float = 1.0):
+        if self.stats.captured >= self.limit:
+            if self.finished_at is None:
+                self.finished_at = time.perf_counter()
+                if self.on_exhausted:
+                    self.on_exhausted()
+            return None
+        frame = self.frames[self.stats.captured % len(self.frames)]
+        self.stats.captured += 1
+        return frame
+
+    def release(self) -> None:
+        pass
@@ -0,0 +1,85 @@
+import gc
+import statistics
+import tracemalloc
+from typing import Any
+
+from benchmarks.fake_camera import FakeCameraManager
+from benchmarks.pipeline import build_detector, peak_rss_mb
+
+# Кадров до начала замера: буферы выделяются на первых кадрах.
+STEADY_AFTER = 30
+
+
+class TracingCamera(FakeCameraManager):
+    """
+    Подставная камера, которая между кадрами снимает показания tracemalloc.
+
+    Перед каждым кадром запоминается объём выделенной Python и NumPy памяти и
+    сбрасывается пик, а перед следующим — насколько пик превысил этот объём.
+    Это временные массивы и объекты, созданные за кадр и освобождённые к его
+    концу; их объём и сборки мусора показывают нагрузку на аллокатор.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.transient: list[int] = []
+        self.growth = 0
+        self.collections = [0, 0, 0]
+        self._frame_start = 0
+        self._steady_start = 0
+        self._gc_start: list[int] = []
+
+    def read_frame(self, timeout: float = 1.0):
+        index = self.stats.captured
+        if index == STEADY_AFTER:
+            gc.collect()
+            tracemalloc.start()
+            self._steady_start = tracemalloc.get_traced_memory()[0]
+            self._gc_start = [stats["collections"] for stats in gc.get_stats()]
+        elif index > STEADY_AFTER and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.transient.append(peak - self._frame_start)
+            if index >= self.limit:
+                self.growth = current - self._steady_start
+                self.collections = [
+                    stats["collections"] - before
+                    for stats, before in zip(gc.get_stats(), self._gc_start, strict=True)
+                ]
+                tracemalloc.stop()
+
+        if tracemalloc.is_tracing():
+            self._frame_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        return super().read_frame(timeout)
+
+
+def run_memory(scenario: dict[str, Any]) -> dict[str, Any]:
+    """
+    Память конвейера в установившемся режиме для одного сценария.
+
+    Выполняется в отдельном процессе. Выделения внутри MediaPipe tracemalloc
+    не видит, поэтому замер показывает работу самого конвейера: кадры,
+    области, преобразования цвета, проверку движения, трекер и вырезки.
+    """
+    if scenario["frames"] <= STEADY_AFTER:
+        return {**scenario, "skipped": f"нужно больше {STEADY_AFTER} кадров"}
+    try:
+        detector = build_detector(scenario, TracingCamera)
+    except ValueError as e:
+        return {**scenario, "skipped": str(e)}
+
+    detector.running = True
+    detector._run()
+    camera: TracingCamera = detector.camera  # type: ignore
+
+    transient = sorted(camera.transient)
+    return {
+        **scenario,
+        "frames_measured": len(transient),
+        "transient_kb_mean": round(statistics.fmean(transient) / 1024, 1),
+        "transient_kb_p95": round(transient[int(len(transient) * 0.95)] / 1024, 1),
+        "transient_kb_max": round(transient[-1] / 1024, 1),
+        "growth_kb": round(camera.growth / 1024, 1),
+        "gc_collections": camera.collections,
+        "peak_rss_mb": peak_rss_mb(),
+    }
@@ -0,0 +1,111 @@
+import resource
+import sys
+import tempfile
+import time
+from typing import Any
+
+WARMUP_FRAMES = 5
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS текущего процесса в мегабайтах."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stage_percentiles(histogram) -> dict[str, float]:
+    return {
+        "count": histogram.count,
+        "mean_ms": round(histogram.sum / histogram.count * 1000, 3)
+        if histogram.count
+        else 0.0,
+        "p50_ms": histogram.quantile(0.5) * 1000,
+        "p95_ms": histogram.quantile(0.95) * 1000,
+        "p99_ms": histogram.quantile(0.99) * 1000,
+    }
+
+
+def build_detector(scenario: dict[str, Any], camera_class: type | None = None):
+    """
+    HumanDetector с подставной камерой для сценария бенчмарка.
+
+    Темп цикла не ограничивается, запись в БД и SSE не подключены. Если
+    область не помещается в кадр, выбрасывается ValueError.
+    """
+    from app.core.config import Settings
+    from app.services.detectors.base import HumanDetector
+    from benchmarks.fake_camera import (
+        FakeCameraManager,
+        recorded_frames,
+        synthetic_frames,
+    )
+
+    if scenario["source"]:
+        frames = recorded_frames(scenario["source"], scenario["frames"])
+    else:
+        frames = synthetic_frames(scenario["frames"])
+    frame_h, frame_w = frames[0].shape[:2]
+    width, height = scenario["roi"]
+    if width > frame_w or height > frame_h:
+        raise ValueError(f"ROI больше кадра {frame_w}x{frame_h}")
+
+    settings = Settings(
+        x=(frame_w - width) // 2,
+        y=(frame_h - height) // 2,
+        width=width,
+        height=height,
+        face_model_selection=scenario["model"],
+        motion_gating=scenario["motion_gating"],
+        capture_mode="sync",
+        idle_fps=0,
+        active_fps=0,
+        confirm_fps=0,
+        save_path=tempfile.mkdtemp(prefix="bench-photos-"),
+    )  # type: ignore
+    detector = HumanDetector(settings)
+    detector.camera = (camera_class or FakeCameraManager)(
+        frames,
+        limit=scenario["frames"],
+        on_exhausted=lambda: setattr(detector, "running", False),
+    )
+
+    # Первые вызовы MediaPipe инициализируют граф, их в замер не включаем.
+    roi = detector.frame_processor.get_roi(frames[0])
+    for _ in range(WARMUP_FRAMES):
+        detector.inference.detect(roi, settings)
+    return detector
+
+
+def run_pipeline(scenario: dict[str, Any]) -> dict[str, Any]:
+    """
+    Прогнать кадры через HumanDetector с подставной камерой.
+
+    Выполняется в отдельном процессе: пиковый RSS и состояние модулей у
+    каждого сценария свои. Измеряется только сам конвейер.
+    """
+    try:
+        detector = build_detector(scenario)
+    except ValueError as e:
+        return {**scenario, "skipped": str(e)}
+
+    detector.running = True
+    started = time.perf_counter()
+    detector._run()
+    elapsed = detector.camera.finished_at - started  # type: ignore
+
+    metrics = detector.metrics
+    return {
+        **scenario,
+        "frames_processed": detector.camera.stats.processed,
+        "seconds": round(elapsed, 3),
+        "fps": round(detector.camera.stats.processed / elapsed, 2),
+        "inference_runs": metrics.inference_runs.value,
+        "inference_skipped": metrics.inference_skipped.value,
+        "detections": metrics.detections.value,
+        "stages": {
+            stage: stage_percentiles(histogram)
+            for stage, histogram in metrics.stages.items()
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
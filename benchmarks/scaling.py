@@ -0,0 +1,108 @@
+import statistics
+import time
+from typing import Any
+
+from benchmarks.pipeline import WARMUP_FRAMES
+
+# Рамка считается найденной, если IoU с эталонной не меньше порога.
+MATCH_IOU = 0.5
+
+
+def match_boxes(
+    reference: list[tuple[int, int, int, int]], found: list[tuple[int, int, int, int]]
+) -> list[float]:
+    """IoU жадно сопоставленных пар рамок с IoU не меньше ``MATCH_IOU``."""
+    from app.services.detectors.tracker import iou
+
+    pairs = sorted(
+        (
+            (iou(ref, box), i, j)
+            for i, ref in enumerate(reference)
+            for j, box in enumerate(found)
+        ),
+        reverse=True,
+    )
+    used_ref: set[int] = set()
+    used_found: set[int] = set()
+    matched = []
+    for overlap, i, j in pairs:
+        if overlap < MATCH_IOU:
+            break
+        if i in used_ref or j in used_found:
+            continue
+        used_ref.add(i)
+        used_found.add(j)
+        matched.append(overlap)
+    return matched
+
+
+def run_scaling(scenario: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Точность и скорость детекции при уменьшении области до нескольких ширин.
+
+    Областью служит кадр целиком; без ``--source`` это синтетический кадр
+    1920x1080 без лиц, на котором замеряется только скорость. Эталон — рамки,
+    найденные на полном разрешении на тех же кадрах. Для каждой ширины
+    считается, какую долю эталонных рамок модель нашла (recall), какая доля
+    найденных есть в эталоне (precision) и средний IoU совпавших, а также
+    время уменьшения, cvtColor и MediaPipe на кадр.
+    """
+    from app.core.config import Settings
+    from app.services.detectors.face_detector import FaceDetector
+    from benchmarks.fake_camera import recorded_frames, synthetic_frames
+
+    if scenario["source"]:
+        frames = recorded_frames(scenario["source"], scenario["frames"])
+    else:
+        frames = synthetic_frames(scenario["frames"], width=1920, height=1080)
+    detector = FaceDetector(Settings(face_model_selection=scenario["model"]))  # type: ignore
+
+    def measure(width: int) -> tuple[list[list[tuple[int, int, int, int]]], list[float]]:
+        detector.max_width = width
+        for frame in frames[:WARMUP_FRAMES]:
+            detector.detect(frame)
+        boxes, times = [], []
+        for frame in frames:
+            started = time.perf_counter()
+            faces = detector.detect(frame)
+            times.append(time.perf_counter() - started)
+            boxes.append([face[:4] for face in faces])
+        return boxes, times
+
+    frame_h, frame_w = frames[0].shape[:2]
+    reference, reference_times = measure(0)
+    reference_mean = statistics.fmean(reference_times)
+    reference_total = sum(len(boxes) for boxes in reference)
+
+    results = []
+    for width in [0, *sorted(scenario["widths"], reverse=True)]:
+        if width >= frame_w:
+            continue
+        boxes, times = (reference, reference_times) if width == 0 else measure(width)
+        found_total = sum(len(found) for found in boxes)
+        overlaps = [
+            overlap
+            for ref, found in zip(reference, boxes, strict=True)
+            for overlap in match_boxes(ref, found)
+        ]
+        mean = statistics.fmean(times)
+        results.append(
+            {
+                "model": scenario["model"],
+                "frame": [frame_w, frame_h],
+                "inference_width": width,
+                "mean_ms": round(mean * 1000, 3),
+                "p95_ms": round(statistics.quantiles(times, n=20)[-1] * 1000, 3),
+                "speedup": round(reference_mean / mean, 2),
+                "faces": found_total,
+                "recall": round(len(overlaps) / reference_total, 3)
+                if reference_total
+                else None,
+                "precision": round(len(overlaps) / found_total, 3)
+                if found_total
+                else None,
+                "mean_iou": round(statistics.fmean(overlaps), 3) if overlaps else None,
+            }
+        )
+    detector.detector.close()
+    return results
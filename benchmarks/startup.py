@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import time
+from typing import Any
+
+# Сколько ждать первого обработанного кадра, секунды.
+FIRST_FRAME_TIMEOUT_S = 30.0
+
+
+def synthetic_video(frames: int = 90) -> str:
+    """Записать синтетические кадры во временный MJPG, чтобы камера открывалась как файл."""
+    import cv2
+
+    from benchmarks.fake_camera import synthetic_frames
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-startup-"), "camera.avi")
+    images = synthetic_frames(frames)
+    height, width = images[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    for image in images:
+        writer.write(image)
+    writer.release()
+    return path
+
+
+def run_startup(source: str | None, warm: bool) -> dict[str, Any]:
+    """
+    Холодный старт приложения в новом процессе.
+
+    Замеряется импорт app.main, создание пула камер, прогрев модели (если
+    ``warm``) и путь от start() до первого обработанного кадра с камерой,
+    открытой из видеофайла. Без прогрева модель загружается на первом кадре,
+    как при warmup=none.
+    """
+    started = time.perf_counter()
+    import app.main  # noqa: F401
+
+    imported = time.perf_counter()
+    mediapipe_on_import = "mediapipe" in sys.modules
+
+    from app.services.detectors import get_detector_pool
+
+    pool = get_detector_pool()
+    pooled = time.perf_counter()
+    if warm:
+        pool.warm_up()
+    warmed = time.perf_counter()
+
+    detector = pool.default
+    detector.camera.camera_index = (
+        source if source and os.path.isfile(source) else synthetic_video()
+    )
+    start_called = time.perf_counter()
+    detector.start()
+    deadline = time.perf_counter() + FIRST_FRAME_TIMEOUT_S
+    while detector.startup["first_frame_s"] is None and detector.running:
+        if time.perf_counter() > deadline:
+            break
+        time.sleep(0.001)
+    first_frame = time.perf_counter()
+    pool.close()
+
+    return {
+        "mode": "warm" if warm else "cold",
+        "import_s": round(imported - started, 3),
+        "mediapipe_on_import": mediapipe_on_import,
+        "pool_s": round(pooled - imported, 3),
+        "warmup_s": round(warmed - pooled, 3),
+        "camera_open_s": detector.startup["camera_open_s"],
+        "first_frame_s": detector.startup["first_frame_s"],
+        # Без записи синтетического видео: только путь приложения.
+        "total_s": round(warmed - started + first_frame - start_called, 3),
+    }